@@ -5,7 +5,7 @@ from app.db import db
 from app.config.environment import *  # Import environment variable checks
 from app.models import *
 
-def create_app(test_config=False):
+def create_app(test_config=False, config_overrides=None):
     # initialize flask app
     app = Flask(__name__)
     app.config["TESTING"] = test_config
@@ -21,12 +21,39 @@ def create_app(test_config=False):
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["SECRET_KEY"] = "supersecretkey"
 
+    # Write uploaded watch samples with one batched insert instead of one ORM object per reading
+    app.config["BULK_INGEST"] = True
+    # Storage backend for new stage data: "rows" (StageDataPoint per reading) or "packed" (one blob per stage)
+    app.config["STAGE_DATA_STORAGE"] = AssessmentStageData.STORAGE_ROWS
+    # Largest body a gzip/deflate compressed upload may decompress to
+    app.config["MAX_DECOMPRESSED_BODY_SIZE"] = 32 * 1024 * 1024
+    # Spool uploads in Redis and persist them in a Celery worker instead of inside the request
+    app.config["ASYNC_INGEST"] = False
+    # Detect GAIT peaks as chunked uploads arrive instead of after the assessment completes
+    app.config["STREAMING_PEAK_DETECTION"] = True
+    # Storage backend for detected gait peaks: "rows" (PeakIndex/TroughIndex per position) or "packed" (one blob per analysis)
+    app.config["PEAK_INDEX_STORAGE"] = ZeroCrossingAnalysis.STORAGE_PACKED
+    # Rate in Hz of the uniform grid readings are resampled onto before analysis, None to analyze the raw readings
+    app.config["RESAMPLE_RATE_HZ"] = None
+    # Most analysis results kept to skip recomputing reruns on the same readings, 0 disables the cache
+    app.config["ANALYSIS_CACHE_SIZE"] = 10000
+    # Most SQL statements a request may run before it's logged as over budget, None to not count them
+    app.config["QUERY_BUDGET"] = None
+    # Assessments per page of a patient's history, in the JSON API and on the pages listing it
+    app.config["ASSESSMENT_PAGE_SIZE"] = 20
+
+    # Applied before the extensions are initialized, since the database engine is created from the config in db.init_app
+    app.config.update(config_overrides or {})
+
     # Initialize extensions with app
     db.init_app(app)
 
     with app.app_context():
         db.create_all()
 
+    from .utilities.query_stats import init_query_stats
+    init_query_stats(app)
+
     # Initialize login manager
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -47,6 +74,14 @@ def create_app(test_config=False):
     from .memory_test import memory_test as memory_test_blueprint
     app.register_blueprint(memory_test_blueprint, url_prefix='/assessments/memory_test')
 
+    # Register CLI commands
+    from .commands import analysis_cache_cli, reaction_summaries_cli, reanalyze, stage_data_cli, upgrade_db
+    app.cli.add_command(analysis_cache_cli)
+    app.cli.add_command(reaction_summaries_cli)
+    app.cli.add_command(reanalyze)
+    app.cli.add_command(stage_data_cli)
+    app.cli.add_command(upgrade_db)
+
     # handle 403 error
     @app.errorhandler(403)
     def forbidden(e):
@@ -0,0 +1,52 @@
+from celery_app import celery
+from app.celery_tasks.memory_analysis import analyze_memory_trials
+from app.celery_tasks.peak_identification import analyze_gait
+from app.models import AssessmentStage, AssessmentStageData, MemoryAnalysis, ZeroCrossingAnalysis
+from app import db
+
+@celery.task(name="analyze_assessment")
+def analyze_assessment(assessment_id: int) -> dict[str, list[int]]:
+    """
+    Celery task to run every analysis of an assessment in one go.
+
+    The finalized stage data of the assessment is loaded together, analyzed in process
+    and all results are committed in a single transaction, instead of starting one
+    identify_peaks or memory_analysis task per stage. Stage data that already has its
+    analysis, e.g. chunked GAIT uploads analyzed by the streaming peak detector, is
+    skipped, so the task can be rerun safely.
+
+    Args:
+        assessment_id (int): ID of the PatientAssessment to analyze.
+
+    Returns:
+        dict[str, list[int]]: IDs of the analyzed stage data, and of the RT_TEST stage
+        data whose acceleration never exceeded the movement threshold.
+    """
+    has_gait_analysis = db.session.query(ZeroCrossingAnalysis.id).filter(ZeroCrossingAnalysis.stage_data_id == AssessmentStageData.id).exists()
+    has_memory_analysis = db.session.query(MemoryAnalysis.id).filter(MemoryAnalysis.assessment_stage_data_id == AssessmentStageData.id).exists()
+
+    stage_data = db.session.query(AssessmentStageData).filter(
+        AssessmentStageData.assessment_id == assessment_id,
+        AssessmentStageData.is_finalized.isnot(False),
+        db.or_(
+            (AssessmentStageData.stage == AssessmentStage.GAIT) & ~has_gait_analysis,
+            (AssessmentStageData.stage == AssessmentStage.RT_TEST) & ~has_memory_analysis
+        )
+    ).order_by(AssessmentStageData.id).all()
+
+    arrays = AssessmentStageData.load_arrays(stage_data)
+
+    for data in stage_data:
+        if data.stage == AssessmentStage.GAIT:
+            db.session.add(analyze_gait(data.id, *arrays[data.id]))
+
+    # All RT trials are evaluated together as one ragged batch
+    trial_ids = [data.id for data in stage_data if data.stage == AssessmentStage.RT_TEST]
+    memory_analyses = analyze_memory_trials(trial_ids, [arrays[trial_id] for trial_id in trial_ids])
+    db.session.add_all(memory_analyses)
+
+    db.session.commit()
+    return {
+        "analyzed": [data.id for data in stage_data],
+        "no_movement": [analysis.assessment_stage_data_id for analysis in memory_analyses if analysis.no_movement]
+    }
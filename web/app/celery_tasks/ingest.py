@@ -0,0 +1,42 @@
+from celery_app import celery
+from app.models import AssessmentStage, PatientAssessment
+from app.utilities.ingest import INGEST_FAILED, INGEST_PERSISTED, finish_spooled_upload, get_spooled_upload, store_upload, validate_upload
+from app import db
+
+@celery.task(name="persist_upload")
+def persist_upload(ingest_id: str):
+    """
+    Celery task to persist an upload that was spooled in Redis by the upload endpoint.
+
+    Once the last pending upload of a finished assessment is persisted, the
+    analysis tasks of the assessment are started.
+
+    Args:
+        ingest_id (str): ID returned by spool_upload.
+
+    Raises:
+        ValueError: If the spooled upload is not found or cannot be parsed.
+    """
+    spooled = get_spooled_upload(ingest_id)
+
+    if not spooled or spooled[1] is None:
+        raise ValueError(f"Spooled upload with ID {ingest_id} not found.")
+
+    entry, body = spooled
+    assessment_id = int(entry["assessment_id"])
+    stage = AssessmentStage(entry["stage"])
+
+    try:
+        upload = validate_upload(body, entry["mimetype"], stage)
+        stage_data, _ = store_upload(upload, stage, assessment_id, entry.get("upload_id"), int(entry.get("sample_offset", 0)))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        finish_spooled_upload(ingest_id, assessment_id, INGEST_FAILED, error=str(e))
+        raise
+
+    pending = finish_spooled_upload(ingest_id, assessment_id, INGEST_PERSISTED, stage_data_id=stage_data.id)
+
+    assessment = db.session.get(PatientAssessment, assessment_id)
+    if pending <= 0 and assessment and not assessment.is_running:
+        assessment.run_celery_tasks()
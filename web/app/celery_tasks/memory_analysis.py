@@ -1,8 +1,13 @@
-import pandas as pd
+import math
+
+from flask import current_app
 import numpy as np
 
 from celery_app import celery
 from app.models import AssessmentStageData, MemoryAnalysis
+from app.utilities.analysis_cache import MEMORY, cached_results, fingerprint, store_results
+from app.utilities.memory_signal import ALGORITHM_VERSION, ANALYSIS_PARAMETERS, movement_features, ragged_batch
+from app.utilities.resampling import MAX_GAP_MS, resample_uniform
 from app import db
 
 @celery.task(name="memory_analysis")
@@ -14,7 +19,7 @@ def memory_analysis(assessment_stage_data_id: int):
         assessment_stage_data_id (int): ID of the AssessmentStageData to analyze.
 
     Raises:
-        ValueError: If the AssessmentStageData is not found or if analysis cannot be performed.
+        ValueError: If the AssessmentStageData is not found.
     """
 
     # Retrieve AssessmentStageData from database
@@ -23,46 +28,95 @@ def memory_analysis(assessment_stage_data_id: int):
     if not data:
         raise ValueError(f"AssessmentStageData with ID {assessment_stage_data_id} not found.")
 
-    # Convert AssessmentStageData to DataFrame
-    table = pd.DataFrame(
-        [
-            {"X": point.x, "Y": point.y, "Z": point.z, "Timestamp": point.timestamp}
-            for point in data.points
-        ]
-    )
+    arrays = data.as_arrays()
+    key = memory_fingerprint(*arrays)
+    existing = db.session.query(MemoryAnalysis).filter_by(assessment_stage_data_id=data.id).all()
 
-    table = table.sort_values(by="Timestamp").reset_index(drop=True)
+    # A rerun on the same readings keeps the existing analysis
+    if any(analysis.fingerprint == key for analysis in existing):
+        return
 
-    # Set parameters
-    threshold = 2 # m/s2
+    analysis = analyze_memory(data.id, *arrays, key=key)
 
-    # 1. Take Euclidian norm of each row
-    table['norm'] = np.linalg.norm(table[['X','Y','Z']].values, axis=1)
+    # The dashboard shows one analysis per stage, so an analysis with other parameters or readings is replaced
+    for previous in existing:
+        db.session.delete(previous)
 
-    # 2. Get maximum norm value
-    max_norm = table['norm'].max()
+    db.session.add(analysis)
+    db.session.commit()
 
-    if max_norm < threshold:
-        raise ValueError("Maximum norm value is below threshold; cannot perform analysis.")
+def analyze_memory(assessment_stage_data_id: int, timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                   key: str | None = None) -> MemoryAnalysis:
+    """
+    Compute the memory analysis of the readings of an RT_TEST stage.
 
-    # 3. Identify first > threshold time point in one liner
-    above_threshold = table.loc[table['norm'] > threshold, 'Timestamp']
-    first_above_threshold = above_threshold.min()
+    Args:
+        assessment_stage_data_id (int): ID of the AssessmentStageData the readings belong to.
+        timestamps (np.ndarray): Epoch timestamps in milliseconds.
+        x, y, z (np.ndarray): Acceleration along each axis.
+        key (str | None): memory_fingerprint of the readings, computed if not given.
 
-    # 4. Calculate time taken to reach threshold
-    time_taken = first_above_threshold - table['Timestamp'].min()
+    Returns:
+        MemoryAnalysis: The unsaved analysis.
+    """
+    return analyze_memory_trials([assessment_stage_data_id], [(timestamps, x, y, z)], None if key is None else [key])[0]
 
-    # 5. For all points >= first_above_threshold, calculate average norm
-    relevant_points = table[table['Timestamp'] >= first_above_threshold]
-    average_norm = relevant_points['norm'].mean()
+def analyze_memory_trials(assessment_stage_data_ids: list[int], arrays: list[tuple[np.ndarray, ...]],
+                          keys: list[str] | None = None) -> list[MemoryAnalysis]:
+    """
+    Compute the memory analyses of the readings of several RT_TEST stages in one batch,
+    reusing the cached results of readings that were analyzed before.
 
-    # Store results in database
-    analysis = MemoryAnalysis(
-        assessment_stage_data_id=assessment_stage_data_id,
-        time_to_move=time_taken.total_seconds() * 1000,
-        average_accl_post_threshold=average_norm,
-        max_accl=max_norm
-    )
+    Args:
+        assessment_stage_data_ids (list[int]): IDs of the AssessmentStageData to analyze.
+        arrays (list[tuple[np.ndarray, ...]]): Timestamp and axis arrays of each stage, as returned by as_arrays.
+        keys (list[str] | None): memory_fingerprint of each stage's readings, computed if not given.
 
-    db.session.add(analysis)
-    db.session.commit()
\ No newline at end of file
+    Returns:
+        list[MemoryAnalysis]: The unsaved analyses, in the order of the IDs. Trials without
+        movement are marked no_movement instead of having a time to move.
+    """
+    keys = keys or [memory_fingerprint(*trial) for trial in arrays]
+    results = cached_results(MEMORY, keys)
+
+    # Trials that aren't cached are evaluated together as one ragged batch
+    missing = list(dict.fromkeys(key for key in keys if key not in results))
+    if missing:
+        trials = [arrays[keys.index(key)] for key in missing]
+        rate_hz = current_app.config["RESAMPLE_RATE_HZ"]
+        if rate_hz:
+            # Segments of a trial are kept together, the gaps between them remain in the timestamps
+            trials = [resample_uniform(*trial, rate_hz)[0] for trial in trials]
+        columns, offsets = ragged_batch(trials)
+        computed = {
+            key: {
+                "time_to_move": None if math.isnan(time_to_move) else time_to_move,
+                "average_accl": None if math.isnan(average_accl) else average_accl,
+                "max_accl": None if math.isnan(max_accl) else max_accl,
+                "moved": moved
+            }
+            for key, time_to_move, average_accl, max_accl, moved
+            in zip(missing, *(feature.tolist() for feature in movement_features(*columns, offsets)))
+        }
+        store_results(MEMORY, computed)
+        results.update(computed)
+
+    return [
+        MemoryAnalysis(
+            assessment_stage_data_id=stage_data_id,
+            time_to_move=results[key]["time_to_move"],
+            average_accl_post_threshold=results[key]["average_accl"],
+            max_accl=results[key]["max_accl"],
+            no_movement=not results[key]["moved"],
+            fingerprint=key
+        )
+        for stage_data_id, key in zip(assessment_stage_data_ids, keys)
+    ]
+
+def memory_fingerprint(timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> str:
+    """
+    Get the analysis cache fingerprint of the memory analysis of some readings.
+    """
+    rate_hz = current_app.config["RESAMPLE_RATE_HZ"]
+    params = {**ANALYSIS_PARAMETERS, "resample_rate_hz": rate_hz, "max_gap_ms": MAX_GAP_MS} if rate_hz else ANALYSIS_PARAMETERS
+    return fingerprint(MEMORY, ALGORITHM_VERSION, params, (timestamps, x, y, z))
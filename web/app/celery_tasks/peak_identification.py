@@ -1,9 +1,14 @@
-import pandas as pd
+import math
+
+from flask import current_app
 import numpy as np
-from scipy.signal import lfilter
 
 from celery_app import celery
-from app.models import AssessmentStageData, ZeroCrossingAnalysis, PeakIndex, TroughIndex
+from app.models import AssessmentStageData, ZeroCrossingAnalysis
+from app.utilities.analysis_cache import GAIT, cached_results, fingerprint, store_results
+from app.utilities.gait_signal import ALGORITHM_VERSION, ANALYSIS_PARAMETERS, PEAK_THRESHOLD, WINDOW_SIZE, filtered_norm, find_peaks_and_troughs, gait_rhythm, \
+    resampled_filtered_norm, resampled_peaks_and_troughs, sample_rate
+from app.utilities.resampling import MAX_GAP_MS
 from app import db
 
 @celery.task(name="identify_peaks")
@@ -26,78 +31,92 @@ def identify_peaks(assessment_stage_data_id: int):
     if not data:
         raise ValueError(f"AssessmentStageData with ID {assessment_stage_data_id} not found.")
 
-    # Convert AssessmentStageData to DataFrame
-    table = pd.DataFrame(
-        [
-            {"X": point.x, "Y": point.y, "Z": point.z, "Timestamp": point.timestamp}
-            for point in data.points
-        ]
-    )
-
-    table = table.sort_values(by="Timestamp").reset_index(drop=True)
-
-    # Set parameters
-    window_size = 20
-    threshold = 0.2
-
-    # 1. Take Euclidian norm of each row
-    table['norm'] = np.linalg.norm(table[['X','Y','Z']].values, axis=1)
-
-    # 2. DC Block
-    table['rolling_norm'] = table['norm'] - table['norm'].rolling(window=window_size, min_periods=window_size).mean()
-
-    # 3. Apply lowpass
-    B = np.array([1, 2, 3, 4, 3, 2, 1]) / 16.0
-    A = [1]
-    table["rolling_norm_lp"] = lfilter(B, A, table["rolling_norm"])
-
-    # 4. Implement peak detection
-    zero_crossings = np.where(np.diff(np.sign(table["rolling_norm_lp"].dropna())))[0]
-    peaks, troughs = [], []
-
-    for i in range(len(zero_crossings) - 1):
-        start_idx = zero_crossings[i]
-        end_idx = zero_crossings[i + 1]
-        segment = table["rolling_norm_lp"].iloc[start_idx:end_idx]
-        
-        # Get actual indices in the original table
-        local_min_idx = start_idx + segment.idxmin() - segment.index[0]
-        local_max_idx = start_idx + segment.idxmax() - segment.index[0]
-        
-        min_val = table["rolling_norm_lp"].iloc[local_min_idx]
-        max_val = table["rolling_norm_lp"].iloc[local_max_idx]
-        
-        if abs(min_val) > abs(max_val) and abs(min_val) > threshold:
-            troughs.append(local_min_idx)
-        elif abs(max_val) > threshold:
-            peaks.append(local_max_idx)
-
-    # Calculate average peak interval and std deviation
-    peak_rows = table.iloc[peaks]
-    peak_intervals = peak_rows['Timestamp'].diff().dt.total_seconds().dropna().values
-    avg_peak_distance = np.mean(peak_intervals) if len(peak_intervals) > 0 else 0
-    std_dev_peak_distance = np.std(peak_intervals) if len(peak_intervals) > 0 else 0
-
-    trough_rows = table.iloc[troughs]
-    trough_intervals = trough_rows['Timestamp'].diff().dt.total_seconds().dropna().values
-    avg_trough_distance = np.mean(trough_intervals) if len(trough_intervals) > 0 else 0
-    std_dev_trough_distance = np.std(trough_intervals) if len(trough_intervals) > 0 else 0
-
-    # Store results in ZeroCrossingAnalysis
-    analysis = ZeroCrossingAnalysis(
-        stage_data_id=data.id,
-        avg_peak_distance=avg_peak_distance,
-        std_dev_peak_distance=std_dev_peak_distance,
-        avg_trough_distance=avg_trough_distance,
-        std_dev_trough_distance=std_dev_trough_distance
-    )
-
-    # Add peaks and troughs to analysis
-    for peak in peaks:
-        analysis.peak_indices.append(PeakIndex(point_index=peak))
-    for trough in troughs:
-        analysis.trough_indices.append(TroughIndex(point_index=trough))
+    timestamps, x, y, z = data.as_arrays()
+    key = gait_fingerprint(timestamps, x, y, z)
+    existing = db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=data.id).all()
+
+    # A rerun on the same readings keeps the existing analysis
+    if any(analysis.fingerprint == key for analysis in existing):
+        return
+
+    analysis = analyze_gait(data.id, timestamps, x, y, z, key)
+
+    # The dashboard shows one analysis per stage, so an analysis with other parameters or readings is replaced
+    for previous in existing:
+        db.session.delete(previous)
 
     # Commit to database
     db.session.add(analysis)
-    db.session.commit()
\ No newline at end of file
+    db.session.commit()
+
+def analyze_gait(assessment_stage_data_id: int, timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                 key: str | None = None) -> ZeroCrossingAnalysis:
+    """
+    Compute the zero crossing analysis and the rhythm features of the readings of a GAIT
+    stage, reusing the cached results if the same readings were analyzed before.
+
+    Both are computed from the same filtered signal, so the readings are only filtered once.
+
+    Args:
+        assessment_stage_data_id (int): ID of the AssessmentStageData the readings belong to.
+        timestamps (np.ndarray): Epoch timestamps in milliseconds.
+        x, y, z (np.ndarray): Acceleration along each axis.
+        key (str | None): gait_fingerprint of the readings, computed if not given.
+
+    Returns:
+        ZeroCrossingAnalysis: The unsaved analysis.
+    """
+    key = key or gait_fingerprint(timestamps, x, y, z)
+    cached = cached_results(GAIT, [key]).get(key)
+    rate_hz = current_app.config["RESAMPLE_RATE_HZ"]
+
+    if cached is not None:
+        peaks, troughs = cached["peaks"], cached["troughs"]
+        peak_timestamps, trough_timestamps = cached["peak_timestamps"], cached["trough_timestamps"]
+        rhythm = cached["rhythm"]
+        if not rate_hz:
+            # Timestamps aren't fingerprinted without resampling, so the cached ones may belong to other readings
+            peak_timestamps, trough_timestamps = timestamps[peaks].tolist(), timestamps[troughs].tolist()
+    else:
+        if rate_hz:
+            # 0. Resample onto a uniform grid, then 1-4. on each segment of the grid
+            grid, signal, offsets = resampled_filtered_norm(timestamps, x, y, z, rate_hz)
+            peaks, troughs, peak_timestamps, trough_timestamps = resampled_peaks_and_troughs(timestamps, grid, signal, offsets)
+            rhythm = gait_rhythm(signal, offsets, rate_hz)
+        else:
+            # 1-3. Euclidian norm, DC block and lowpass
+            signal = filtered_norm(x, y, z, WINDOW_SIZE)
+
+            # 4. Implement peak detection
+            peaks, troughs = find_peaks_and_troughs(signal, PEAK_THRESHOLD)
+            peak_timestamps, trough_timestamps = timestamps[peaks], timestamps[troughs]
+            rhythm = gait_rhythm(signal, np.zeros(1, dtype=np.int64), sample_rate(timestamps))
+
+        peak_timestamps, trough_timestamps = np.asarray(peak_timestamps).tolist(), np.asarray(trough_timestamps).tolist()
+        rhythm = [None if math.isnan(value) else value for value in rhythm]
+        store_results(GAIT, {key: {
+            "peaks": peaks, "troughs": troughs, "peak_timestamps": peak_timestamps, "trough_timestamps": trough_timestamps, "rhythm": rhythm
+        }})
+
+    # Results with the average interval and std deviation of peaks and troughs
+    packed = current_app.config["PEAK_INDEX_STORAGE"] == ZeroCrossingAnalysis.STORAGE_PACKED
+    analysis = ZeroCrossingAnalysis.from_peaks(assessment_stage_data_id, peaks, peak_timestamps, troughs, trough_timestamps, packed)
+    analysis.set_rhythm(*rhythm)
+    analysis.fingerprint = key
+    return analysis
+
+def gait_fingerprint(timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> str:
+    """
+    Get the analysis cache fingerprint of the gait analysis of some readings.
+
+    Without resampling, timestamps only change the result through the sample rate of the
+    rhythm features and the timestamps of the peaks and troughs, so the rate is fingerprinted
+    rather than the timestamps and analyze_gait reads the peak and trough timestamps of a
+    cached result from the readings it analyzes.
+    """
+    rate_hz = current_app.config["RESAMPLE_RATE_HZ"]
+    if not rate_hz:
+        params = {**ANALYSIS_PARAMETERS, "sample_rate_hz": sample_rate(timestamps)}
+        return fingerprint(GAIT, ALGORITHM_VERSION, params, (x, y, z))
+    params = {**ANALYSIS_PARAMETERS, "resample_rate_hz": rate_hz, "max_gap_ms": MAX_GAP_MS}
+    return fingerprint(GAIT, ALGORITHM_VERSION, params, (timestamps, x, y, z))
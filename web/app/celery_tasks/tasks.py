@@ -1,2 +1,4 @@
 from app.celery_tasks.peak_identification import identify_peaks
-from app.celery_tasks.memory_analysis import memory_analysis
\ No newline at end of file
+from app.celery_tasks.memory_analysis import memory_analysis
+from app.celery_tasks.ingest import persist_upload
+from app.celery_tasks.assessment_analysis import analyze_assessment
\ No newline at end of file
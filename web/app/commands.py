@@ -0,0 +1,278 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+import itertools
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+
+from app.db import db
+from app.models import AssessmentStage, AssessmentStageData, PatientAssessment, ReactionTimeSummary, StageDataPoint, ZeroCrossingAnalysis
+from app.utilities.analysis_cache import cache_stats
+from app.utilities.reanalysis import REANALYZED_STAGES, WORKER_CONFIG_KEYS, init_worker, reanalyze_page, reanalyze_page_in_worker, stage_data_pages, stage_data_query
+
+stage_data_cli = AppGroup("stage-data", help="Manage stored assessment stage data.")
+analysis_cache_cli = AppGroup("analysis-cache", help="Inspect the analysis result cache.")
+reaction_summaries_cli = AppGroup("reaction-summaries", help="Manage stored reaction time summaries.")
+
+# Indexes replaced by other indexes of their table, by table name
+SUPERSEDED_INDEXES = {
+    # Upload IDs used to be unique across assessments, they now are within an assessment stage (uq_assessmentstagedata_upload)
+    "assessmentstagedata": ["ix_assessmentstagedata_upload_id"],
+}
+
+
+def add_missing_columns(model: type[db.Model]) -> list[str]:
+    """
+    Add columns of a model that are missing from its existing database table,
+    since db.create_all() only creates tables that don't exist yet.
+
+    Args:
+        model (type[db.Model]): Model whose table should be brought up to date.
+
+    Returns:
+        list[str]: Names of the added columns.
+    """
+    table = model.__table__
+    existing = {column["name"] for column in inspect(db.engine).get_columns(table.name)}
+
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        column_type = column.type.compile(dialect=db.engine.dialect)
+        db.session.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        added.append(column.name)
+
+    db.session.commit()
+    return added
+
+
+def add_missing_indexes(model: type[db.Model]) -> list[str]:
+    """
+    Create indexes of a model that are missing from its existing database table,
+    including the indexes of columns added by add_missing_columns.
+
+    Args:
+        model (type[db.Model]): Model whose table should be brought up to date.
+
+    Returns:
+        list[str]: Names of the created indexes.
+    """
+    existing = {index["name"] for index in inspect(db.engine).get_indexes(model.__table__.name)}
+
+    added = []
+    for index in model.__table__.indexes:
+        if index.name in existing:
+            continue
+        index.create(db.engine)
+        added.append(index.name)
+
+    return added
+
+
+def drop_superseded_indexes(model: type[db.Model]) -> list[str]:
+    """
+    Drop the indexes of a model's table listed in SUPERSEDED_INDEXES, which
+    db.create_all() leaves in databases created before they were replaced.
+
+    Args:
+        model (type[db.Model]): Model whose table should be brought up to date.
+
+    Returns:
+        list[str]: Names of the dropped indexes.
+    """
+    existing = {index["name"] for index in inspect(db.engine).get_indexes(model.__table__.name)}
+    dropped = [name for name in SUPERSEDED_INDEXES.get(model.__table__.name, []) if name in existing]
+
+    for name in dropped:
+        db.session.execute(text(f"DROP INDEX {name}"))
+    db.session.commit()
+    return dropped
+
+
+@click.command("upgrade-db")
+def upgrade_db():
+    """
+    Create missing tables, add missing columns and indexes to existing tables and drop their superseded indexes.
+    """
+    db.create_all()
+    for mapper in db.Model.registry.mappers:
+        added = add_missing_columns(mapper.class_)
+        if added:
+            click.echo(f"Added columns to {mapper.class_.__tablename__}: {', '.join(added)}")
+        dropped = drop_superseded_indexes(mapper.class_)
+        if dropped:
+            click.echo(f"Dropped indexes from {mapper.class_.__tablename__}: {', '.join(dropped)}")
+        added = add_missing_indexes(mapper.class_)
+        if added:
+            click.echo(f"Added indexes to {mapper.class_.__tablename__}: {', '.join(added)}")
+    click.echo("Database schema is up to date.")
+
+
+@stage_data_cli.command("pack")
+@click.option("--batch-size", default=100, show_default=True, help="Number of stages converted per commit.")
+def pack_stage_data(batch_size: int):
+    """
+    Convert StageDataPoint rows into packed per-stage sample blobs.
+    """
+    added = add_missing_columns(AssessmentStageData)
+    if added:
+        click.echo(f"Added columns to {AssessmentStageData.__tablename__}: {', '.join(added)}")
+
+    pending = db.session.query(AssessmentStageData.id).filter(
+        AssessmentStageData.packed_samples.is_(None),
+        db.session.query(StageDataPoint.id).filter(StageDataPoint.sensor_id == AssessmentStageData.id).exists()
+    )
+
+    converted = 0
+    last_id = 0
+    while True:
+        ids = [row.id for row in pending.filter(AssessmentStageData.id > last_id)
+                                        .order_by(AssessmentStageData.id).limit(batch_size)]
+        if not ids:
+            break
+
+        for stage_data in db.session.query(AssessmentStageData).filter(AssessmentStageData.id.in_(ids)):
+            stage_data.pack_points()
+        db.session.commit()
+
+        converted += len(ids)
+        last_id = ids[-1]
+        click.echo(f"Packed {converted} stages...")
+
+    click.echo(f"Done. Packed {converted} stages.")
+
+
+@stage_data_cli.command("pack-peaks")
+@click.option("--batch-size", default=100, show_default=True, help="Number of analyses converted per commit.")
+def pack_peak_indices(batch_size: int):
+    """
+    Convert PeakIndex and TroughIndex rows into packed per-analysis blobs with peak and trough counts.
+    """
+    added = add_missing_columns(ZeroCrossingAnalysis)
+    if added:
+        click.echo(f"Added columns to {ZeroCrossingAnalysis.__tablename__}: {', '.join(added)}")
+
+    pending = db.session.query(ZeroCrossingAnalysis.id).filter(ZeroCrossingAnalysis.packed_peaks.is_(None))
+
+    converted = 0
+    last_id = 0
+    while True:
+        ids = [row.id for row in pending.filter(ZeroCrossingAnalysis.id > last_id)
+                                        .order_by(ZeroCrossingAnalysis.id).limit(batch_size)]
+        if not ids:
+            break
+
+        for analysis in db.session.query(ZeroCrossingAnalysis).filter(ZeroCrossingAnalysis.id.in_(ids)):
+            analysis.pack_positions()
+        db.session.commit()
+
+        converted += len(ids)
+        last_id = ids[-1]
+        click.echo(f"Packed {converted} analyses...")
+
+    click.echo(f"Done. Packed {converted} analyses.")
+
+
+@reaction_summaries_cli.command("backfill")
+@click.option("--batch-size", default=100, show_default=True, help="Number of assessments summarized per commit.")
+def backfill_reaction_summaries(batch_size: int):
+    """
+    Store the reaction time summaries of finished assessments that don't have one yet.
+    """
+    db.create_all()
+
+    has_summary = db.session.query(ReactionTimeSummary.id).filter(ReactionTimeSummary.assessment_id == PatientAssessment.id).exists()
+    pending = db.session.query(PatientAssessment.id).filter(PatientAssessment.reaction_records.isnot(None), ~has_summary)
+
+    summarized = 0
+    last_id = 0
+    while True:
+        ids = [row.id for row in pending.filter(PatientAssessment.id > last_id)
+                                        .order_by(PatientAssessment.id).limit(batch_size)]
+        if not ids:
+            break
+
+        for assessment in db.session.query(PatientAssessment).filter(PatientAssessment.id.in_(ids)):
+            assessment.summarize_reactions()
+        db.session.commit()
+
+        summarized += len(ids)
+        last_id = ids[-1]
+        click.echo(f"Summarized {summarized} assessments...")
+
+    click.echo(f"Done. Summarized {summarized} assessments.")
+
+
+@analysis_cache_cli.command("stats")
+def analysis_cache_stats():
+    """
+    Show the number of entries, hits and misses of the analysis result cache.
+    """
+    for kind, stats in cache_stats().items():
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = f"{stats['hits'] / lookups:.1%}" if lookups else "n/a"
+        click.echo(f"{kind}: {stats['entries']} entries, {stats['hits']} hits, {stats['misses']} misses, hit rate {hit_rate}")
+
+
+@click.command("reanalyze")
+@click.option("--stage", "stage_value", type=click.Choice([stage.value for stage in REANALYZED_STAGES]), required=True, help="Stage whose data is reanalyzed.")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Only reanalyze assessments taken from this date on.")
+@click.option("--workers", default=os.cpu_count() or 1, show_default="CPU count", help="Number of worker processes, 1 to analyze in this process.")
+@click.option("--page-size", default=50, show_default=True, help="Number of stages analyzed and written per batch.")
+@click.option("--dry-run", is_flag=True, help="Report how results would change without writing them.")
+@click.option("--no-cache", is_flag=True, help="Recompute results even if the analysis cache has them.")
+def reanalyze(stage_value: str, since: datetime | None, workers: int, page_size: int, dry_run: bool, no_cache: bool):
+    """
+    Recompute the analyses of stored stage data, e.g. after tuning or fixing an analysis.
+    """
+    stage = AssessmentStage(stage_value)
+    total = stage_data_query(stage, since).count()
+    click.echo(f"{'Comparing' if dry_run else 'Reanalyzing'} {total} {stage.value} stages with {workers} worker(s)...")
+
+    config = {key: current_app.config[key] for key in WORKER_CONFIG_KEYS}
+    if no_cache:
+        config["ANALYSIS_CACHE_SIZE"] = 0
+
+    pages = stage_data_pages(stage, since, page_size)
+    stages = samples = 0
+    changes = []
+    start = time.perf_counter()
+
+    def report(result: dict) -> None:
+        nonlocal stages, samples
+        stages += result["stages"]
+        samples += result["samples"]
+        changes.extend(result["changes"])
+        for change in result["changes"]:
+            click.echo(f"  {change}")
+        elapsed = time.perf_counter() - start
+        click.echo(f"{stages}/{total} stages, {stages / elapsed:.1f} stages/s, {samples / elapsed:,.0f} samples/s")
+
+    if workers <= 1:
+        saved = {key: current_app.config[key] for key in config}
+        current_app.config.update(config)
+        try:
+            for ids in pages:
+                report(reanalyze_page(stage, ids, dry_run))
+        finally:
+            current_app.config.update(saved)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(config,)) as executor:
+            # Keep a bounded number of pages in flight instead of reading every ID up front
+            pending = set()
+            for ids in itertools.chain(pages, [None]):
+                if ids is not None:
+                    pending.add(executor.submit(reanalyze_page_in_worker, stage.value, ids, dry_run))
+                while pending and (ids is None or len(pending) >= 2 * workers):
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report(future.result())
+
+    elapsed = time.perf_counter() - start
+    click.echo(f"Done. {'Compared' if dry_run else 'Reanalyzed'} {stages} stages ({samples:,} samples) in {elapsed:.1f} s, "
+               f"{len(changes)} changed.")
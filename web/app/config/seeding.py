@@ -135,6 +135,7 @@ def seed_patient_assessments():
                 watch_connected=False,
                 current_step = len(PatientAssessment.STEP_ORDER) - 1
             )
+            assessment.summarize_reactions()
             db.session.add(assessment)
     
     db.session.commit()
@@ -1,6 +1,9 @@
+import io
+import zlib
 from functools import wraps
-from flask import abort
+from flask import abort, current_app, request
 from flask_login import current_user, login_required
+from werkzeug.wsgi import get_input_stream
 
 def roles_required(*role_names):
     """
@@ -18,3 +21,66 @@ def roles_required(*role_names):
             return f(*args, **kwargs)
         return decorated_function
     return decorator
+
+# zlib window bits for each supported Content-Encoding
+CONTENT_ENCODING_WBITS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+
+def read_decompressed(stream, encoding: str, max_size: int, chunk_size: int = 64 * 1024) -> bytes:
+    """
+    Decompress a gzip or deflate stream chunk by chunk, never holding more than
+    max_size bytes of decompressed output.
+
+    Raises:
+        OverflowError: If the decompressed body is larger than max_size.
+        ValueError: If the stream isn't valid compressed data.
+    """
+    decompressor = zlib.decompressobj(CONTENT_ENCODING_WBITS[encoding])
+    body = bytearray()
+    try:
+        while chunk := stream.read(chunk_size):
+            while chunk:
+                # Ask for at most one byte more than allowed so an oversized body is detected
+                body += decompressor.decompress(chunk, max_size + 1 - len(body))
+                if len(body) > max_size:
+                    raise OverflowError(f"Decompressed body is larger than {max_size} bytes.")
+                chunk = decompressor.unconsumed_tail
+    except zlib.error as e:
+        raise ValueError(f"Invalid {encoding} body: {e}") from e
+
+    if not decompressor.eof:
+        raise ValueError(f"Truncated {encoding} body.")
+    return bytes(body)
+
+def decompress_request_body(f):
+    """
+    Transparently decompress request bodies sent with Content-Encoding gzip or deflate,
+    so the view can read request.json or request.get_data() as usual.
+    The decompressed size is capped by the MAX_DECOMPRESSED_BODY_SIZE config value.
+    Usage: @decompress_request_body below the route decorator
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        encoding = request.headers.get("Content-Encoding", "identity").strip().lower()
+
+        if encoding != "identity":
+            if encoding not in CONTENT_ENCODING_WBITS:
+                abort(415)  # unsupported media type
+
+            compressed = get_input_stream(request.environ, max_content_length=request.max_content_length)
+            try:
+                body = read_decompressed(compressed, encoding, current_app.config["MAX_DECOMPRESSED_BODY_SIZE"])
+            except OverflowError:
+                abort(413)  # content too large
+            except ValueError:
+                abort(400)  # bad request
+
+            # Hand the decompressed body to the request as if it had been sent uncompressed
+            request.environ["wsgi.input"] = io.BytesIO(body)
+            request.environ["CONTENT_LENGTH"] = str(len(body))
+            request.environ.pop("HTTP_CONTENT_ENCODING", None)
+
+        return f(*args, **kwargs)
+    return decorated_function
@@ -1,11 +1,14 @@
 import json
 import time
-from flask import Blueprint, jsonify, render_template, request, session, redirect, url_for, flash
+from flask import Blueprint, current_app, jsonify, render_template, request, session, redirect, url_for, flash
 from flask_login import login_required, current_user
 from datetime import datetime
-from app.decorators import roles_required
-from app.models import AssessmentStage, AssessmentStageData, MemoryAnalysis, Role, PatientAssessment, Patient, User, Physician, ZeroCrossingAnalysis
-from app.utilities.utils import get_patient_assessment_data, get_patient_information, get_gait_zero_crossing
+from app.decorators import decompress_request_body, roles_required
+from app.models import AssessmentStage, AssessmentStageData, PatientAssessment, Patient, User, Physician, ZeroCrossingAnalysis
+from app.utilities.assessment_history import assessment_page, parse_fields
+from app.utilities.downsampling import DEFAULT_WIDTH, downsampled_signal
+from app.utilities.roster import can_view_patient, current_physician_roster
+from app.utilities.utils import get_patient_assessment_data, get_patient_information, get_gait_zero_crossing, get_reaction_analyses
 from app.db import db
 
 main = Blueprint('main', __name__)
@@ -17,8 +20,7 @@ def index():
     if current_user.is_authenticated:
         if current_user.has_role('Physician'):
             physician = True
-            physician_profile = current_user.physician_profile
-            patient_count = len(physician_profile.patients)
+            patient_count = len(current_physician_roster())
             return render_template('home.html', name=current_user.name, roles=current_user.roles, physician=physician, count=patient_count)
         elif current_user.has_role('Patient'):
             patient = current_user.patient_profile
@@ -72,7 +74,7 @@ def profile():
         gender = request.form['gender']
         weight = request.form['weight']
 
-        patient_to_update = Patient.query.filter_by(user_id=current_user.id).first()
+        patient_to_update = current_user.patient_profile
 
         patient_to_update.age = age
         patient_to_update.height = height
@@ -89,10 +91,8 @@ def profile():
         if current_user.has_role('Physician'):
             return render_template('profile.html', name=current_user.name, roles=current_user.roles)
         if current_user.has_role('Patient'):
-            age = Patient.query.filter_by(user_id=current_user.id).first().age
-            height = Patient.query.filter_by(user_id=current_user.id).first().height
-            gender = Patient.query.filter_by(user_id=current_user.id).first().gender
-            weight = Patient.query.filter_by(user_id=current_user.id).first().weight
+            patient = current_user.patient_profile
+            age, height, gender, weight = patient.age, patient.height, patient.gender, patient.weight
             return render_template('profile.html', name=current_user.name, roles=current_user.roles, age=age, height=height, gender=gender, weight=weight, patient=True)
         else:
             return render_template('profile.html', name=current_user.name, roles=current_user.roles)
@@ -101,31 +101,23 @@ def profile():
 @login_required
 def patient_details():
     if current_user.has_role('Physician'):
-        # Find the Role object for 'Patient'
-        patient_role = Role.query.filter_by(name='Patient').first()
-
-        physician_profile = current_user.physician_profile
-        if patient_role:
-            # Get all users that have this role
-            patients = physician_profile.patients
-            # Get patient assessments
-            patient_assessments = []
-            for p in patients:
-                patient_assessments += p.assessments
-        else:
-            patients = []
-
         patient_id = request.args.get('patient_id', type=int)
 
         if patient_id:
-            results, chart_data = get_patient_assessment_data(patient_id)
+            # Later pages of the table are fetched from the assessment history API
+            results, next_cursor = assessment_page(patient_id, current_app.config["ASSESSMENT_PAGE_SIZE"])
+            chart_data = get_patient_assessment_data(patient_id)
             patient_user = User.query.join(Patient).filter(Patient.id == patient_id).first()
             patient_name = patient_user.name if patient_user else "Unknown"
             age, height, gender, weight = get_patient_information(patient_id)
 
-            return render_template('specific_patient.html',patient_id=patient_id, name=patient_name, results=results, chart_data=chart_data, age=age, gender=gender, height=height, weight=weight)
-        
-        return render_template('patient_details.html', patients=patients, patient_assessments=patient_assessments)
+            return render_template('specific_patient.html',patient_id=patient_id, name=patient_name, results=results, next_cursor=next_cursor, chart_data=chart_data, age=age, gender=gender, height=height, weight=weight)
+
+        # The roster has each patient's user and number of assessments
+        patients = current_physician_roster()
+        assessment_count = sum(patient.assessment_count for patient in patients)
+
+        return render_template('patient_details.html', patients=patients, assessment_count=assessment_count)
     
     # If patient, redirect to specific patient page
     if current_user.patient_profile:
@@ -134,9 +126,10 @@ def patient_details():
         age, height, gender, weight = get_patient_information(patient_id)
 
         # Show completed tests if any
-        results, chart_data = get_patient_assessment_data(patient_id)
+        results, next_cursor = assessment_page(patient_id, current_app.config["ASSESSMENT_PAGE_SIZE"])
+        chart_data = get_patient_assessment_data(patient_id)
 
-        return render_template('specific_patient.html', name=current_user.name, results=results, chart_data=chart_data, age=age, height=height, gender=gender, weight=weight)
+        return render_template('specific_patient.html', name=current_user.name, results=results, next_cursor=next_cursor, chart_data=chart_data, age=age, height=height, gender=gender, weight=weight)
 
 @main.route('/gait_data')
 @login_required
@@ -151,10 +144,10 @@ def gait_data():
     if not gait_data:
         return render_template('gait_data.html', assessment=assessment, date=assessment.date_taken.strftime('%d-%m-%Y'), name=name, gait_analysis=None, patient_id=patient_id)
     
-    gait_analysis = db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=gait_data.id).first()
+    gait_analysis = db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=gait_data.id).order_by(ZeroCrossingAnalysis.id).first()
 
 
-    return render_template('gait_data.html', assessment=assessment, date=assessment.date_taken.strftime('%d-%m-%Y'), name=name, gait_analysis=gait_analysis, patient_id=patient_id)
+    return render_template('gait_data.html', assessment=assessment, date=assessment.date_taken.strftime('%d-%m-%Y'), name=name, gait_analysis=gait_analysis, patient_id=patient_id, stage_data_id=gait_data.id)
 
 @main.route('/reaction_data')
 @login_required
@@ -164,17 +157,50 @@ def reaction_data():
     name = request.args.get('name', type=str)
 
     assessment = PatientAssessment.query.filter_by(id=assessment_id).first()
-    reaction_data = db.session.query(AssessmentStageData).filter_by(assessment_id=assessment_id, stage=AssessmentStage.RT_TEST.name).all()
-    
-    if not reaction_data:
-        return render_template('gait_data.html', assessment=assessment, date=assessment.date_taken.strftime('%d-%m-%Y'), name=name, gait_analysis=None, patient_id=patient_id)
-    
-    reaction_analyses = []
-    for idx, reaction_data_piece in enumerate(reaction_data):
-        reaction_analyses.append([idx, db.session.query(MemoryAnalysis).filter_by(assessment_stage_data_id=reaction_data_piece.id).first()])
+    # Every trial with its analysis in one query, see also /api/reaction_data
+    reaction_analyses = get_reaction_analyses(assessment_id)
 
     return render_template('reaction_data.html', assessment=assessment, date=assessment.date_taken.strftime('%d-%m-%Y'), name=name, reaction_analyses=reaction_analyses, patient_id=patient_id)
 
+@main.route('/api/reaction_data', methods=['GET'])
+@login_required
+def reaction_data_json():
+    assessment_id = request.args.get('assessment_id', type=int)
+
+    patient_id = db.session.query(PatientAssessment.patient_id).filter_by(id=assessment_id).scalar()
+    if patient_id is None:
+        return jsonify({"success": False, "error": "Could not find assessment"}), 404
+    if not can_view_patient(patient_id):
+        return jsonify({"success": False, "error": "Cannot view this patient's assessments"}), 403
+
+    return jsonify({"success": True, "assessmentId": assessment_id, "trials": get_reaction_analyses(assessment_id)}), 200
+
+
+@main.route('/api/stage_data/<int:stage_data_id>/signal', methods=['GET'])
+@login_required
+def stage_signal(stage_data_id):
+    row = db.session.query(AssessmentStageData, PatientAssessment.patient_id) \
+        .join(PatientAssessment, AssessmentStageData.assessment_id == PatientAssessment.id) \
+        .filter(AssessmentStageData.id == stage_data_id).first()
+    if row is None:
+        return jsonify({"success": False, "error": "Could not find stage data"}), 404
+    stage_data, patient_id = row
+    if not can_view_patient(patient_id):
+        return jsonify({"success": False, "error": "Cannot view this patient's assessments"}), 403
+
+    # The plot width in pixels, and optionally a zoom window in epoch milliseconds
+    try:
+        signal = downsampled_signal(
+            stage_data,
+            request.args.get('width', DEFAULT_WIDTH, type=int),
+            request.args.get('start', type=int),
+            request.args.get('end', type=int)
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    return jsonify({"success": True, "stageDataId": stage_data_id, "stage": stage_data.stage.name, **signal}), 200
+
 
 @main.route('/all_patients', methods=['GET', 'POST'])
 @login_required
@@ -207,29 +233,30 @@ def assessments():
     selected_patient_id = None
     selected_patient_name = None
     results = []
+    next_cursor = None
 
     if current_user.has_role('Physician'):
         # Get all patients assigned to this physician
-        patients = [p.user for p in current_user.physician_profile.patients if p.user is not None and p.user.patient_profile is not None]
+        patients = current_physician_roster()
 
         # Get the paitent id from URL query string
         selected_patient_id = request.args.get('patient_id', type=int)
 
         if selected_patient_id:
-            # Extract the patient profile ids from the physician's assigned patients
-            assigned_ids = [p.patient_profile.id for p in patients]
             # Block access if requested patient is not assigned to this physician
-            if selected_patient_id not in assigned_ids:
+            selected_patient = next((p for p in patients if p.patient_id == selected_patient_id), None)
+            if selected_patient is None:
                 return render_template('403.html'), 403
-            
-            selected_patient_name = next(p.name for p in patients if p.patient_profile.id == selected_patient_id)
 
-            results = PatientAssessment.query.filter_by(patient_id=selected_patient_id)\
-                                             .order_by(PatientAssessment.date_taken.desc()).all()
+            selected_patient_name = selected_patient.name
+
+            # Later pages are fetched from the assessment history API
+            results, next_cursor = assessment_page(selected_patient_id, current_app.config["ASSESSMENT_PAGE_SIZE"])
 
         return render_template(
             'assessments.html',
             results=results,
+            next_cursor=next_cursor,
             patients=patients,
             selected_patient_id=selected_patient_id,
             selected_patient_name=selected_patient_name
@@ -238,16 +265,36 @@ def assessments():
     # If a patient is logged in, show their own assessments
     if current_user.patient_profile:
         patient_id = current_user.patient_profile.id
-        results = PatientAssessment.query.filter_by(patient_id=patient_id)\
-                                         .order_by(PatientAssessment.date_taken.desc()).all()
+        results, next_cursor = assessment_page(patient_id, current_app.config["ASSESSMENT_PAGE_SIZE"])
+
+    return render_template('assessments.html', results=results, next_cursor=next_cursor)
+
+@main.route('/api/assessments', methods=['GET'])
+@login_required
+def assessment_history():
+    patient_id = request.args.get('patient_id', type=int)
+
+    # Patients read their own history when no patient is given
+    if patient_id is None and current_user.patient_profile:
+        patient_id = current_user.patient_profile.id
+    if patient_id is None or not can_view_patient(patient_id):
+        return jsonify({"success": False, "error": "Cannot view this patient's assessments"}), 403
+
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        limit = request.args.get('limit', current_app.config["ASSESSMENT_PAGE_SIZE"], type=int)
+        assessments, next_cursor = assessment_page(patient_id, limit, request.args.get('cursor'), fields)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
-    return render_template('assessments.html', results=results)
+    return jsonify({"success": True, "assessments": assessments, "nextCursor": next_cursor}), 200
 
 @main.route('/about')
 def about():
     return render_template('about.html')
 
 @main.route('/imu_testing/upload', methods=["POST"])
+@decompress_request_body
 def uploaded_imu_testing():
     with open("./imu_testing/imu_data_" + datetime.now().strftime("%Y%m%d%H%M%S") + ".json", "w") as json_file:
         json.dump(request.json, json_file)
@@ -1,7 +1,14 @@
-from flask import Blueprint, jsonify, render_template, session, redirect, url_for, request, flash
+from flask import Blueprint, current_app, jsonify, render_template, session, redirect, url_for, request, flash
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 import time, random
-from app.models import AssessmentStage, AssessmentStageData, PatientAssessment, Physician
+import numpy as np
+import redis
+from app.decorators import decompress_request_body
+from app.models import AssessmentStage, AssessmentStageData, PatientAssessment, ZeroCrossingAnalysis
+from app.utilities.gait_signal import WINDOW_SIZE, StreamingPeakDetector, filtered_norm, gait_rhythm, sample_rate
+from app.utilities.roster import current_physician_roster
+from app.utilities.ingest import INGEST_PERSISTED, UploadOffsetError, checked_upload_arrays, delete_peak_detector, get_spooled_upload, load_peak_detector, save_peak_detector, spool_upload, store_upload, upload_arrays, upload_resume_info, validate_upload
 from app.db import db
 
 memory_test = Blueprint('memory_test', __name__)
@@ -32,6 +39,46 @@ def fetch_assessment(join_code: str, cur_step: int | None = None) -> PatientAsse
         return db.session.query(PatientAssessment).filter(PatientAssessment.is_running == True, PatientAssessment.join_code == join_code, PatientAssessment.current_step == PatientAssessment.STEP_ORDER.index(cur_step)).first()
     return db.session.query(PatientAssessment).filter(PatientAssessment.is_running == True, PatientAssessment.join_code == join_code).first()
 
+def finish_assessment_if_complete(assessment: PatientAssessment) -> None:
+    """
+    Marks the assessment as no longer running once it reached COMPLETE and runs the analysis tasks
+    """
+    if assessment.get_current_step() == AssessmentStage.COMPLETE.value:
+        assessment.is_running = False
+        db.session.commit()
+        assessment.run_celery_tasks()
+
+def fetch_upload(join_code: str, stage: AssessmentStage, upload_id: str | None) -> AssessmentStageData | None:
+    """
+    Gets the stage data created by an upload ID for the assessment with the given join code,
+    whether or not the assessment is still running, preferring the latest assessment as join codes are reused
+    """
+    if upload_id is None:
+        return None
+    return db.session.query(AssessmentStageData).join(PatientAssessment, AssessmentStageData.assessment_id == PatientAssessment.id).filter(
+        AssessmentStageData.upload_id == upload_id, AssessmentStageData.stage == stage, PatientAssessment.join_code == join_code
+    ).order_by(AssessmentStageData.id.desc()).first()
+
+def fetch_stream(join_code: str, stage: AssessmentStage, stream_id: int | None) -> AssessmentStageData | None:
+    """
+    Gets a chunked upload stream of the assessment with the given join code, whether or not the assessment is still running
+    """
+    if stream_id is None:
+        return None
+    return db.session.query(AssessmentStageData).join(PatientAssessment, AssessmentStageData.assessment_id == PatientAssessment.id).filter(
+        AssessmentStageData.id == stream_id, AssessmentStageData.stage == stage, PatientAssessment.join_code == join_code
+    ).first()
+
+def discard_peak_detector(stream_id: int) -> None:
+    """
+    Drops the streaming peak detector of a stream. If Redis can't be reached the state is left to expire,
+    and since it missed readings the sample count checks of the next chunk and of finalize ignore it
+    """
+    try:
+        delete_peak_detector(stream_id)
+    except redis.exceptions.RedisError as e:
+        current_app.logger.warning("Could not drop the peak detector of stream %s: %s", stream_id, e)
+
 
 ##############
 # START TEST #
@@ -124,24 +171,232 @@ def watch_get_status(join_code: str):
     return jsonify({"experimentID": assessment.join_code, "stage": assessment.get_current_step()}), 200
 
 @memory_test.route('/<join_code>/<stage>/upload', methods = ["POST"])
+@decompress_request_body
 def watch_upload_data(join_code: str, stage: str):   
+    """
+    Stores the readings of a stage, sent either as JSON or, when the Content-Type
+    is UPLOAD_CONTENT_TYPE, in the binary wire format of app/utilities/sample_packing.py
+
+    Uploads carrying an uploadId (in their metadata or the X-Upload-Id header) are
+    idempotent: retries are acknowledged without storing the readings again, and
+    a body sent with a sampleOffset resumes the upload from that reading.
+
+    With ASYNC_INGEST enabled the validated body is spooled in Redis and persisted
+    by the persist_upload Celery task, and 202 is returned with an ingestId that
+    can be polled at /ingest/<ingest_id>.
+    """
     stage = AssessmentStage(stage)
+    body = request.get_data()
+
+    try:
+        upload = validate_upload(body, request.mimetype, stage)
+        upload_id, sample_offset = upload_resume_info(upload, request.headers)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
     assessment = fetch_assessment(join_code)
-    json_body = request.json
-    assessment_data = AssessmentStageData.from_json(json_body, stage, assessment.id)
-    
+
+    if not assessment:
+        # Retry of the upload that completed the assessment, after its response was lost
+        stage_data = fetch_upload(join_code, stage, upload_id)
+        if stage_data and stage_data.received_samples >= sample_offset + len(upload_arrays(upload)[0]):
+            return jsonify({"success": True, "duplicate": True, "uploadId": upload_id, "receivedSamples": stage_data.received_samples}), 200
+        return jsonify({"success": False, "error": "Could not find assessment"}), 404
+
+    if current_app.config["ASYNC_INGEST"]:
+        from app.celery_tasks.tasks import persist_upload
+
+        ingest_id = spool_upload(body, request.mimetype, stage, assessment.id, upload_id, sample_offset)
+
+        # Analysis is started by the task that persists the last pending upload
+        if assessment.get_current_step() == AssessmentStage.COMPLETE.value:
+            assessment.is_running = False
+            db.session.commit()
+
+        persist_upload.delay(ingest_id)
+        return jsonify({"success": True, "ingestId": ingest_id}), 202
+
+    try:
+        stage_data, received = store_upload(upload, stage, assessment.id, upload_id, sample_offset)
+        db.session.commit()
+    except UploadOffsetError as e:
+        db.session.rollback()
+        return jsonify({"success": False, "error": str(e), "uploadId": upload_id, "receivedSamples": e.received_samples}), 409
+    except IntegrityError:
+        # A concurrent request with the same uploadId created the stage data first
+        db.session.rollback()
+        stage_data, received = store_upload(upload, stage, assessment.id, upload_id, sample_offset)
+        db.session.commit()
+
     # If its at complete, finalize and set running to false
-    if (assessment.get_current_step() == AssessmentStage.COMPLETE.value):
-        assessment.is_running = False
-        db.session.add(assessment)
+    finish_assessment_if_complete(assessment)
+
+    if upload_id is None:
+        return jsonify({"success": True}), 200
+    return jsonify({"success": True, "duplicate": received == 0, "uploadId": upload_id, "receivedSamples": stage_data.received_samples}), 200
+
+@memory_test.route('/<join_code>/<stage>/upload/<upload_id>', methods = ["GET"])
+def watch_upload_status(join_code: str, stage: str, upload_id: str):
+    """
+    Reports how many readings of an upload were received, so the watch can resume it
+    """
+    stage_data = fetch_upload(join_code, AssessmentStage(stage), upload_id)
+
+    if not stage_data:
+        return jsonify({"success": False, "error": "Could not find upload", "receivedSamples": 0}), 404
 
-    db.session.add(assessment_data)
+    return jsonify({
+        "success": True,
+        "uploadId": upload_id,
+        "stageDataId": stage_data.id,
+        "receivedSamples": stage_data.received_samples,
+        "storedSamples": stage_data.sample_count
+    }), 200
+
+@memory_test.route('/ingest/<ingest_id>', methods = ["GET"])
+def watch_ingest_status(ingest_id: str):
+    """
+    Reports whether an upload accepted with ASYNC_INGEST has been persisted
+    """
+    spooled = get_spooled_upload(ingest_id)
+
+    if not spooled:
+        return jsonify({"success": False, "error": "Could not find upload"}), 404
+
+    entry, _ = spooled
+    response = {"ingestId": ingest_id, "status": entry["status"], "persisted": entry["status"] == INGEST_PERSISTED}
+    if "stage_data_id" in entry:
+        response["stageDataId"] = int(entry["stage_data_id"])
+    if "error" in entry:
+        response["error"] = entry["error"]
+
+    return jsonify(response), 200
+
+@memory_test.route('/<join_code>/<stage>/upload/chunk', methods = ["POST"])
+@decompress_request_body
+def watch_upload_chunk(join_code: str, stage: str):
+    """
+    Appends one sequence-numbered chunk of readings to a chunked upload.
+
+    The first chunk (seq 0) opens a new stream and the returned streamId must be sent
+    with every following chunk. Chunks that were already received are acknowledged
+    without being stored again, and chunks received out of order are rejected with
+    the sequence number the server expects next.
+    """
+    stage = AssessmentStage(stage)
+
+    try:
+        upload = validate_upload(request.get_data(), request.mimetype, stage)
+        if not isinstance(upload, dict):
+            raise ValueError("Chunks must be sent as JSON")
+        columns = checked_upload_arrays(upload)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    metadata = upload.get("metadata") or {}
+    seq = metadata.get("seq")
+
+    if not isinstance(seq, int) or isinstance(seq, bool) or seq < 0:
+        return jsonify({"success": False, "error": "Chunk is missing a valid seq"}), 400
+
+    assessment = fetch_assessment(join_code)
+
+    if not assessment:
+        return jsonify({"success": False, "error": "Could not find assessment"}), 404
+
+    if seq == 0 and metadata.get("streamId") is None:
+        packed = current_app.config["STAGE_DATA_STORAGE"] == AssessmentStageData.STORAGE_PACKED
+        stream = AssessmentStageData.create_stream(stage, assessment.id, packed)
+        db.session.add(stream)
+    else:
+        stream = db.session.query(AssessmentStageData).filter_by(id=metadata.get("streamId"), assessment_id=assessment.id, stage=stage).first()
+
+        if not stream:
+            return jsonify({"success": False, "error": "Could not find upload stream"}), 404
+        if stream.is_finalized:
+            return jsonify({"success": False, "error": "Upload stream is already finalized"}), 409
+
+    if seq < stream.next_chunk_seq:
+        # Retransmission of a chunk that was already stored
+        return jsonify({"success": True, "duplicate": True, "streamId": stream.id, "nextSeq": stream.next_chunk_seq}), 200
+
+    if seq > stream.next_chunk_seq:
+        return jsonify({"success": False, "error": "Chunk received out of order", "streamId": stream.id, "nextSeq": stream.next_chunk_seq}), 409
+
+    readings = stream.append_arrays(*columns)
+    stream.next_chunk_seq += 1
     db.session.commit()
 
-    if not assessment.is_running:
-        assessment.run_celery_tasks()
+    # Detect GAIT peaks as chunks arrive, so the analysis is ready when the stream is finalized.
+    # The detector works on the raw readings, so it's skipped when analyses resample them.
+    if stage == AssessmentStage.GAIT and current_app.config["STREAMING_PEAK_DETECTION"] and not current_app.config["RESAMPLE_RATE_HZ"]:
+        try:
+            detector = StreamingPeakDetector() if seq == 0 else load_peak_detector(stream.id)
+            # A detector that missed a chunk would find the wrong peaks, so it's dropped
+            if detector and detector.samples == stream.sample_count - len(readings[0]):
+                detector.update(*readings)
+                save_peak_detector(stream.id, detector)
+            elif detector:
+                delete_peak_detector(stream.id)
+        except redis.exceptions.RedisError as e:
+            # The chunk is already stored, so it's acknowledged and analyze_assessment analyzes the stream instead
+            current_app.logger.warning("Dropping the peak detector of stream %s: %s", stream.id, e)
+            discard_peak_detector(stream.id)
+
+    return jsonify({"success": True, "streamId": stream.id, "nextSeq": stream.next_chunk_seq}), 200
+
+@memory_test.route('/<join_code>/<stage>/upload/finalize', methods = ["POST"])
+def watch_finalize_upload(join_code: str, stage: str):
+    """
+    Closes a chunked upload so that its readings are included in the analysis.
 
-    return jsonify({"success": True}), 200
+    Finalizing is idempotent: a retry for a stream that is already finalized gets the
+    same response, even after finalizing the last stage stopped the assessment.
+    """
+    stage = AssessmentStage(stage)
+    stream_id = (request.json or {}).get("streamId")
+    stream = fetch_stream(join_code, stage, stream_id)
+
+    if not stream:
+        return jsonify({"success": False, "error": "Could not find upload stream"}), 404
+
+    if stream.is_finalized:
+        return jsonify({"success": True, "streamId": stream.id, "samples": stream.sample_count}), 200
+
+    assessment = fetch_assessment(join_code)
+
+    if not assessment or assessment.id != stream.assessment_id:
+        return jsonify({"success": False, "error": "Could not find assessment"}), 404
+
+    stream.is_finalized = True
+
+    # Without a detector, e.g. if its state expired, analyze_assessment analyzes the stream instead
+    try:
+        detector = load_peak_detector(stream.id) if stage == AssessmentStage.GAIT else None
+    except redis.exceptions.RedisError as e:
+        current_app.logger.warning("Could not load the peak detector of stream %s: %s", stream.id, e)
+        detector = None
+    if detector and detector.samples == stream.sample_count:
+        from app.celery_tasks.peak_identification import gait_fingerprint
+
+        packed = current_app.config["PEAK_INDEX_STORAGE"] == ZeroCrossingAnalysis.STORAGE_PACKED
+        analysis = ZeroCrossingAnalysis.from_peaks(
+            stream.id, detector.peaks, detector.peak_timestamps, detector.troughs, detector.trough_timestamps, packed
+        )
+        # The rhythm features need the whole signal, which the detector doesn't keep
+        timestamps, x, y, z = stream.as_arrays()
+        analysis.set_rhythm(*gait_rhythm(filtered_norm(x, y, z, WINDOW_SIZE), np.zeros(1, dtype=np.int64), sample_rate(timestamps)))
+        # Lets identify_peaks recognize the analysis instead of adding another one
+        analysis.fingerprint = gait_fingerprint(timestamps, x, y, z)
+        db.session.add(analysis)
+    db.session.commit()
+
+    if detector:
+        discard_peak_detector(stream.id)
+
+    finish_assessment_if_complete(assessment)
+
+    return jsonify({"success": True, "streamId": stream.id, "samples": stream.sample_count}), 200
 
 #################
 # GAIT ANALYSIS #
@@ -317,6 +572,7 @@ def memory_result():
     assessment.avg_reaction_time = avg_reaction
     assessment.reaction_records = reaction_records
     assessment.memory_accuracy = (assessment.score/assessment.total_rounds)*100
+    assessment.summarize_reactions()
 
     assessment.increment_step()
 
@@ -342,9 +598,9 @@ def memory_test_customization():
     selected_id = None
 
     if current_user.has_role('Physician'):
-        patients = [p.user for p in current_user.physician_profile.patients if p.user is not None and p.user.patient_profile is not None] 
+        patients = current_physician_roster()
         if patients:
-            selected_id = patients[0].patient_profile.id
+            selected_id = patients[0].patient_id
 
     else:
         patients = []
@@ -364,7 +620,7 @@ def confirm_memory_test_configuration():
     if current_user.has_role('Physician'):
         # if user is physician, use the selected patient from session
         patient_id = int(request.form['patient_id'])
-        if patient_id not in [p.id for p in db.session.get(Physician, current_user.physician_profile.id).patients]:
+        if patient_id not in [p.patient_id for p in current_physician_roster()]:
             return memory_test_customization()
     else:
         # patient is performing their own test, use their own id from db/login
@@ -1,18 +1,76 @@
 from datetime import datetime, timezone, timedelta
 import random
+import statistics
 from zoneinfo import ZoneInfo
 import enum
+import math
 from typing import Any
+import numpy as np
 from flask_login import UserMixin
 from sqlalchemy import event
 from sqlalchemy.orm import Session
-from sqlalchemy import JSON
+from sqlalchemy import JSON, insert, select
 
 from app.db import db
+from app.utilities.sample_packing import AXIS_DTYPE, INDEX_DTYPE, pack_indices, pack_samples, unpack_indices, unpack_samples
 
 PATIENT_ROLE = "Patient"
 PHYSICIAN_ROLE = "Physician"
 
+# Columns extracted from the readings of a JSON upload
+UPLOAD_COLUMNS_DTYPE = np.dtype([("timestamp", np.int64), ("x", np.float64), ("y", np.float64), ("z", np.float64)])
+
+def local_datetimes(timestamps: np.ndarray) -> list[datetime]:
+    """
+    Convert epoch millisecond timestamps into naive local datetimes, the same
+    values datetime.fromtimestamp(ts / 1000.0) gives for each timestamp.
+
+    Args:
+        timestamps (np.ndarray): Epoch timestamps in milliseconds.
+
+    Returns:
+        list[datetime]: One naive local datetime per timestamp.
+    """
+    if not len(timestamps):
+        return []
+
+    first, last = int(timestamps.min()), int(timestamps.max())
+    offsets = [
+        datetime.fromtimestamp(ts / 1000.0) - datetime.fromtimestamp(ts / 1000.0, timezone.utc).replace(tzinfo=None)
+        for ts in (first, last)
+    ]
+
+    # A UTC offset change (DST) can't fall inside a span shorter than a day with the same offset at both ends
+    if offsets[0] != offsets[1] or last - first >= 24 * 60 * 60 * 1000:
+        return [datetime.fromtimestamp(ts / 1000.0) for ts in timestamps.tolist()]
+
+    offset_ms = offsets[0] // timedelta(milliseconds=1)
+    return (timestamps.astype("datetime64[ms]") + np.timedelta64(offset_ms, "ms")).tolist()
+
+def epoch_milliseconds(datetimes: list[datetime]) -> np.ndarray:
+    """
+    Convert naive local datetimes into epoch millisecond timestamps, the inverse of local_datetimes
+    and the same values round(dt.timestamp() * 1000) gives for each datetime.
+
+    Args:
+        datetimes (list[datetime]): Naive local datetimes.
+
+    Returns:
+        np.ndarray: int64 epoch timestamps in milliseconds.
+    """
+    if not datetimes:
+        return np.empty(0, dtype=np.int64)
+
+    microseconds = np.array(datetimes, dtype="datetime64[us]").astype(np.int64)
+    first, last = datetimes[int(microseconds.argmin())], datetimes[int(microseconds.argmax())]
+    offsets = [dt - datetime.fromtimestamp(dt.timestamp(), timezone.utc).replace(tzinfo=None) for dt in (first, last)]
+
+    # Same reasoning as local_datetimes: no UTC offset change within a short span with equal offsets at both ends
+    if offsets[0] != offsets[1] or last - first >= timedelta(days=1):
+        return np.array([round(dt.timestamp() * 1000) for dt in datetimes], dtype=np.int64)
+
+    return np.round((microseconds - offsets[0] // timedelta(microseconds=1)) / 1000).astype(np.int64)
+
 # association table for users and roles (many to many)
 roles_users = db.Table('roles_users',
     db.Column('user_id', db.Integer(), db.ForeignKey('user.id')),
@@ -86,6 +144,8 @@ class PatientAssessment(db.Model):
         return code
 
     __tablename__ = 'patientassessment'
+    # Serves a patient's history in (date_taken, id) order, see app.utilities.assessment_history
+    __table_args__ = (db.Index("ix_patientassessment_patient_date", "patient_id", "date_taken", "id"),)
     id = db.Column(db.Integer, primary_key=True)
 
     # Calculated at end
@@ -117,6 +177,8 @@ class PatientAssessment(db.Model):
     
     # set relationship with Patient so that we can access the associated Patient object from PatientAssessment
     patient = db.relationship('Patient', backref='assessments')
+    # Reaction time stats computed once the memory test finishes
+    reaction_summary = db.relationship('ReactionTimeSummary', backref='assessment', uselist=False, cascade="all, delete-orphan")
 
     STEP_ORDER = [
         AssessmentStage.WAITING, 
@@ -126,24 +188,31 @@ class PatientAssessment(db.Model):
         AssessmentStage.COMPLETE
     ]
 
-    @property
-    def local_date_taken(self):
+    @staticmethod
+    def to_local_time(date_taken: datetime | None) -> datetime | None:
         """
-        Convert stored UTC timestamp to America/Toronto time
+        Convert a stored UTC timestamp to America/Toronto time
         """
-        if not self.date_taken:
+        if not date_taken:
             return None
         
         eastern = ZoneInfo("America/Toronto")
 
         # if timezone not identifiedd, assume UTC
-        if self.date_taken.tzinfo is None:
-            utc_dt = self.date_taken.replace(tzinfo=timezone.utc)
+        if date_taken.tzinfo is None:
+            utc_dt = date_taken.replace(tzinfo=timezone.utc)
         else:
-            utc_dt = self.date_taken
+            utc_dt = date_taken
 
         return utc_dt.astimezone(eastern)
 
+    @property
+    def local_date_taken(self):
+        """
+        Convert stored UTC timestamp to America/Toronto time
+        """
+        return PatientAssessment.to_local_time(self.date_taken)
+
     def increment_step(self):
         """
         Takes the current step of the assessment and increments it up
@@ -203,25 +272,135 @@ class PatientAssessment(db.Model):
         timeval = (self.test_start - datetime.now())
         return round(timeval.total_seconds() * 1000)
         
+    def summarize_reactions(self) -> "ReactionTimeSummary":
+        """
+        Computes the reaction time summary of the stored reaction records, replacing any previous one.
+        The caller is responsible for committing.
+        """
+        if self.reaction_summary is None:
+            self.reaction_summary = ReactionTimeSummary()
+        self.reaction_summary.update_from_records(self.reaction_records or [])
+        return self.reaction_summary
+
     def run_celery_tasks(self):
         """
         Runs all celery tasks on available data.
         """
-        from app.celery_tasks.tasks import memory_analysis, identify_peaks
-        for stage_data in db.session.query(AssessmentStageData).filter_by(stage=AssessmentStage.GAIT, assessment_id=self.id).all():
-            identify_peaks.delay(stage_data.id)
-        
-        for stage_data in db.session.query(AssessmentStageData).filter_by(stage=AssessmentStage.RT_TEST, assessment_id=self.id).all():
-            memory_analysis.delay(stage_data.id)
+        from app.celery_tasks.tasks import analyze_assessment
+
+        # One task analyzes every stage, identify_peaks and memory_analysis rerun a single stage
+        analyze_assessment.delay(self.id)
 
 
 class AssessmentStageData(db.Model):
     __tablename__ = 'assessmentstagedata'
+    # Upload IDs are generated by each watch, so they only identify an upload within its assessment stage
+    __table_args__ = (db.Index("uq_assessmentstagedata_upload", "assessment_id", "stage", "upload_id", unique=True),)
+
+    # Storage backends for the sensor readings of a stage
+    STORAGE_ROWS = "rows" # one StageDataPoint row per reading
+    STORAGE_PACKED = "packed" # one columnar blob per stage, see app/utilities/sample_packing.py
+
     id = db.Column(db.Integer, primary_key=True)
-    assessment_id = db.Column(db.Integer, db.ForeignKey('patientassessment.id'))
+    assessment_id = db.Column(db.Integer, db.ForeignKey('patientassessment.id'), index=True)
     stage = db.Column(db.Enum(AssessmentStage))
     points = db.relationship('StageDataPoint', backref='stage_data', cascade="all, delete-orphan")
-    
+    packed_samples = db.Column(db.LargeBinary)
+    sample_count = db.Column(db.Integer)
+
+    # For chunked uploads, which stay open until the watch finalizes them
+    is_finalized = db.Column(db.Boolean, default=True)
+    next_chunk_seq = db.Column(db.Integer, default=0)
+    start_timestamp_ms = db.Column(db.BigInteger)
+
+    # For uploads carrying a client generated ID, so retries and resumes can be matched to the stage
+    upload_id = db.Column(db.String(64))
+    received_samples = db.Column(db.Integer)
+
+    @staticmethod
+    def reading_timestamp(point: dict[str, Any]) -> int:
+        """
+        Get the epoch millisecond timestamp of a reading. The watch serializes it
+        as "timestamp", while DTOs following the Kotlin @SerialName use "ts".
+        """
+        return point["timestamp"] if "timestamp" in point else point["ts"]
+
+    @classmethod
+    def upload_columns(cls, json_data: dict[str, Any]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Extract the timestamp and x, y, z columns of an upload in a single pass over its readings.
+
+        Args:
+            json_data (dict[str, Any]): JSON data containing assessment stage information.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: int64 epoch
+            timestamps in milliseconds and float64 x, y and z arrays, in upload order.
+        """
+        readings = json_data["data"]
+        columns = np.fromiter(
+            ((cls.reading_timestamp(point), point["x"], point["y"], point["z"]) for point in readings),
+            dtype=UPLOAD_COLUMNS_DTYPE,
+            count=len(readings)
+        )
+        return columns["timestamp"], columns["x"], columns["y"], columns["z"]
+
+    @classmethod
+    def reading_arrays(cls, json_data: dict[str, Any], stage: AssessmentStage, initial_ts_ms: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Parse the kept readings of an upload into millisecond timestamp and x, y, z arrays.
+
+        Args:
+            json_data (dict[str, Any]): JSON data containing assessment stage information.
+            stage (AssessmentStage): Stage the readings were recorded in.
+            initial_ts_ms (int | None): Timestamp of the first reading of the stage, when
+                the upload continues a stage that already has readings.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Kept readings, in upload order.
+        """
+        timestamps, x, y, z = cls.upload_columns(json_data)
+        keep = cls.kept_mask(timestamps, stage, initial_ts_ms)
+        if keep.all():
+            return timestamps, x, y, z
+        return timestamps[keep], x[keep], y[keep], z[keep]
+
+    @staticmethod
+    def point_rows(timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> list[dict[str, Any]]:
+        """
+        Convert reading arrays into StageDataPoint column values.
+
+        Args:
+            timestamps (np.ndarray): Epoch timestamps in milliseconds.
+            x, y, z (np.ndarray): Acceleration along each axis.
+
+        Returns:
+            list[dict[str, Any]]: One dictionary of column values per reading.
+        """
+        return [
+            {
+                "timestamp": ts,
+                "x": x_val,
+                "y": y_val,
+                "z": z_val
+            } for ts, x_val, y_val, z_val in zip(local_datetimes(timestamps), x.tolist(), y.tolist(), z.tolist())
+        ]
+
+    @classmethod
+    def parse_points(cls, json_data: dict[str, Any], stage: AssessmentStage, initial_ts_ms: int | None = None) -> list[dict[str, Any]]:
+        """
+        Parse the readings of an upload into StageDataPoint column values.
+
+        Args:
+            json_data (dict[str, Any]): JSON data containing assessment stage information.
+            stage (AssessmentStage): Stage the readings were recorded in.
+            initial_ts_ms (int | None): Timestamp of the first reading of the stage, if already stored.
+
+        Returns:
+            list[dict[str, Any]]: One dictionary of column values per kept reading.
+        """
+        return cls.point_rows(*cls.reading_arrays(json_data, stage, initial_ts_ms))
+
     @classmethod
     def from_json(cls, json_data: dict[str, Any], stage: AssessmentStage, assessment_id: int) -> "AssessmentStageData":
         """
@@ -237,26 +416,308 @@ class AssessmentStageData(db.Model):
             assessment_id=assessment_id,
             stage=stage
         )
-        
-        initial_ts = None
-        skip_first_second = stage == AssessmentStage.GAIT
-        for point in json_data["data"]:
-            ts = datetime.fromtimestamp(point["timestamp"] / 1000.0)
-
-            if not initial_ts:
-                initial_ts = ts
-            elif skip_first_second and (ts - initial_ts).total_seconds() < 1:
-                # Needed because the accelerometer spikes on startup
-                continue
-
-            stage_data.points.append(StageDataPoint(
-                timestamp=ts,
-                x=point["x"],
-                y=point["y"],
-                z=point["z"]
-            ))
+
+        for row in cls.parse_points(json_data, stage):
+            stage_data.points.append(StageDataPoint(**row))
+        stage_data.sample_count = len(stage_data.points)
             
         return stage_data
+
+    @classmethod
+    def bulk_from_json(cls, json_data: dict[str, Any], stage: AssessmentStage, assessment_id: int) -> "AssessmentStageData":
+        """
+        Create an AssessmentStageData instance from JSON data, writing its points
+        with a single batched insert instead of one ORM object per reading.
+
+        The instance is added to the session and flushed so its ID can be used
+        as the foreign key of the points. The caller is responsible for committing.
+
+        Args:
+            json_data (dict[str, Any]): JSON data containing assessment stage information.
+            stage (AssessmentStage): Stage the readings were recorded in.
+            assessment_id (int): ID of the PatientAssessment the data belongs to.
+
+        Returns:
+            AssessmentStageData: The created AssessmentStageData instance.
+        """
+        rows = cls.parse_points(json_data, stage)
+        stage_data = cls(
+            assessment_id=assessment_id,
+            stage=stage,
+            sample_count=len(rows)
+        )
+        db.session.add(stage_data)
+        db.session.flush()
+
+        stage_data.bulk_insert_points(rows)
+
+        return stage_data
+
+    @classmethod
+    def packed_from_json(cls, json_data: dict[str, Any], stage: AssessmentStage, assessment_id: int) -> "AssessmentStageData":
+        """
+        Create an AssessmentStageData instance from JSON data, storing all of its
+        readings in a single packed blob instead of StageDataPoint rows.
+
+        Args:
+            json_data (dict[str, Any]): JSON data containing assessment stage information.
+            stage (AssessmentStage): Stage the readings were recorded in.
+            assessment_id (int): ID of the PatientAssessment the data belongs to.
+
+        Returns:
+            AssessmentStageData: The created AssessmentStageData instance.
+        """
+        stage_data = cls(
+            assessment_id=assessment_id,
+            stage=stage
+        )
+        stage_data.set_packed_samples(*cls.reading_arrays(json_data, stage))
+
+        return stage_data
+
+    @classmethod
+    def from_arrays(cls, timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray, stage: AssessmentStage, assessment_id: int, packed: bool) -> "AssessmentStageData":
+        """
+        Create an AssessmentStageData instance from already decoded sample arrays,
+        applying the same startup filtering as from_json.
+
+        Row storage adds the instance to the session and flushes it, like bulk_from_json.
+        The caller is responsible for committing.
+
+        Args:
+            timestamps (np.ndarray): Epoch timestamps in milliseconds.
+            x, y, z (np.ndarray): Acceleration along each axis.
+            stage (AssessmentStage): Stage the readings were recorded in.
+            assessment_id (int): ID of the PatientAssessment the data belongs to.
+            packed (bool): Whether readings are stored as a packed blob rather than rows.
+
+        Returns:
+            AssessmentStageData: The created AssessmentStageData instance.
+        """
+        keep = cls.kept_mask(timestamps, stage)
+        timestamps, x, y, z = timestamps[keep], x[keep], y[keep], z[keep]
+
+        stage_data = cls(
+            assessment_id=assessment_id,
+            stage=stage
+        )
+
+        if packed:
+            stage_data.set_packed_samples(timestamps, x, y, z)
+            return stage_data
+
+        stage_data.sample_count = len(timestamps)
+        db.session.add(stage_data)
+        db.session.flush()
+        stage_data.bulk_insert_points(cls.point_rows(timestamps, x, y, z))
+
+        return stage_data
+
+    @staticmethod
+    def kept_mask(timestamps: np.ndarray, stage: AssessmentStage, initial_ts_ms: int | None = None) -> np.ndarray:
+        """
+        Get a boolean mask of the readings to store, dropping the readings of
+        the first second of GAIT data after the initial reading.
+
+        Args:
+            timestamps (np.ndarray): Epoch timestamps in milliseconds, in upload order.
+            stage (AssessmentStage): Stage the readings were recorded in.
+            initial_ts_ms (int | None): Timestamp of the first reading of the stage, when
+                the readings continue a stage that already has readings. Otherwise the
+                first reading is the initial reading and is always kept.
+
+        Returns:
+            np.ndarray: True for every reading that should be stored.
+        """
+        keep = np.ones(len(timestamps), dtype=bool)
+        if stage != AssessmentStage.GAIT or not len(timestamps):
+            return keep
+
+        # Needed because the accelerometer spikes on startup
+        first = 0 if initial_ts_ms is not None else 1
+        cutoff_ms = (timestamps[0] if initial_ts_ms is None else initial_ts_ms) + 1000
+
+        if np.all(timestamps[1:] >= timestamps[:-1]):
+            # Readings arrive in order, so the dropped readings are a contiguous run
+            keep[first:max(first, np.searchsorted(timestamps, cutoff_ms, side="left"))] = False
+        else:
+            keep[first:] = timestamps[first:] >= cutoff_ms
+        return keep
+
+    @classmethod
+    def create_stream(cls, stage: AssessmentStage, assessment_id: int, packed: bool) -> "AssessmentStageData":
+        """
+        Create an empty AssessmentStageData that chunks of a chunked upload are appended to.
+
+        Args:
+            stage (AssessmentStage): Stage the readings are recorded in.
+            assessment_id (int): ID of the PatientAssessment the data belongs to.
+            packed (bool): Whether readings are stored as a packed blob rather than rows.
+
+        Returns:
+            AssessmentStageData: The created, unfinalized AssessmentStageData instance.
+        """
+        return cls(
+            assessment_id=assessment_id,
+            stage=stage,
+            packed_samples=pack_samples([], [], [], []) if packed else None,
+            sample_count=0,
+            is_finalized=False,
+            next_chunk_seq=0
+        )
+
+    def append_json(self, json_data: dict[str, Any]) -> int:
+        """
+        Append the readings of one chunk of a chunked upload, using the same
+        storage backend as the readings already stored for this stage.
+
+        Args:
+            json_data (dict[str, Any]): JSON data containing the readings of the chunk.
+
+        Returns:
+            int: Number of readings stored from the chunk.
+        """
+        return len(self.append_arrays(*self.upload_columns(json_data))[0])
+
+    def append_arrays(self, timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Append readings to this stage, applying the startup filtering relative to
+        the first reading ever appended to it.
+
+        Args:
+            timestamps (np.ndarray): Epoch timestamps in milliseconds, in upload order.
+            x, y, z (np.ndarray): Acceleration along each axis.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The readings that were stored.
+        """
+        initial_ts_ms = self.start_timestamp_ms
+        if initial_ts_ms is None and len(timestamps):
+            self.start_timestamp_ms = int(timestamps[0])
+
+        keep = self.kept_mask(timestamps, self.stage, initial_ts_ms)
+        timestamps, x, y, z = timestamps[keep], x[keep], y[keep], z[keep]
+
+        if self.is_packed:
+            self.set_packed_samples(*(
+                np.concatenate((old, new)) for old, new in zip(self.as_arrays(), (timestamps, x, y, z))
+            ))
+            # Return the readings at the precision they are stored with
+            return (timestamps, *(axis.astype(AXIS_DTYPE).astype(np.float64) for axis in (x, y, z)))
+
+        db.session.flush()
+        self.bulk_insert_points(self.point_rows(timestamps, x, y, z))
+        self.sample_count = (self.sample_count or 0) + len(timestamps)
+        return timestamps, x, y, z
+
+    def bulk_insert_points(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Insert StageDataPoint rows for this stage with one executemany statement.
+
+        Args:
+            rows (list[dict[str, Any]]): Column values as returned by parse_points.
+        """
+        if not rows:
+            return
+
+        db.session.execute(
+            insert(StageDataPoint.__table__),
+            [{"sensor_id": self.id, **row} for row in rows]
+        )
+
+    @property
+    def is_packed(self) -> bool:
+        """
+        Whether the readings of this stage are stored as a packed blob.
+        """
+        return self.packed_samples is not None
+
+    def set_packed_samples(self, timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> None:
+        """
+        Store the given readings as a packed blob, sorted by timestamp.
+
+        Args:
+            timestamps (np.ndarray): Epoch timestamps in milliseconds.
+            x, y, z (np.ndarray): Acceleration along each axis.
+        """
+        order = np.argsort(timestamps, kind="stable")
+        self.packed_samples = pack_samples(timestamps[order], x[order], y[order], z[order])
+        self.sample_count = len(order)
+
+    def as_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the readings of this stage as NumPy arrays sorted by timestamp,
+        regardless of the storage backend used.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: int64 epoch
+            timestamps in milliseconds and float64 x, y and z arrays.
+        """
+        if self.is_packed:
+            timestamps, x, y, z = unpack_samples(self.packed_samples)
+            return timestamps.copy(), x.astype(np.float64), y.astype(np.float64), z.astype(np.float64)
+
+        if self.id is not None:
+            # Select the columns only, instead of loading every reading as a StageDataPoint
+            return AssessmentStageData.load_arrays([self])[self.id]
+
+        # Not stored yet, so its points only exist in memory
+        rows = sorted(((point.timestamp, point.x, point.y, point.z) for point in self.points), key=lambda row: row[0])
+        timestamps, x, y, z = zip(*rows) if rows else ((), (), (), ())
+        return (
+            epoch_milliseconds(list(timestamps)),
+            np.array(x, dtype=np.float64),
+            np.array(y, dtype=np.float64),
+            np.array(z, dtype=np.float64)
+        )
+
+    @staticmethod
+    def load_arrays(stage_data: list["AssessmentStageData"]) -> dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Get the readings of several stored stages as NumPy arrays, selecting the readings
+        of every row stored stage in a single query instead of one query per stage.
+
+        Args:
+            stage_data (list[AssessmentStageData]): Stored stages to get the readings of.
+
+        Returns:
+            dict[int, tuple]: as_arrays result of each stage, by stage ID.
+        """
+        arrays = {data.id: data.as_arrays() for data in stage_data if data.is_packed}
+        row_ids = [data.id for data in stage_data if not data.is_packed]
+        if not row_ids:
+            return arrays
+
+        rows = db.session.execute(
+            select(StageDataPoint.sensor_id, StageDataPoint.timestamp, StageDataPoint.x, StageDataPoint.y, StageDataPoint.z)
+            .where(StageDataPoint.sensor_id.in_(row_ids))
+            .order_by(StageDataPoint.sensor_id, StageDataPoint.timestamp)
+        ).all()
+
+        groups = {sensor_id: [] for sensor_id in row_ids}
+        for row in rows:
+            groups[row[0]].append(row[1:])
+
+        for sensor_id, group in groups.items():
+            timestamps, x, y, z = zip(*group) if group else ((), (), (), ())
+            arrays[sensor_id] = (
+                epoch_milliseconds(list(timestamps)),
+                np.array(x, dtype=np.float64),
+                np.array(y, dtype=np.float64),
+                np.array(z, dtype=np.float64)
+            )
+        return arrays
+
+    def pack_points(self) -> None:
+        """
+        Convert the StageDataPoint rows of this stage into a packed blob and delete the rows.
+        """
+        if self.is_packed:
+            return
+
+        self.set_packed_samples(*self.as_arrays())
+        db.session.query(StageDataPoint).filter_by(sensor_id=self.id).delete(synchronize_session=False)
+        db.session.expire(self, ["points"])
     
     def to_json(self) -> dict[str, Any]:
         """
@@ -265,16 +726,17 @@ class AssessmentStageData(db.Model):
         Returns:
             dict[str, Any]: JSON representation of the AssessmentStageData.
         """
+        timestamps, x, y, z = self.as_arrays()
         return {
             "assessmentID": self.assessment_id,
             "stage": self.stage.value,
             "data": [
                 {
-                    "ts": int(point.timestamp.timestamp() * 1000),
-                    "x": point.x,
-                    "y": point.y,
-                    "z": point.z
-                } for point in self.points
+                    "ts": int(ts),
+                    "x": float(x_val),
+                    "y": float(y_val),
+                    "z": float(z_val)
+                } for ts, x_val, y_val, z_val in zip(timestamps.tolist(), x.tolist(), y.tolist(), z.tolist())
             ]
         }
         
@@ -291,14 +753,125 @@ class StageDataPoint(db.Model):
 
 class ZeroCrossingAnalysis(db.Model):
     __tablename__ = 'zerocrossinganalysis'
+
+    # Storage backends for the detected peak and trough positions
+    STORAGE_ROWS = "rows" # one PeakIndex or TroughIndex row per position
+    STORAGE_PACKED = "packed" # one int32 array blob per analysis, see pack_indices
+
     id = db.Column(db.Integer, primary_key=True)
     stage_data_id = db.Column(db.Integer, db.ForeignKey('assessmentstagedata.id'))
     peak_indices = db.relationship('PeakIndex', backref='analysis', cascade="all, delete-orphan")
     trough_indices = db.relationship('TroughIndex', backref='analysis', cascade="all, delete-orphan")
+    packed_peaks = db.Column(db.LargeBinary)
+    packed_troughs = db.Column(db.LargeBinary)
+    num_peaks = db.Column(db.Integer)
+    num_troughs = db.Column(db.Integer)
+    fingerprint = db.Column(db.String(64)) # of the analyzed readings, see app/utilities/analysis_cache.py
     avg_peak_distance = db.Column(db.Float)
     std_dev_peak_distance = db.Column(db.Float)
     avg_trough_distance = db.Column(db.Float)
     std_dev_trough_distance = db.Column(db.Float)
+    step_frequency = db.Column(db.Float) # dominant step frequency in Hz, see gait_rhythm
+    step_regularity = db.Column(db.Float)
+    stride_regularity = db.Column(db.Float)
+
+    @property
+    def is_packed(self) -> bool:
+        """
+        Whether the peak and trough positions are stored as packed blobs.
+        """
+        return self.packed_peaks is not None
+
+    def peak_positions(self) -> np.ndarray:
+        """
+        Get the positions of the peaks in the stage readings, regardless of the storage backend used.
+        """
+        if self.is_packed:
+            return unpack_indices(self.packed_peaks)
+        return np.array(sorted(peak.point_index for peak in self.peak_indices), dtype=INDEX_DTYPE)
+
+    def trough_positions(self) -> np.ndarray:
+        """
+        Get the positions of the troughs in the stage readings, regardless of the storage backend used.
+        """
+        if self.is_packed:
+            return unpack_indices(self.packed_troughs)
+        return np.array(sorted(trough.point_index for trough in self.trough_indices), dtype=INDEX_DTYPE)
+
+    def pack_positions(self) -> None:
+        """
+        Move the PeakIndex and TroughIndex rows of this analysis into packed blobs and fill in the counts.
+        """
+        peaks, troughs = self.peak_positions(), self.trough_positions()
+        self.packed_peaks = pack_indices(peaks)
+        self.packed_troughs = pack_indices(troughs)
+        self.num_peaks = len(peaks)
+        self.num_troughs = len(troughs)
+        self.peak_indices = []
+        self.trough_indices = []
+
+    @staticmethod
+    def interval_stats(timestamps: np.ndarray | list[int]) -> tuple[float, float]:
+        """
+        Get the average and standard deviation in seconds of the intervals between timestamps.
+
+        Args:
+            timestamps (np.ndarray | list[int]): Epoch timestamps in milliseconds.
+
+        Returns:
+            tuple[float, float]: Average and standard deviation, 0 without any interval.
+        """
+        intervals = np.diff(np.asarray(timestamps, dtype=np.int64)) / 1000
+        if not len(intervals):
+            return 0, 0
+        return float(np.mean(intervals)), float(np.std(intervals))
+
+    @classmethod
+    def from_peaks(cls, stage_data_id: int, peaks: list[int], peak_timestamps: np.ndarray | list[int],
+                   troughs: list[int], trough_timestamps: np.ndarray | list[int], packed: bool = True) -> "ZeroCrossingAnalysis":
+        """
+        Create a ZeroCrossingAnalysis from the positions and timestamps of detected peaks and troughs.
+
+        Args:
+            stage_data_id (int): ID of the analyzed AssessmentStageData.
+            peaks, troughs (list[int]): Positions of the peaks and troughs in the stage readings.
+            peak_timestamps, trough_timestamps (np.ndarray | list[int]): Their epoch timestamps in milliseconds.
+            packed (bool): Whether positions are stored as packed blobs rather than rows.
+
+        Returns:
+            ZeroCrossingAnalysis: The created, unsaved analysis.
+        """
+        avg_peak_distance, std_dev_peak_distance = cls.interval_stats(peak_timestamps)
+        avg_trough_distance, std_dev_trough_distance = cls.interval_stats(trough_timestamps)
+
+        analysis = cls(
+            stage_data_id=stage_data_id,
+            avg_peak_distance=avg_peak_distance,
+            std_dev_peak_distance=std_dev_peak_distance,
+            avg_trough_distance=avg_trough_distance,
+            std_dev_trough_distance=std_dev_trough_distance,
+            num_peaks=len(peaks),
+            num_troughs=len(troughs)
+        )
+        if packed:
+            analysis.packed_peaks = pack_indices(peaks)
+            analysis.packed_troughs = pack_indices(troughs)
+            return analysis
+
+        for peak in peaks:
+            analysis.peak_indices.append(PeakIndex(point_index=peak))
+        for trough in troughs:
+            analysis.trough_indices.append(TroughIndex(point_index=trough))
+        return analysis
+
+    def set_rhythm(self, step_frequency: float | None, step_regularity: float | None, stride_regularity: float | None) -> None:
+        """
+        Store the cadence and regularity features returned by gait_rhythm, with None for the missing ones.
+        """
+        self.step_frequency, self.step_regularity, self.stride_regularity = (
+            None if value is None or math.isnan(value) else value
+            for value in (step_frequency, step_regularity, stride_regularity)
+        )
 
 class PeakIndex(db.Model):
     __tablename__ = 'peakindex'
@@ -315,10 +888,75 @@ class TroughIndex(db.Model):
 class MemoryAnalysis(db.Model):
     __tablename__ = 'memoryanalysis'
     id = db.Column(db.Integer, primary_key=True)
-    assessment_stage_data_id = db.Column(db.Integer, db.ForeignKey('assessmentstagedata.id'))
+    assessment_stage_data_id = db.Column(db.Integer, db.ForeignKey('assessmentstagedata.id'), index=True)
     time_to_move = db.Column(db.Float)
     average_accl_post_threshold = db.Column(db.Float)
     max_accl = db.Column(db.Float)
+    # Trials where the acceleration never exceeded the movement threshold have no time to move or average
+    no_movement = db.Column(db.Boolean, default=False)
+    fingerprint = db.Column(db.String(64)) # of the analyzed readings, see app/utilities/analysis_cache.py
+
+class ReactionTimeSummary(db.Model):
+    __tablename__ = 'reactiontimesummary'
+    id = db.Column(db.Integer, primary_key=True)
+    assessment_id = db.Column(db.Integer, db.ForeignKey('patientassessment.id'), unique=True, nullable=False, index=True)
+    num_reactions = db.Column(db.Integer)
+    avg_reaction_time = db.Column(db.Float)
+    std_dev_reaction_time = db.Column(db.Float)
+    num_correct = db.Column(db.Integer)
+    avg_correct_time = db.Column(db.Float)
+    std_dev_correct_time = db.Column(db.Float)
+    num_incorrect = db.Column(db.Integer)
+    avg_incorrect_time = db.Column(db.Float)
+    std_dev_incorrect_time = db.Column(db.Float)
+
+    @staticmethod
+    def time_stats(times: list[float]) -> tuple[float, float]:
+        """
+        Get the average and sample standard deviation of reaction times.
+
+        Args:
+            times (list[float]): Reaction times in milliseconds.
+
+        Returns:
+            tuple[float, float]: Average and standard deviation, 0 without enough times.
+        """
+        if not times:
+            return 0, 0
+        return sum(times) / len(times), statistics.stdev(times) if len(times) > 1 else 0.0
+
+    def update_from_records(self, reaction_records: list[dict[str, Any]]) -> None:
+        """
+        Computes the stats of all, correct and incorrect reactions.
+
+        Args:
+            reaction_records (list[dict[str, Any]]): Reaction records of the assessment, with their time and correctness.
+        """
+        times = [record["time"] for record in reaction_records]
+        correct = [record["time"] for record in reaction_records if record["correct"]]
+        incorrect = [record["time"] for record in reaction_records if not record["correct"]]
+
+        self.num_reactions, self.num_correct, self.num_incorrect = len(times), len(correct), len(incorrect)
+        self.avg_reaction_time, self.std_dev_reaction_time = self.time_stats(times)
+        self.avg_correct_time, self.std_dev_correct_time = self.time_stats(correct)
+        self.avg_incorrect_time, self.std_dev_incorrect_time = self.time_stats(incorrect)
+
+    @classmethod
+    def from_records(cls, reaction_records: list[dict[str, Any]]) -> "ReactionTimeSummary":
+        """
+        Creates an unsaved summary of reaction records.
+        """
+        summary = cls()
+        summary.update_from_records(reaction_records)
+        return summary
+
+class AnalysisCacheEntry(db.Model):
+    __tablename__ = 'analysiscache'
+    id = db.Column(db.Integer, primary_key=True)
+    fingerprint = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)
+    result = db.Column(JSON, nullable=False)
+    last_used = db.Column(db.DateTime, nullable=False, index=True)
 
 # listens for new users and adds patient or physician profile based on user role
 @event.listens_for(Session, "after_flush")
@@ -0,0 +1,133 @@
+"""
+Content-addressed cache of analysis results.
+
+Each result is stored under a fingerprint of the analysis kind, its algorithm
+version, its parameters and its input arrays, so rerunning an analysis on the
+same readings, e.g. after a worker crash or for a duplicate upload, reuses the
+stored result instead of recomputing it. The least recently used entries are
+evicted once the cache holds more than ANALYSIS_CACHE_SIZE entries, and hits
+and misses are counted per kind in Redis, when it is reachable.
+"""
+from datetime import datetime
+import hashlib
+import json
+from typing import Any
+
+from flask import current_app
+import numpy as np
+import redis
+
+from app.db import db
+from app.models import AnalysisCacheEntry
+from app.utilities.ingest import get_redis
+
+STATS_KEY = "analysis_cache:stats"
+
+# Analysis kinds
+GAIT = "gait"
+MEMORY = "memory"
+
+
+def fingerprint(kind: str, version: str, params: dict[str, Any], arrays: tuple[np.ndarray, ...]) -> str:
+    """
+    Get the fingerprint of an analysis of some readings.
+
+    Args:
+        kind (str): Kind of analysis.
+        version (str): Version of the analysis algorithm, changed whenever its results change.
+        params (dict[str, Any]): JSON serializable parameters of the analysis.
+        arrays (tuple[np.ndarray, ...]): Input arrays, e.g. timestamps and axes.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([kind, version, params], sort_keys=True).encode())
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _count(kind: str, hits: int, misses: int) -> None:
+    if not hits and not misses:
+        return
+    try:
+        pipeline = get_redis().pipeline()
+        pipeline.hincrby(STATS_KEY, f"{kind}:hits", hits)
+        pipeline.hincrby(STATS_KEY, f"{kind}:misses", misses)
+        pipeline.execute()
+    except redis.exceptions.RedisError as e:
+        # The counters are only statistics, so the analysis goes on without them
+        current_app.logger.warning("Could not count analysis cache %s hits and misses: %s", kind, e)
+
+
+def cached_results(kind: str, fingerprints: list[str]) -> dict[str, Any]:
+    """
+    Look up stored results and mark them as recently used. The caller is responsible for committing.
+
+    Args:
+        kind (str): Kind of analysis, for the hit and miss counters.
+        fingerprints (list[str]): Fingerprints to look up.
+
+    Returns:
+        dict[str, Any]: Stored result by fingerprint, for the fingerprints that were found.
+    """
+    if not current_app.config["ANALYSIS_CACHE_SIZE"] or not fingerprints:
+        return {}
+
+    entries = db.session.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.fingerprint.in_(set(fingerprints))).all()
+    now = datetime.now()
+    for entry in entries:
+        entry.last_used = now
+
+    results = {entry.fingerprint: entry.result for entry in entries}
+    hits = sum(key in results for key in fingerprints)
+    _count(kind, hits, len(fingerprints) - hits)
+    return results
+
+
+def store_results(kind: str, results: dict[str, Any]) -> None:
+    """
+    Store computed results and evict the least recently used entries beyond the cache size.
+    The caller is responsible for committing.
+
+    Args:
+        kind (str): Kind of analysis.
+        results (dict[str, Any]): JSON serializable result by fingerprint.
+    """
+    size = current_app.config["ANALYSIS_CACHE_SIZE"]
+    if not size or not results:
+        return
+
+    now = datetime.now()
+    existing = {
+        row.fingerprint for row in
+        db.session.query(AnalysisCacheEntry.fingerprint).filter(AnalysisCacheEntry.fingerprint.in_(list(results)))
+    }
+    db.session.add_all(
+        AnalysisCacheEntry(fingerprint=key, kind=kind, result=result, last_used=now)
+        for key, result in results.items() if key not in existing
+    )
+    db.session.flush()
+
+    evicted = db.session.query(AnalysisCacheEntry.id).order_by(AnalysisCacheEntry.last_used.desc(), AnalysisCacheEntry.id.desc()).offset(size)
+    db.session.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.id.in_(evicted.scalar_subquery())) \
+        .delete(synchronize_session=False)
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    """
+    Get the number of entries, hits and misses of each kind of analysis.
+    """
+    counters = {key.decode(): int(value) for key, value in get_redis().hgetall(STATS_KEY).items()}
+    entries = dict(db.session.query(AnalysisCacheEntry.kind, db.func.count(AnalysisCacheEntry.id)).group_by(AnalysisCacheEntry.kind).all())
+    return {
+        kind: {
+            "entries": entries.get(kind, 0),
+            "hits": counters.get(f"{kind}:hits", 0),
+            "misses": counters.get(f"{kind}:misses", 0)
+        }
+        for kind in (GAIT, MEMORY)
+    }
@@ -0,0 +1,145 @@
+"""
+Keyset pagination of a patient's assessment history, newest first.
+
+Pages are ordered by (date_taken, id) and each page continues strictly after
+the last row of the previous one, so a page is one range read of the
+(patient_id, date_taken, id) index however long the history is, and
+assessments added while a client pages through aren't skipped or repeated.
+The cursor holds date_taken as stored rather than as a datetime, since rows
+written by the server default and by Python are stored in different formats
+and the index orders them by the stored text.
+Only the requested columns are read, never the reaction records.
+"""
+import base64
+import binascii
+import json
+from typing import Any
+
+from app.db import db
+from app.models import PatientAssessment
+
+# Fields a page can be restricted to, by the name they have in the JSON response
+ASSESSMENT_FIELDS = {
+    "id": PatientAssessment.id,
+    "date_taken": PatientAssessment.date_taken,
+    "score": PatientAssessment.score,
+    "total_rounds": PatientAssessment.total_rounds,
+    "memory_accuracy": PatientAssessment.memory_accuracy,
+    "avg_reaction_time": PatientAssessment.avg_reaction_time,
+    "difficulty": PatientAssessment.difficulty,
+    "num_shapes": PatientAssessment.num_shapes,
+    "memorization_time": PatientAssessment.memorization_time,
+}
+DEFAULT_FIELDS = ("id", "date_taken", "score", "total_rounds", "avg_reaction_time", "difficulty")
+MAX_PAGE_SIZE = 100
+
+
+# date_taken as stored, which is what the index is ordered by
+_STORED_DATE_TAKEN = db.type_coerce(PatientAssessment.date_taken, db.String)
+
+
+def encode_cursor(date_key: str, assessment_id: int) -> str:
+    """
+    Build the opaque cursor of the page after an assessment.
+
+    Args:
+        date_key (str): date_taken of the last assessment of a page, as stored.
+        assessment_id (int): ID of that assessment.
+
+    Returns:
+        str: URL safe cursor.
+    """
+    payload = json.dumps([date_key, assessment_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """
+    Read the position stored in a cursor built by encode_cursor.
+
+    Args:
+        cursor (str): Cursor sent by the client.
+
+    Returns:
+        tuple[str, int]: Stored date_taken and ID of the last assessment of the previous page.
+
+    Raises:
+        ValueError: If the cursor wasn't built by encode_cursor.
+    """
+    try:
+        date_key, assessment_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(date_key, str) or not isinstance(assessment_id, int):
+        raise ValueError("Invalid cursor")
+
+    return date_key, assessment_id
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...]:
+    """
+    Read the comma separated fields requested by the client.
+
+    Args:
+        fields (str | None): Requested fields, None or empty for DEFAULT_FIELDS.
+
+    Returns:
+        tuple[str, ...]: Requested fields, always starting with id.
+
+    Raises:
+        ValueError: If a field isn't in ASSESSMENT_FIELDS.
+    """
+    if not fields:
+        return DEFAULT_FIELDS
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ASSESSMENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return ("id", *dict.fromkeys(name for name in names if name != "id"))
+
+
+def assessment_page(patient_id: int, limit: int, cursor: str | None = None, fields: tuple[str, ...] = DEFAULT_FIELDS) -> tuple[list[dict[str, Any]], str | None]:
+    """
+    Get one page of a patient's assessments, newest first.
+
+    Args:
+        patient_id (int): ID of the Patient.
+        limit (int): Most assessments in the page, between 1 and MAX_PAGE_SIZE.
+        cursor (str | None): Cursor of the previous page, None for the first page.
+        fields (tuple[str, ...]): Fields of each assessment, see parse_fields.
+
+    Returns:
+        tuple[list[dict], str | None]: The assessments with date_taken in America/Toronto time as ISO 8601,
+        and the cursor of the next page or None if this is the last one.
+
+    Raises:
+        ValueError: If the limit is out of range or the cursor is invalid.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    columns = [ASSESSMENT_FIELDS[name] for name in fields if name not in ("id", "date_taken")]
+    query = db.session.query(_STORED_DATE_TAKEN.label("date_key"), PatientAssessment.id, PatientAssessment.date_taken, *columns) \
+        .filter(PatientAssessment.patient_id == patient_id)
+    if cursor:
+        date_key, assessment_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            _STORED_DATE_TAKEN < date_key,
+            db.and_(_STORED_DATE_TAKEN == date_key, PatientAssessment.id < assessment_id)
+        ))
+
+    # One extra row tells whether there's a next page
+    rows = query.order_by(PatientAssessment.date_taken.desc(), PatientAssessment.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1].date_key, rows[limit - 1].id) if len(rows) > limit else None
+
+    page = []
+    for row in rows[:limit]:
+        assessment = {name: getattr(row, name) for name in fields}
+        if "date_taken" in assessment:
+            local_date_taken = PatientAssessment.to_local_time(row.date_taken)
+            assessment["date_taken"] = local_date_taken.isoformat() if local_date_taken else None
+        page.append(assessment)
+
+    return page, next_cursor
@@ -0,0 +1,145 @@
+"""
+Downsampling of stage readings for plotting.
+
+A stage can hold tens of thousands of readings, far more than a plot has pixels,
+so the readings are reduced with Largest-Triangle-Three-Buckets (Steinarsson, 2013)
+before they're sent to the browser. LTTB keeps the first and last readings and,
+in each of the buckets in between, the reading forming the largest triangle with
+the reading kept in the previous bucket and the average of the next bucket, which
+preserves the peaks and troughs a plot needs. The buckets are laid out as one
+padded matrix so every channel is reduced together, with NumPy operations per
+bucket rather than per reading.
+"""
+from typing import Any
+
+import numpy as np
+
+from app.db import db
+from app.models import AssessmentStageData, ZeroCrossingAnalysis
+
+# Readings kept per channel when no width is requested
+DEFAULT_WIDTH = 1000
+# Most readings kept per channel, and peak and trough markers, whatever the recording length
+MAX_WIDTH = 4000
+
+
+def lttb_indices(timestamps: np.ndarray, values: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Select the readings kept by Largest-Triangle-Three-Buckets in each channel.
+
+    Args:
+        timestamps (np.ndarray): Timestamps of the readings, sorted.
+        values (np.ndarray): One row of values per channel, with a column per reading.
+        n_out (int): Readings kept per channel, at least 3.
+
+    Returns:
+        np.ndarray: int64 positions of the kept readings, sorted, with a row per channel.
+        Every position is kept when there are no more than n_out readings.
+
+    Raises:
+        ValueError: If n_out is less than 3.
+    """
+    if n_out < 3:
+        raise ValueError("At least 3 readings must be kept")
+
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n_channels, n = values.shape
+    if n <= n_out:
+        return np.tile(np.arange(n, dtype=np.int64), (n_channels, 1))
+
+    t = np.asarray(timestamps, dtype=np.float64)
+
+    # The readings between the first and last are split into n_out - 2 buckets of near equal size
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+
+    # Average of the bucket after each bucket, the last reading after the last bucket
+    next_t = np.append(np.add.reduceat(t[:n - 1], starts)[1:] / counts[1:], t[-1])
+    next_v = np.concatenate([np.add.reduceat(values[:, :n - 1], starts, axis=1)[:, 1:] / counts[1:], values[:, -1:]], axis=1)
+
+    # Buckets padded to the longest one by repeating their last reading, which can't change the largest area
+    positions = np.minimum(starts[:, None] + np.arange(counts.max()), ends[:, None] - 1)
+    bucket_t = t[positions]
+    bucket_v = values[:, positions]
+
+    kept = np.empty((n_channels, n_out), dtype=np.int64)
+    kept[:, 0], kept[:, -1] = 0, n - 1
+    channels = np.arange(n_channels)
+    previous_t, previous_v = np.full(n_channels, t[0]), values[:, 0]
+    for bucket in range(len(starts)):
+        # Twice the area of the triangle of the previous kept reading, each candidate and the next average
+        area = np.abs(
+            (previous_t - next_t[bucket])[:, None] * (bucket_v[:, bucket] - previous_v[:, None])
+            - (previous_t[:, None] - bucket_t[bucket]) * (next_v[:, bucket] - previous_v)[:, None]
+        )
+        chosen = positions[bucket, area.argmax(axis=1)]
+        kept[:, bucket + 1] = chosen
+        previous_t, previous_v = t[chosen], values[channels, chosen]
+
+    return kept
+
+
+def evenly_spaced(positions: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Keep at most n_out evenly spaced entries of an array, including its first and last.
+    """
+    if len(positions) <= n_out:
+        return positions
+    return positions[np.linspace(0, len(positions) - 1, n_out).astype(np.int64)]
+
+
+def downsampled_signal(stage_data: AssessmentStageData, width: int = DEFAULT_WIDTH,
+                       start_ms: int | None = None, end_ms: int | None = None) -> dict[str, Any]:
+    """
+    Get the readings of a stage downsampled to a plot width, with the peaks and troughs of its gait analysis.
+
+    Args:
+        stage_data (AssessmentStageData): Stored stage to plot.
+        width (int): Readings kept per channel, between 3 and MAX_WIDTH, usually the width of the plot in pixels.
+        start_ms, end_ms (int | None): Epoch milliseconds of the first and last readings to plot, None for the whole stage.
+
+    Returns:
+        dict: The start and end timestamps and number of readings in the window, x, y, z and norm
+        as "t" and "values" lists, and the "t" and "norm" of the peaks and troughs in the window,
+        at most width of each, empty for stages without a gait analysis.
+
+    Raises:
+        ValueError: If the width is out of range or the window ends before it starts.
+    """
+    if not 3 <= width <= MAX_WIDTH:
+        raise ValueError(f"width must be between 3 and {MAX_WIDTH}")
+    if start_ms is not None and end_ms is not None and end_ms < start_ms:
+        raise ValueError("end must not be before start")
+
+    timestamps, x, y, z = stage_data.as_arrays()
+    norm = np.sqrt(x ** 2 + y ** 2 + z ** 2)
+
+    # Readings are sorted by timestamp, so the window is a slice
+    first = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side="left"))
+    last = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side="right"))
+    window = slice(first, last)
+
+    channels = np.stack([x[window], y[window], z[window], norm[window]])
+    kept = lttb_indices(timestamps[window], channels, width)
+    series = {
+        name: {"t": timestamps[window][kept[row]].tolist(), "values": channels[row, kept[row]].tolist()}
+        for row, name in enumerate(("x", "y", "z", "norm"))
+    }
+
+    markers = {"peaks": {"t": [], "norm": []}, "troughs": {"t": [], "norm": []}}
+    # The first analysis of the stage, as on the rest of the dashboard
+    analysis = db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stage_data.id) \
+        .order_by(ZeroCrossingAnalysis.id).first()
+    if analysis is not None:
+        for name, positions in (("peaks", analysis.peak_positions()), ("troughs", analysis.trough_positions())):
+            positions = evenly_spaced(positions[(positions >= first) & (positions < last)], width)
+            markers[name] = {"t": timestamps[positions].tolist(), "norm": norm[positions].tolist()}
+
+    return {
+        "start": int(timestamps[first]) if first < last else None,
+        "end": int(timestamps[last - 1]) if first < last else None,
+        "totalSamples": last - first,
+        "series": series,
+        **markers
+    }
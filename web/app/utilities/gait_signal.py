@@ -0,0 +1,404 @@
+"""
+Signal processing for gait peak detection.
+
+Based off the algorithm from paper: 10.1109/JSEN.2016.2603163, with a minimum
+threshold on peaks and troughs to reduce false positives. find_peaks_and_troughs
+processes a whole recording, while StreamingPeakDetector processes it as chunks
+arrive and finds the same peaks and troughs. gait_rhythm derives the cadence and
+step and stride regularity from the same filtered signal.
+"""
+import math
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from app.utilities.resampling import nearest_readings, resample_uniform
+
+# Length of the moving average removed by the DC block
+WINDOW_SIZE = 20
+# Sample rate the window size and low-pass filter were designed for
+NOMINAL_RATE_HZ = 50
+# Minimum magnitude of a peak or trough
+PEAK_THRESHOLD = 0.2
+# Coefficients of the FIR low-pass filter
+LOW_PASS_TAPS = np.array([1, 2, 3, 4, 3, 2, 1]) / 16.0
+# Band searched for the dominant step frequency, in Hz
+STEP_FREQUENCY_BAND = (0.5, 3.0)
+
+# Identify cached results, see app/utilities/analysis_cache.py. Bump the version whenever results change.
+ALGORITHM_VERSION = "zero-crossing-3"
+ANALYSIS_PARAMETERS = {
+    "window_size": WINDOW_SIZE,
+    "threshold": PEAK_THRESHOLD,
+    "low_pass_taps": LOW_PASS_TAPS.tolist(),
+    "step_frequency_band": list(STEP_FREQUENCY_BAND)
+}
+
+
+def filtered_norm(x: np.ndarray, y: np.ndarray, z: np.ndarray, window_size: int) -> np.ndarray:
+    """
+    Get the DC blocked and low-pass filtered Euclidian norm of the acceleration.
+
+    Args:
+        x, y, z (np.ndarray): Acceleration along each axis.
+        window_size (int): Length of the moving average removed by the DC block.
+
+    Returns:
+        np.ndarray: Filtered signal, NaN for the first window_size + len(LOW_PASS_TAPS) - 2 readings.
+    """
+    # 1. Take Euclidian norm of each row
+    norm = pd.Series(np.linalg.norm(np.column_stack((x, y, z)), axis=1))
+
+    # 2. DC Block
+    rolling_norm = norm - norm.rolling(window=window_size, min_periods=window_size).mean()
+
+    # 3. Apply lowpass
+    return lfilter(LOW_PASS_TAPS, [1], rolling_norm.to_numpy())
+
+
+def find_peaks_and_troughs(signal: np.ndarray, threshold: float) -> tuple[list[int], list[int]]:
+    """
+    Find the peak or trough between each pair of consecutive zero crossings of a signal.
+
+    Each segment contributes its trough if the minimum has the larger magnitude and
+    exceeds the threshold, otherwise its peak if the maximum exceeds the threshold.
+    Extrema are the first occurrence within the segment, ignoring NaN values.
+
+    Zero crossings are positions in the signal with its leading NaN values dropped,
+    but segments are taken at those positions in the full signal. This matches the
+    original pandas implementation, so the stored indices of existing analyses
+    stay comparable.
+
+    Args:
+        signal (np.ndarray): Low-pass filtered signal, with NaN values where the filters had no history.
+        threshold (float): Minimum magnitude of a peak or trough.
+
+    Returns:
+        tuple[list[int], list[int]]: Positions of the peaks and troughs in the signal.
+    """
+    zero_crossings = np.flatnonzero(np.diff(np.sign(signal[~np.isnan(signal)])))
+    if len(zero_crossings) < 2:
+        return [], []
+
+    starts = zero_crossings[:-1]
+    span = signal[zero_crossings[0]:zero_crossings[-1]]
+    offsets = starts - zero_crossings[0]
+
+    # Per segment extrema, skipping NaN like Series.idxmin/idxmax
+    mins = np.fmin.reduceat(span, offsets)
+    maxs = np.fmax.reduceat(span, offsets)
+
+    # First position of each extremum within its segment
+    segment = np.repeat(np.arange(len(starts)), np.diff(zero_crossings))
+    positions = np.arange(zero_crossings[0], zero_crossings[-1])
+    sentinel = len(signal)
+    min_positions = np.minimum.reduceat(np.where(span == mins[segment], positions, sentinel), offsets)
+    max_positions = np.minimum.reduceat(np.where(span == maxs[segment], positions, sentinel), offsets)
+
+    # Segments that are all NaN have no extrema
+    valid = min_positions < sentinel
+    is_trough = valid & (np.abs(mins) > np.abs(maxs)) & (np.abs(mins) > threshold)
+    is_peak = valid & ~is_trough & (np.abs(maxs) > threshold)
+
+    return max_positions[is_peak].tolist(), min_positions[is_trough].tolist()
+
+
+def resampled_filtered_norm(timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                            rate_hz: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the filtered norm of the readings resampled onto a uniform grid, so the DC
+    block's window covers the same time whatever the watch's sample rate and jitter.
+
+    Each segment between gaps is filtered separately, with the window scaled from
+    WINDOW_SIZE at NOMINAL_RATE_HZ to the grid rate.
+
+    Args:
+        timestamps (np.ndarray): Epoch timestamps in milliseconds, sorted.
+        x, y, z (np.ndarray): Acceleration along each axis.
+        rate_hz (float): Rate of the grid.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: Grid timestamps in milliseconds, the
+        filtered signal of the segments concatenated, and the offset of each segment.
+    """
+    (grid, gx, gy, gz), offsets = resample_uniform(timestamps, x, y, z, rate_hz)
+    window_size = max(1, round(WINDOW_SIZE * rate_hz / NOMINAL_RATE_HZ))
+
+    ends = offsets[1:].tolist() + [len(grid)]
+    segments = [filtered_norm(gx[start:end], gy[start:end], gz[start:end], window_size) for start, end in zip(offsets.tolist(), ends)]
+    return grid, np.concatenate(segments) if segments else np.empty(0), offsets
+
+
+def resampled_peaks_and_troughs(timestamps: np.ndarray, grid: np.ndarray, signal: np.ndarray, offsets: np.ndarray,
+                                threshold: float = PEAK_THRESHOLD) -> tuple[list[int], list[int], np.ndarray, np.ndarray]:
+    """
+    Find peaks and troughs on each segment of a signal returned by resampled_filtered_norm.
+
+    Args:
+        timestamps (np.ndarray): Epoch timestamps in milliseconds of the readings, sorted.
+        grid, signal, offsets (np.ndarray): Grid timestamps, filtered signal and segment offsets.
+        threshold (float): Minimum magnitude of a peak or trough.
+
+    Returns:
+        tuple[list[int], list[int], np.ndarray, np.ndarray]: Positions of the readings
+        closest to the peaks and troughs, and the int64 grid timestamps of the peaks and troughs.
+    """
+    peaks, troughs = [], []
+    for start, end in zip(offsets.tolist(), offsets[1:].tolist() + [len(grid)]):
+        segment_peaks, segment_troughs = find_peaks_and_troughs(signal[start:end], threshold)
+        peaks += [start + peak for peak in segment_peaks]
+        troughs += [start + trough for trough in segment_troughs]
+
+    peak_times, trough_times = grid[peaks], grid[troughs]
+    return (
+        nearest_readings(timestamps, peak_times).tolist(),
+        nearest_readings(timestamps, trough_times).tolist(),
+        np.rint(peak_times).astype(np.int64),
+        np.rint(trough_times).astype(np.int64)
+    )
+
+
+def sample_rate(timestamps: np.ndarray) -> float:
+    """
+    Get the sample rate in Hz of readings from their median interval, NaN with fewer than 2 readings.
+    """
+    intervals = np.diff(np.asarray(timestamps, dtype=np.float64))
+    if not len(intervals) or np.median(intervals) <= 0:
+        return math.nan
+    return float(1000 / np.median(intervals))
+
+
+def _autocorrelation_peak(autocorrelation: np.ndarray, lag: float, max_lag: int) -> float:
+    """
+    Get the largest autocorrelation within a quarter of a lag around it, NaN past max_lag.
+    """
+    start, end = max(1, round(0.75 * lag)), min(round(1.25 * lag) + 1, max_lag)
+    if start >= end:
+        return math.nan
+    return float(autocorrelation[start:end].max())
+
+
+def gait_rhythm(signal: np.ndarray, offsets: np.ndarray, rate_hz: float) -> tuple[float, float, float]:
+    """
+    Get the dominant step frequency and the step and stride regularity of a filtered signal.
+
+    The power spectra of all segments are taken with rFFTs of the same length, so they
+    share frequency bins and can be summed. The dominant step frequency is the peak of
+    the summed spectrum within STEP_FREQUENCY_BAND. By the Wiener-Khinchin theorem, the
+    inverse rFFT of the summed spectrum is the autocorrelation of the segments, which
+    takes O(n log n) instead of sliding the signal over itself. The rFFT length is at
+    least twice the longest segment, so the autocorrelation doesn't wrap around.
+
+    Step and stride regularity are the peaks of the normalized, unbiased autocorrelation
+    at one and two step periods, after Moe-Nilssen and Helbostad (2004): 1 for identical steps, and a stride
+    regularity above the step regularity when left and right steps differ.
+
+    Args:
+        signal (np.ndarray): Filtered signal, with NaN values where the filters had no history.
+        offsets (np.ndarray): Offset of each segment of the signal, as returned by resampled_filtered_norm.
+        rate_hz (float): Sample rate of the signal.
+
+    Returns:
+        tuple[float, float, float]: Dominant step frequency in Hz, step regularity and
+        stride regularity, NaN when the signal is too short or flat to have them.
+    """
+    missing = (math.nan, math.nan, math.nan)
+    ends = np.append(offsets[1:], len(signal)).astype(np.int64)
+    segments = [signal[start:end] for start, end in zip(np.asarray(offsets, dtype=np.int64).tolist(), ends.tolist())]
+    segments = [segment[~np.isnan(segment)] for segment in segments]
+    segments = [segment - segment.mean() for segment in segments if len(segment) > 1]
+    if not segments or not rate_hz or math.isnan(rate_hz):
+        return missing
+
+    longest = max(len(segment) for segment in segments)
+    n_fft = 1 << (2 * longest - 1).bit_length()
+    power = np.zeros(n_fft // 2 + 1)
+    for segment in segments:
+        power += np.abs(np.fft.rfft(segment, n_fft)) ** 2
+
+    frequencies = np.fft.rfftfreq(n_fft, 1 / rate_hz)
+    band = np.flatnonzero((frequencies >= STEP_FREQUENCY_BAND[0]) & (frequencies <= STEP_FREQUENCY_BAND[1]))
+    if not len(band) or not power[band].any():
+        return missing
+    step_frequency = float(frequencies[band[np.argmax(power[band])]])
+
+    # Unbiased autocorrelation: each lag is averaged over the pairs of readings it overlaps
+    overlaps = np.zeros(longest)
+    for segment in segments:
+        overlaps[:len(segment)] += np.arange(len(segment), 0, -1)
+    autocorrelation = np.fft.irfft(power, n_fft)[:longest] / overlaps
+    autocorrelation /= autocorrelation[0]
+    step_lag = rate_hz / step_frequency
+    return (
+        step_frequency,
+        _autocorrelation_peak(autocorrelation, step_lag, longest),
+        _autocorrelation_peak(autocorrelation, 2 * step_lag, longest)
+    )
+
+
+def _sign(value: float) -> int:
+    return (value > 0) - (value < 0)
+
+
+class StreamingPeakDetector:
+    """
+    Incremental version of filtered_norm and find_peaks_and_troughs, fed with the
+    readings of a recording one chunk at a time.
+
+    Every step reproduces the batch computation exactly: the DC block keeps the same
+    running compensated sum as pandas' rolling mean, the low-pass convolves the same
+    7 inputs, and zero crossings keep their offset into the signal with its leading
+    NaN values dropped. The peaks and troughs found are therefore the ones
+    find_peaks_and_troughs finds on the whole recording.
+
+    The state is JSON serializable with to_dict, so the detector can be stored between requests.
+    """
+    def __init__(self, window_size: int = WINDOW_SIZE, threshold: float = PEAK_THRESHOLD):
+        self.window_size = window_size
+        self.threshold = threshold
+        self.samples = 0
+
+        # Rolling mean accumulator, see pandas' roll_mean
+        self.window: list[float] = []
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.same_count = 0
+        self.prev_value: float | None = None
+
+        # Last low-pass inputs, zero before the first reading like lfilter
+        self.filter_inputs = [0.0] * (len(LOW_PASS_TAPS) - 1)
+
+        # Zero crossing tracking
+        self.filtered_count = 0
+        self.last_sign: int | None = None
+        self.last_crossing: int | None = None
+
+        # Filtered values and timestamps from position segment_start, which the next segment starts at or after
+        self.segment_start = 0
+        self.segment_values: list[float] = []
+        self.segment_timestamps: list[int] = []
+
+        self.peaks: list[int] = []
+        self.peak_timestamps: list[int] = []
+        self.troughs: list[int] = []
+        self.trough_timestamps: list[int] = []
+
+    def _dc_block(self, value: float) -> float:
+        """
+        Subtract the rolling mean from the next norm, computed like pandas' roll_mean
+        """
+        if len(self.window) == self.window_size:
+            removed = self.window.pop(0)
+            if removed == removed:
+                self.nobs -= 1
+                y = -removed - self.compensation_remove
+                t = self.sum_x + y
+                self.compensation_remove = t - self.sum_x - y
+                self.sum_x = t
+                if math.copysign(1, removed) < 0:
+                    self.neg_ct -= 1
+
+        if self.prev_value is None:
+            self.prev_value = value
+        if value == value:
+            self.nobs += 1
+            y = value - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1, value) < 0:
+                self.neg_ct += 1
+            self.same_count = self.same_count + 1 if value == self.prev_value else 1
+            self.prev_value = value
+        self.window.append(value)
+
+        if self.nobs < self.window_size:
+            return math.nan
+        mean = self.sum_x / self.nobs
+        if self.same_count >= self.nobs:
+            mean = self.prev_value
+        elif self.neg_ct == 0 and mean < 0:
+            mean = 0.0
+        elif self.neg_ct == self.nobs and mean > 0:
+            mean = 0.0
+        return value - mean
+
+    def _close_segment(self, crossing: int) -> None:
+        """
+        Record the peak or trough of the segment ending at a new zero crossing
+        """
+        if self.last_crossing is not None:
+            offset = self.last_crossing - self.segment_start
+            segment = np.array(self.segment_values[offset:crossing - self.segment_start])
+
+            if not np.isnan(segment).all():
+                min_pos, max_pos = int(np.nanargmin(segment)), int(np.nanargmax(segment))
+                min_val, max_val = segment[min_pos], segment[max_pos]
+
+                if abs(min_val) > abs(max_val) and abs(min_val) > self.threshold:
+                    self.troughs.append(self.last_crossing + min_pos)
+                    self.trough_timestamps.append(self.segment_timestamps[offset + min_pos])
+                elif abs(max_val) > self.threshold:
+                    self.peaks.append(self.last_crossing + max_pos)
+                    self.peak_timestamps.append(self.segment_timestamps[offset + max_pos])
+
+        # Readings before the new crossing can't be part of a later segment
+        del self.segment_values[:crossing - self.segment_start]
+        del self.segment_timestamps[:crossing - self.segment_start]
+        self.segment_start = crossing
+        self.last_crossing = crossing
+
+    def update(self, timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[list[int], list[int]]:
+        """
+        Process the next readings of the recording.
+
+        Args:
+            timestamps (np.ndarray): Epoch timestamps in milliseconds.
+            x, y, z (np.ndarray): Acceleration along each axis.
+
+        Returns:
+            tuple[list[int], list[int]]: Positions of the peaks and troughs found in
+            these readings' segments, which lag the readings by the length of a segment.
+        """
+        known_peaks, known_troughs = len(self.peaks), len(self.troughs)
+
+        norms = np.linalg.norm(np.column_stack((x, y, z)), axis=1)
+        blocked = np.array([self._dc_block(value) for value in norms.tolist()])
+        inputs = np.concatenate((self.filter_inputs, blocked))
+        filtered = np.convolve(inputs, LOW_PASS_TAPS, mode="valid")
+        self.filter_inputs = inputs[len(inputs) - len(self.filter_inputs):].tolist()
+
+        self.samples += len(filtered)
+        self.segment_values.extend(filtered.tolist())
+        self.segment_timestamps.extend(np.asarray(timestamps).tolist())
+
+        for value in filtered.tolist():
+            if value != value:
+                continue
+            sign = _sign(value)
+            if self.last_sign is not None and sign != self.last_sign:
+                self._close_segment(self.filtered_count - 1)
+            self.last_sign = sign
+            self.filtered_count += 1
+
+        return self.peaks[known_peaks:], self.troughs[known_troughs:]
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Get the state of the detector as a JSON serializable dictionary
+        """
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, state: dict[str, Any]) -> "StreamingPeakDetector":
+        """
+        Restore a detector from the state returned by to_dict
+        """
+        detector = cls.__new__(cls)
+        vars(detector).update(state)
+        return detector
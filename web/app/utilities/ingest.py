@@ -0,0 +1,311 @@
+import json
+import os
+from functools import lru_cache
+from typing import Mapping
+from uuid import uuid4
+
+import numpy as np
+import redis
+from flask import current_app
+
+from app.db import db
+from app.models import AssessmentStage, AssessmentStageData
+from app.utilities.gait_signal import StreamingPeakDetector
+from app.utilities.sample_packing import UPLOAD_CONTENT_TYPE, decode_upload
+
+# Spooled uploads are dropped if they haven't been persisted within a day
+SPOOL_TTL_SECONDS = 24 * 60 * 60
+
+INGEST_PENDING = "pending"
+INGEST_PERSISTED = "persisted"
+INGEST_FAILED = "failed"
+
+# Headers identifying an upload, for binary bodies which have no room for them in their metadata
+UPLOAD_ID_HEADER = "X-Upload-Id"
+SAMPLE_OFFSET_HEADER = "X-Sample-Offset"
+MAX_UPLOAD_ID_LENGTH = 64
+
+
+class UploadOffsetError(ValueError):
+    """
+    Raised when an upload is resumed past the readings the server has received.
+    """
+    def __init__(self, received_samples: int):
+        super().__init__(f"Upload must be resumed from sample {received_samples}")
+        self.received_samples = received_samples
+
+
+def create_stage_data(json_body: dict, stage: AssessmentStage, assessment_id: int) -> AssessmentStageData:
+    """
+    Creates AssessmentStageData for a JSON upload using the configured storage backend
+    """
+    if current_app.config["STAGE_DATA_STORAGE"] == AssessmentStageData.STORAGE_PACKED:
+        return AssessmentStageData.packed_from_json(json_body, stage, assessment_id)
+    if current_app.config["BULK_INGEST"]:
+        return AssessmentStageData.bulk_from_json(json_body, stage, assessment_id)
+    return AssessmentStageData.from_json(json_body, stage, assessment_id)
+
+
+def validate_upload(body: bytes, mimetype: str, stage: AssessmentStage) -> dict | tuple:
+    """
+    Checks that an upload body is well formed and was recorded in the given stage.
+
+    Args:
+        body (bytes): Raw request body.
+        mimetype (str): Request mimetype, UPLOAD_CONTENT_TYPE for binary uploads.
+        stage (AssessmentStage): Stage from the upload URL.
+
+    Raises:
+        ValueError: If the body is malformed or its stage doesn't match.
+
+    Returns:
+        dict | tuple: The parsed JSON body, or the decoded binary upload.
+    """
+    if mimetype == UPLOAD_CONTENT_TYPE:
+        upload = decode_upload(body)
+        metadata = upload[0]
+    else:
+        try:
+            upload = json.loads(body)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON body: {e}") from e
+        if not isinstance(upload, dict) or not isinstance(upload.get("data"), list):
+            raise ValueError("JSON body is missing its data")
+        metadata = upload.get("metadata") or {}
+
+    if metadata.get("stage", stage.value) != stage.value:
+        raise ValueError("Upload stage does not match URL stage")
+
+    return upload
+
+
+def stage_data_from_upload(upload: dict | tuple, stage: AssessmentStage, assessment_id: int) -> AssessmentStageData:
+    """
+    Creates AssessmentStageData from an upload returned by validate_upload
+    """
+    if isinstance(upload, dict):
+        return create_stage_data(upload, stage, assessment_id)
+
+    _, timestamps, x, y, z = upload
+    packed = current_app.config["STAGE_DATA_STORAGE"] == AssessmentStageData.STORAGE_PACKED
+    return AssessmentStageData.from_arrays(timestamps, x, y, z, stage, assessment_id, packed)
+
+
+def upload_resume_info(upload: dict | tuple, headers: Mapping[str, str]) -> tuple[str | None, int]:
+    """
+    Gets the client upload ID and the sample offset of an upload, from its JSON
+    metadata ("uploadId" and "sampleOffset") or from the upload headers.
+
+    Raises:
+        ValueError: If the upload ID or offset is malformed.
+
+    Returns:
+        tuple[str | None, int]: Upload ID, or None if the upload has none, and the
+        index of the first reading of the body within the whole upload.
+    """
+    metadata = upload[0] if isinstance(upload, tuple) else upload.get("metadata") or {}
+    upload_id = metadata.get("uploadId", headers.get(UPLOAD_ID_HEADER))
+    sample_offset = metadata.get("sampleOffset", headers.get(SAMPLE_OFFSET_HEADER, 0))
+
+    if upload_id is not None and (not isinstance(upload_id, str) or not 0 < len(upload_id) <= MAX_UPLOAD_ID_LENGTH):
+        raise ValueError(f"uploadId must be a string of 1 to {MAX_UPLOAD_ID_LENGTH} characters")
+    try:
+        sample_offset = int(sample_offset)
+    except (TypeError, ValueError):
+        raise ValueError("sampleOffset must be an integer") from None
+    if sample_offset < 0 or (sample_offset and upload_id is None):
+        raise ValueError("sampleOffset must be non-negative and sent with an uploadId")
+
+    return upload_id, sample_offset
+
+
+def upload_arrays(upload: dict | tuple) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gets all readings of an upload returned by validate_upload as arrays, before startup filtering
+    """
+    if isinstance(upload, dict):
+        return AssessmentStageData.upload_columns(upload)
+    return upload[1:]
+
+
+def checked_upload_arrays(upload: dict | tuple) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gets all readings of an upload returned by validate_upload as arrays, checking that each
+    reading has a timestamp and finite x, y and z values.
+
+    Raises:
+        ValueError: If a reading is incomplete, isn't numeric or isn't finite.
+    """
+    try:
+        timestamps, x, y, z = upload_arrays(upload)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed reading: {e}") from e
+    if not (np.isfinite(x).all() and np.isfinite(y).all() and np.isfinite(z).all()):
+        raise ValueError("Readings must have finite x, y and z values")
+    return timestamps, x, y, z
+
+
+def find_upload(assessment_id: int, stage: AssessmentStage, upload_id: str) -> AssessmentStageData | None:
+    """
+    Gets the stage data created by the upload with the given client upload ID in an assessment stage
+    """
+    return db.session.query(AssessmentStageData).filter_by(assessment_id=assessment_id, stage=stage, upload_id=upload_id).first()
+
+
+def store_upload(upload: dict | tuple, stage: AssessmentStage, assessment_id: int,
+                 upload_id: str | None = None, sample_offset: int = 0) -> tuple[AssessmentStageData, int]:
+    """
+    Stores an upload, deduplicating retries and resuming partial uploads by upload ID.
+
+    The first body of an upload ID creates its AssessmentStageData. Later bodies only
+    append the readings past the ones already received, so a retried body is ignored
+    and a body overlapping the received readings only stores its new readings.
+    The caller is responsible for committing.
+
+    Args:
+        upload (dict | tuple): Upload returned by validate_upload.
+        stage (AssessmentStage): Stage from the upload URL.
+        assessment_id (int): ID of the PatientAssessment the data belongs to.
+        upload_id (str | None): Client generated upload ID, or None to always create new stage data.
+        sample_offset (int): Index of the first reading of the body within the whole upload.
+
+    Raises:
+        UploadOffsetError: If the body starts past the readings received so far.
+
+    Returns:
+        tuple[AssessmentStageData, int]: Stage data of the upload and the number of
+        readings newly received from the body, 0 for a retry.
+    """
+    stage_data = find_upload(assessment_id, stage, upload_id) if upload_id is not None else None
+
+    if stage_data is None:
+        if sample_offset:
+            raise UploadOffsetError(0)
+
+        timestamps = upload_arrays(upload)[0]
+        stage_data = stage_data_from_upload(upload, stage, assessment_id)
+        if upload_id is not None:
+            stage_data.upload_id = upload_id
+            stage_data.received_samples = len(timestamps)
+            stage_data.start_timestamp_ms = int(timestamps[0]) if len(timestamps) else None
+        db.session.add(stage_data)
+        return stage_data, len(timestamps)
+
+    received = stage_data.received_samples or 0
+    if sample_offset > received:
+        raise UploadOffsetError(received)
+
+    new_columns = [column[received - sample_offset:] for column in upload_arrays(upload)]
+    if len(new_columns[0]):
+        stage_data.append_arrays(*new_columns)
+        stage_data.received_samples = received + len(new_columns[0])
+
+    return stage_data, len(new_columns[0])
+
+
+################
+# INGEST SPOOL #
+################
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    """
+    Gets the Redis client used for the ingest spool
+    """
+    return redis.Redis.from_url(os.environ["REDIS_URL"])
+
+
+def _entry_key(ingest_id: str) -> str:
+    return f"ingest:{ingest_id}"
+
+
+def _body_key(ingest_id: str) -> str:
+    return f"ingest:{ingest_id}:body"
+
+
+def _pending_key(assessment_id: int) -> str:
+    return f"ingest:assessment:{assessment_id}:pending"
+
+
+def spool_upload(body: bytes, mimetype: str, stage: AssessmentStage, assessment_id: int,
+                 upload_id: str | None = None, sample_offset: int = 0) -> str:
+    """
+    Stores a raw upload in Redis until a worker persists it with store_upload.
+
+    Returns:
+        str: ID used to track the upload.
+    """
+    ingest_id = uuid4().hex
+    pipe = get_redis().pipeline()
+    pipe.set(_body_key(ingest_id), body, ex=SPOOL_TTL_SECONDS)
+    pipe.hset(_entry_key(ingest_id), mapping={
+        "status": INGEST_PENDING,
+        "mimetype": mimetype,
+        "stage": stage.value,
+        "assessment_id": assessment_id,
+        "sample_offset": sample_offset,
+        **({"upload_id": upload_id} if upload_id is not None else {}),
+    })
+    pipe.expire(_entry_key(ingest_id), SPOOL_TTL_SECONDS)
+    pipe.incr(_pending_key(assessment_id))
+    pipe.expire(_pending_key(assessment_id), SPOOL_TTL_SECONDS)
+    pipe.execute()
+    return ingest_id
+
+
+def get_spooled_upload(ingest_id: str) -> tuple[dict, bytes | None] | None:
+    """
+    Gets the tracking entry and raw body of a spooled upload.
+
+    Returns:
+        tuple[dict, bytes | None] | None: Entry and body, or None if the ID is unknown.
+        The body is None once the upload has been persisted.
+    """
+    entry, body = get_redis().pipeline().hgetall(_entry_key(ingest_id)).get(_body_key(ingest_id)).execute()
+    if not entry:
+        return None
+    return {key.decode(): value.decode() for key, value in entry.items()}, body
+
+
+def finish_spooled_upload(ingest_id: str, assessment_id: int, status: str, **fields) -> int:
+    """
+    Records the outcome of persisting a spooled upload and drops its body.
+
+    Returns:
+        int: Number of uploads of the assessment that are still pending.
+    """
+    pipe = get_redis().pipeline()
+    pipe.hset(_entry_key(ingest_id), mapping={"status": status, **fields})
+    pipe.delete(_body_key(ingest_id))
+    pipe.decr(_pending_key(assessment_id))
+    return pipe.execute()[-1]
+
+
+########################
+# STREAMING GAIT PEAKS #
+########################
+def _peak_detector_key(stream_id: int) -> str:
+    return f"gait_peaks:{stream_id}"
+
+
+def load_peak_detector(stream_id: int) -> StreamingPeakDetector | None:
+    """
+    Gets the streaming peak detector of a chunked GAIT upload, or None if it has none
+    """
+    state = get_redis().get(_peak_detector_key(stream_id))
+    if state is None:
+        return None
+    return StreamingPeakDetector.from_dict(json.loads(state))
+
+
+def save_peak_detector(stream_id: int, detector: StreamingPeakDetector) -> None:
+    """
+    Stores the streaming peak detector of a chunked GAIT upload until its next chunk
+    """
+    get_redis().set(_peak_detector_key(stream_id), json.dumps(detector.to_dict()), ex=SPOOL_TTL_SECONDS)
+
+
+def delete_peak_detector(stream_id: int) -> None:
+    """
+    Drops the streaming peak detector of a chunked GAIT upload
+    """
+    get_redis().delete(_peak_detector_key(stream_id))
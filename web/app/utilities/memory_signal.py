@@ -0,0 +1,91 @@
+"""
+Signal processing for the memory test's reaction trials.
+
+The readings of many trials are processed together as a ragged batch: the
+readings of every trial concatenated into one set of arrays, with the offset
+of each trial's first reading.
+"""
+import numpy as np
+
+# Acceleration norm above which the patient is considered to be moving, in m/s2
+MOVEMENT_THRESHOLD = 2
+
+# Identify cached results, see app/utilities/analysis_cache.py. Bump the version whenever results change.
+ALGORITHM_VERSION = "movement-1"
+ANALYSIS_PARAMETERS = {"threshold": MOVEMENT_THRESHOLD}
+
+
+def ragged_batch(arrays: list[tuple[np.ndarray, ...]]) -> tuple[tuple[np.ndarray, ...], np.ndarray]:
+    """
+    Concatenate the readings of several trials into a ragged batch.
+
+    Args:
+        arrays (list[tuple[np.ndarray, ...]]): Timestamp and axis arrays of each trial, as returned by as_arrays.
+
+    Returns:
+        tuple[tuple[np.ndarray, ...], np.ndarray]: Concatenated arrays and the offset of each trial.
+    """
+    lengths = np.array([len(trial[0]) for trial in arrays], dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    columns = tuple(
+        np.concatenate([trial[i] for trial in arrays]) if arrays else np.empty(0)
+        for i in range(4)
+    )
+    return columns, offsets
+
+
+def movement_features(timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray, offsets: np.ndarray,
+                      threshold: float = MOVEMENT_THRESHOLD) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the movement features of every trial of a ragged batch in one vectorized pass.
+
+    For each trial, the time to move is the time from its first reading to its first
+    reading with an acceleration norm above the threshold, and the average acceleration
+    is taken over the readings from that time on. Readings of each trial must be sorted
+    by timestamp, as as_arrays returns them.
+
+    Args:
+        timestamps (np.ndarray): Concatenated epoch timestamps in milliseconds.
+        x, y, z (np.ndarray): Concatenated acceleration along each axis.
+        offsets (np.ndarray): Position of the first reading of each trial.
+        threshold (float): Acceleration norm that counts as movement.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Per trial time to move
+        in milliseconds, average acceleration after moving, max acceleration and whether
+        the trial has any movement. Features that don't exist for a trial are NaN.
+    """
+    n_trials = len(offsets)
+    lengths = np.diff(np.append(offsets, len(timestamps)))
+    nonempty = lengths > 0
+
+    time_to_move = np.full(n_trials, np.nan)
+    average_accl = np.full(n_trials, np.nan)
+    max_accl = np.full(n_trials, np.nan)
+    moved = np.zeros(n_trials, dtype=bool)
+    if not nonempty.any():
+        return time_to_move, average_accl, max_accl, moved
+
+    # reduceat can't reduce empty segments, so only the trials with readings are reduced
+    starts = offsets[nonempty]
+    trial = np.repeat(np.arange(len(starts)), lengths[nonempty])
+    positions = np.arange(len(timestamps))
+    sentinel = len(timestamps)
+
+    norm = np.sqrt(x * x + y * y + z * z)
+    max_accl[nonempty] = np.maximum.reduceat(norm, starts)
+
+    # First reading above the threshold, then the first reading sharing its timestamp
+    first_above = np.minimum.reduceat(np.where(norm > threshold, positions, sentinel), starts)
+    has_moved = first_above < sentinel
+    move_ts = timestamps[np.minimum(first_above, sentinel - 1)]
+    tail_start = np.minimum.reduceat(np.where(timestamps >= move_ts[trial], positions, sentinel), starts)
+
+    in_tail = positions >= tail_start[trial]
+    tail_sum = np.add.reduceat(np.where(in_tail, norm, 0.0), starts)
+    tail_count = np.add.reduceat(in_tail.astype(np.int64), starts)
+
+    moved[nonempty] = has_moved
+    time_to_move[nonempty] = np.where(has_moved, move_ts - timestamps[starts], np.nan)
+    average_accl[nonempty] = np.where(has_moved, tail_sum / np.maximum(tail_count, 1), np.nan)
+    return time_to_move, average_accl, max_accl, moved
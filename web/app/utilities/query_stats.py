@@ -0,0 +1,104 @@
+"""
+Counting of the SQL statements run by a block of code or a request.
+
+Listeners on every SQLAlchemy engine add each statement and its time to the
+counters that are active in the current context, so counters can be nested.
+When QUERY_BUDGET is set, every request is counted and requests running more
+statements than the budget are logged, which surfaces N+1 query patterns.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from typing import Iterator
+
+from flask import Flask, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """
+    Number, statements and total time of the SQL statements run while the counter is active.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: list[str] = []
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+
+_active_counters: ContextVar[tuple[QueryCounter, ...]] = ContextVar("active_query_counters", default=())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _active_counters.get():
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    counters = _active_counters.get()
+    start_times = conn.info.get("query_start_times")
+    if not counters or not start_times:
+        return
+
+    elapsed = time.perf_counter() - start_times.pop()
+    for counter in counters:
+        counter.count += 1
+        counter.duration += elapsed
+        counter.statements.append(statement)
+
+
+def _listen() -> None:
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """
+    Count the SQL statements run inside the with block.
+
+    Yields:
+        QueryCounter: Counter updated as statements run.
+    """
+    _listen()
+    counter = QueryCounter()
+    token = _active_counters.set(_active_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+def init_query_stats(app: Flask) -> None:
+    """
+    Count the SQL statements of every request and log the requests that run more than QUERY_BUDGET.
+
+    Args:
+        app (Flask): App whose requests are counted, a QUERY_BUDGET of None turns counting off.
+    """
+    _listen()
+
+    @app.before_request
+    def start_counting_queries():
+        if current_app.config["QUERY_BUDGET"] is not None:
+            g.query_counter = QueryCounter()
+            g.query_counter_token = _active_counters.set(_active_counters.get() + (g.query_counter,))
+
+    @app.teardown_request
+    def stop_counting_queries(exception=None):
+        counter = g.pop("query_counter", None)
+        if counter is None:
+            return
+        _active_counters.reset(g.pop("query_counter_token"))
+
+        budget = current_app.config["QUERY_BUDGET"]
+        if budget is not None and counter.count > budget:
+            current_app.logger.warning(
+                "%s %s (%s) ran %d queries in %.1f ms, over the budget of %d",
+                request.method, request.path, request.endpoint, counter.count, counter.duration_ms, budget
+            )
@@ -0,0 +1,189 @@
+"""
+Bulk re-analysis of stored stage data, used by the flask reanalyze command.
+
+Stage IDs are read in pages and each page is analyzed by a worker process with
+its own app and database connection. A worker writes the results of its page
+in one transaction, replacing the stored analyses of the page's stage data, or
+in dry-run mode only reports how the new results differ from the stored ones.
+"""
+from datetime import datetime
+import math
+from typing import Any, Iterator
+
+from flask import Flask
+
+from app.db import db
+from app.models import AssessmentStage, AssessmentStageData, MemoryAnalysis, PatientAssessment, ZeroCrossingAnalysis
+
+# Stages that have an analysis to rerun
+REANALYZED_STAGES = [AssessmentStage.GAIT, AssessmentStage.RT_TEST]
+
+# Config copied from the command's app into the worker apps
+WORKER_CONFIG_KEYS = ["SQLALCHEMY_DATABASE_URI", "PEAK_INDEX_STORAGE", "ANALYSIS_CACHE_SIZE", "RESAMPLE_RATE_HZ"]
+
+_worker_app: Flask | None = None
+
+
+def stage_data_query(stage: AssessmentStage, since: datetime | None = None):
+    """
+    Build the query of the finalized stage data to reanalyze.
+
+    Args:
+        stage (AssessmentStage): Stage whose data is reanalyzed.
+        since (datetime | None): Only include assessments taken from this date on.
+
+    Returns:
+        Query: Query selecting the stage data IDs.
+    """
+    query = db.session.query(AssessmentStageData.id).filter(
+        AssessmentStageData.stage == stage,
+        AssessmentStageData.is_finalized.isnot(False)
+    )
+    if since is not None:
+        query = query.join(PatientAssessment, AssessmentStageData.assessment_id == PatientAssessment.id) \
+            .filter(PatientAssessment.date_taken >= since)
+    return query
+
+
+def stage_data_pages(stage: AssessmentStage, since: datetime | None, page_size: int) -> Iterator[list[int]]:
+    """
+    Stream the IDs of the stage data to reanalyze in pages, without loading all of them at once.
+
+    Yields:
+        list[int]: Next page of IDs, in ascending order.
+    """
+    query = stage_data_query(stage, since)
+    last_id = 0
+    while True:
+        ids = [row.id for row in query.filter(AssessmentStageData.id > last_id)
+                                      .order_by(AssessmentStageData.id).limit(page_size)]
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def init_worker(config: dict[str, Any]) -> None:
+    """
+    Create the app of a worker process, which gives the worker its own database connection.
+
+    Args:
+        config (dict[str, Any]): Config of the command's app, see WORKER_CONFIG_KEYS.
+    """
+    global _worker_app
+    from app import create_app
+
+    # Passed to create_app rather than set afterwards, so the worker connects to the command's database
+    _worker_app = create_app(config_overrides=config)
+
+
+def reanalyze_page_in_worker(stage_value: str, ids: list[int], dry_run: bool) -> dict[str, Any]:
+    """
+    Reanalyze a page of stage data inside a worker process started with init_worker.
+    """
+    with _worker_app.app_context():
+        try:
+            return reanalyze_page(AssessmentStage(stage_value), ids, dry_run)
+        finally:
+            db.session.remove()
+
+
+def reanalyze_page(stage: AssessmentStage, ids: list[int], dry_run: bool) -> dict[str, Any]:
+    """
+    Recompute the analyses of a page of stage data.
+
+    Args:
+        stage (AssessmentStage): Stage of the stage data.
+        ids (list[int]): IDs of the stage data.
+        dry_run (bool): Compare against the stored results instead of replacing them.
+
+    Returns:
+        dict[str, Any]: Number of stages and samples analyzed, and a description of each changed result.
+    """
+    # Imported here since the task modules need the Celery app
+    from app.celery_tasks.memory_analysis import analyze_memory_trials
+    from app.celery_tasks.peak_identification import analyze_gait
+
+    stage_data = db.session.query(AssessmentStageData).filter(AssessmentStageData.id.in_(ids)).order_by(AssessmentStageData.id).all()
+    arrays = AssessmentStageData.load_arrays(stage_data)
+    stage_ids = [data.id for data in stage_data]
+
+    if stage == AssessmentStage.GAIT:
+        analyses = [analyze_gait(stage_id, *arrays[stage_id]) for stage_id in stage_ids]
+        stored = db.session.query(ZeroCrossingAnalysis).filter(ZeroCrossingAnalysis.stage_data_id.in_(stage_ids)) \
+            .order_by(ZeroCrossingAnalysis.id).all()
+        describe = describe_gait_change
+    else:
+        analyses = analyze_memory_trials(stage_ids, [arrays[stage_id] for stage_id in stage_ids])
+        stored = db.session.query(MemoryAnalysis).filter(MemoryAnalysis.assessment_stage_data_id.in_(stage_ids)) \
+            .order_by(MemoryAnalysis.id).all()
+        describe = describe_memory_change
+
+    # The dashboard shows the first stored analysis (lowest ID) of each stage data, so that's the one compared
+    # against. Every stored analysis of the page is replaced below, leaving exactly one per stage data
+    shown = {}
+    for analysis in stored:
+        shown.setdefault(analysis.stage_data_id if stage == AssessmentStage.GAIT else analysis.assessment_stage_data_id, analysis)
+
+    changes = []
+    for stage_id, analysis in zip(stage_ids, analyses):
+        change = describe(shown.get(stage_id), analysis)
+        if change:
+            changes.append(f"stage data {stage_id}: {change}")
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        for analysis in stored:
+            db.session.delete(analysis)
+        db.session.add_all(analyses)
+        db.session.commit()
+
+    return {
+        "stages": len(stage_ids),
+        "samples": sum(len(arrays[stage_id][0]) for stage_id in stage_ids),
+        "changes": changes
+    }
+
+
+def _differs(old: float | None, new: float | None) -> bool:
+    if old is None or new is None:
+        return old is not new
+    return not math.isclose(old, new, rel_tol=1e-9, abs_tol=1e-12)
+
+
+def describe_gait_change(old: ZeroCrossingAnalysis | None, new: ZeroCrossingAnalysis) -> str | None:
+    """
+    Describe how a recomputed gait analysis differs from the stored one, or None if it doesn't.
+    """
+    if old is None:
+        return f"new analysis with {new.num_peaks} peaks and {new.num_troughs} troughs"
+
+    changed = []
+    old_peaks, old_troughs = old.peak_positions().tolist(), old.trough_positions().tolist()
+    if old_peaks != new.peak_positions().tolist() or old_troughs != new.trough_positions().tolist():
+        changed.append(f"peaks {len(old_peaks)} -> {new.num_peaks}, troughs {len(old_troughs)} -> {new.num_troughs}")
+
+    fields = ["step_frequency", "step_regularity", "stride_regularity"]
+    changed += [
+        f"{field} {getattr(old, field)} -> {getattr(new, field)}"
+        for field in fields if _differs(getattr(old, field), getattr(new, field))
+    ]
+    return ", ".join(changed) or None
+
+
+def describe_memory_change(old: MemoryAnalysis | None, new: MemoryAnalysis) -> str | None:
+    """
+    Describe how a recomputed memory analysis differs from the stored one, or None if it doesn't.
+    """
+    if old is None:
+        return "new analysis" + (" without movement" if new.no_movement else f" with time to move {new.time_to_move:g} ms")
+
+    fields = ["time_to_move", "average_accl_post_threshold", "max_accl"]
+    changed = [
+        f"{field} {getattr(old, field)} -> {getattr(new, field)}"
+        for field in fields if _differs(getattr(old, field), getattr(new, field))
+    ]
+    if bool(old.no_movement) != new.no_movement:
+        changed.append(f"no_movement {bool(old.no_movement)} -> {new.no_movement}")
+    return ", ".join(changed) or None
@@ -0,0 +1,69 @@
+"""
+Resampling of watch readings onto a uniform time grid.
+
+The watch's timestamps jitter and sometimes have gaps, so a window of N readings
+doesn't always span the same time. Resampling each stage onto a grid at a fixed
+rate before filtering makes the analyses independent of the watch's sample rate.
+Readings more than MAX_GAP_MS apart aren't interpolated across: the grid is split
+into segments there, returned as a ragged batch like app/utilities/memory_signal.py.
+"""
+import numpy as np
+
+# Largest interval between readings that is interpolated across, in milliseconds
+MAX_GAP_MS = 250
+
+
+def resample_uniform(timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray, rate_hz: float,
+                     max_gap_ms: float = MAX_GAP_MS) -> tuple[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]:
+    """
+    Linearly interpolate readings onto a uniform grid, split into segments at gaps.
+
+    Each segment's grid starts at the first reading after a gap and steps by
+    1000 / rate_hz milliseconds up to the last reading before the next gap.
+
+    Args:
+        timestamps (np.ndarray): Epoch timestamps in milliseconds, sorted.
+        x, y, z (np.ndarray): Acceleration along each axis.
+        rate_hz (float): Rate of the grid.
+        max_gap_ms (float): Largest interval between readings that is interpolated across.
+
+    Returns:
+        tuple[tuple[np.ndarray, ...], np.ndarray]: float64 grid timestamps in milliseconds
+        and interpolated x, y and z, concatenated over the segments, and the offset of each segment.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if not len(timestamps):
+        empty = np.empty(0)
+        return (empty, empty, empty, empty), np.empty(0, dtype=np.int64)
+
+    step = 1000.0 / rate_hz
+    breaks = np.flatnonzero(np.diff(timestamps) > max_gap_ms) + 1
+    starts = timestamps[np.concatenate(([0], breaks))]
+    ends = timestamps[np.concatenate((breaks - 1, [len(timestamps) - 1]))]
+
+    # Grid points of all segments at once: each segment's start plus multiples of the step
+    lengths = np.floor((ends - starts) / step).astype(np.int64) + 1
+    offsets = np.cumsum(lengths) - lengths
+    steps = np.arange(lengths.sum()) - np.repeat(offsets, lengths)
+    grid = np.repeat(starts, lengths) + steps * step
+
+    # Grid points only fall between readings of their own segment, so one interpolation covers every segment
+    return (grid, *(np.interp(grid, timestamps, axis) for axis in (x, y, z))), offsets
+
+
+def nearest_readings(timestamps: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Get the position of the reading closest in time to each target timestamp.
+
+    Args:
+        timestamps (np.ndarray): Epoch timestamps in milliseconds of the readings, sorted.
+        targets (np.ndarray): Timestamps to find the closest reading of.
+
+    Returns:
+        np.ndarray: Position of the closest reading for each target.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    after = np.clip(np.searchsorted(timestamps, targets), 1, max(len(timestamps) - 1, 1))
+    before = after - 1
+    closer_after = np.abs(timestamps[np.minimum(after, len(timestamps) - 1)] - targets) < np.abs(targets - timestamps[before])
+    return np.where(closer_after, after, before)
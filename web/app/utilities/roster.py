@@ -0,0 +1,67 @@
+"""
+The roster of a physician's patients, shared by the dashboard views.
+
+The patients are read with their user's name and email, their number of
+assessments and the date of their last assessment in one aggregated query,
+and the result is kept on flask.g so views and templates rendered in the same
+request reuse it.
+"""
+from typing import Any
+
+from flask import g
+from flask_login import current_user
+
+from app.db import db
+from app.models import PATIENT_ROLE, PHYSICIAN_ROLE, Patient, PatientAssessment, Role, User
+
+
+def physician_roster(physician_id: int) -> list[Any]:
+    """
+    Get the patients of a physician, running the query once per request.
+
+    Args:
+        physician_id (int): ID of the Physician.
+
+    Returns:
+        list[Row]: One row per patient with a user with the Patient role, ordered by patient ID,
+        with patient_id, user_id, name, email, assessment_count and last_assessment (None without assessments).
+    """
+    rosters = g.setdefault("physician_rosters", {})
+    if physician_id not in rosters:
+        rosters[physician_id] = db.session.query(
+            Patient.id.label("patient_id"),
+            User.id.label("user_id"),
+            User.name,
+            User.email,
+            db.func.count(PatientAssessment.id).label("assessment_count"),
+            db.func.max(PatientAssessment.date_taken).label("last_assessment")
+        ). \
+            join(User, Patient.user_id == User.id). \
+            outerjoin(PatientAssessment, PatientAssessment.patient_id == Patient.id). \
+            filter(Patient.physician_id == physician_id, User.roles.any(Role.name == PATIENT_ROLE)). \
+            group_by(Patient.id, User.id). \
+            order_by(Patient.id).all()
+    return rosters[physician_id]
+
+
+def current_physician_roster() -> list[Any]:
+    """
+    Get the roster of the logged in physician, see physician_roster.
+    """
+    return physician_roster(current_user.physician_profile.id)
+
+
+def can_view_patient(patient_id: int) -> bool:
+    """
+    Check whether the logged in user can see a patient's assessments.
+
+    Args:
+        patient_id (int): ID of the Patient.
+
+    Returns:
+        bool: True for the patient themselves and for their physician.
+    """
+    if current_user.has_role(PHYSICIAN_ROLE):
+        return db.session.query(Patient.id).filter_by(id=patient_id, physician_id=current_user.physician_profile.id).first() is not None
+
+    return current_user.patient_profile is not None and current_user.patient_profile.id == patient_id
@@ -0,0 +1,158 @@
+import struct
+
+import numpy as np
+
+# Packed sample layout: all timestamps first, then each axis as its own contiguous column
+TIMESTAMP_DTYPE = np.dtype("<i8")
+AXIS_DTYPE = np.dtype("<f4")
+BYTES_PER_SAMPLE = TIMESTAMP_DTYPE.itemsize + 3 * AXIS_DTYPE.itemsize
+# Packed positions into the readings of a stage, e.g. detected peaks
+INDEX_DTYPE = np.dtype("<i4")
+
+
+def pack_samples(timestamps, x, y, z) -> bytes:
+    """
+    Pack accelerometer samples into a single columnar blob.
+
+    Args:
+        timestamps: Epoch timestamps in milliseconds.
+        x, y, z: Acceleration along each axis.
+
+    Returns:
+        bytes: Little-endian int64 timestamps followed by float32 x, y and z columns.
+    """
+    columns = (
+        np.asarray(timestamps, dtype=TIMESTAMP_DTYPE),
+        np.asarray(x, dtype=AXIS_DTYPE),
+        np.asarray(y, dtype=AXIS_DTYPE),
+        np.asarray(z, dtype=AXIS_DTYPE),
+    )
+    if len({len(column) for column in columns}) != 1:
+        raise ValueError("Timestamp and axis columns must have the same length.")
+
+    return b"".join(column.tobytes() for column in columns)
+
+
+def unpack_samples(blob: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Unpack a blob created by pack_samples without copying it.
+
+    Args:
+        blob (bytes): Packed sample blob.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Read-only
+        int64 timestamps and float32 x, y and z arrays.
+    """
+    if len(blob) % BYTES_PER_SAMPLE:
+        raise ValueError(f"Packed sample blob of {len(blob)} bytes is not a whole number of samples.")
+
+    n = len(blob) // BYTES_PER_SAMPLE
+    timestamps = np.frombuffer(blob, dtype=TIMESTAMP_DTYPE, count=n)
+    offset = n * TIMESTAMP_DTYPE.itemsize
+    axes = [
+        np.frombuffer(blob, dtype=AXIS_DTYPE, count=n, offset=offset + i * n * AXIS_DTYPE.itemsize)
+        for i in range(3)
+    ]
+    return timestamps, axes[0], axes[1], axes[2]
+
+
+def pack_indices(indices) -> bytes:
+    """
+    Pack positions into the readings of a stage, such as detected peaks, into a blob.
+
+    Args:
+        indices: Non-negative positions.
+
+    Returns:
+        bytes: Little-endian int32 positions.
+    """
+    return np.asarray(indices, dtype=INDEX_DTYPE).tobytes()
+
+
+def unpack_indices(blob: bytes) -> np.ndarray:
+    """
+    Unpack a blob created by pack_indices without copying it.
+
+    Args:
+        blob (bytes): Packed index blob.
+
+    Returns:
+        np.ndarray: Read-only int32 positions.
+    """
+    if len(blob) % INDEX_DTYPE.itemsize:
+        raise ValueError(f"Packed index blob of {len(blob)} bytes is not a whole number of indices.")
+    return np.frombuffer(blob, dtype=INDEX_DTYPE)
+
+
+#############################
+# BINARY UPLOAD WIRE FORMAT #
+#############################
+# A binary upload is a fixed header followed by the samples in the packed layout above:
+#   magic "RWS1" | version uint8 | stage uint8 | trial int16 | memStep int16 | count uint32
+# Stages are encoded by their position in UPLOAD_STAGES, and -1 encodes a missing trial/memStep.
+UPLOAD_CONTENT_TYPE = "application/vnd.rewatch.samples"
+UPLOAD_MAGIC = b"RWS1"
+UPLOAD_VERSION = 1
+UPLOAD_HEADER = struct.Struct("<4sBBhhI")
+UPLOAD_STAGES = ["WAITING", "GAIT", "GAIT_COMPLETE", "RT_TEST", "COMPLETE"]
+
+
+def encode_upload(stage: str, timestamps, x, y, z, trial: int | None = None, mem_step: int | None = None) -> bytes:
+    """
+    Encode an upload in the binary wire format.
+
+    Args:
+        stage (str): Assessment stage the samples were recorded in.
+        timestamps: Epoch timestamps in milliseconds.
+        x, y, z: Acceleration along each axis.
+        trial (int | None): Trial number, if any.
+        mem_step (int | None): Memory stimulus step, if any.
+
+    Returns:
+        bytes: Header followed by the packed samples.
+    """
+    header = UPLOAD_HEADER.pack(
+        UPLOAD_MAGIC,
+        UPLOAD_VERSION,
+        UPLOAD_STAGES.index(stage),
+        -1 if trial is None else trial,
+        -1 if mem_step is None else mem_step,
+        len(timestamps)
+    )
+    return header + pack_samples(timestamps, x, y, z)
+
+
+def decode_upload(body: bytes) -> tuple[dict, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode a binary upload into its metadata and sample arrays without
+    creating a Python object per sample.
+
+    Args:
+        body (bytes): Request body in the binary wire format.
+
+    Raises:
+        ValueError: If the body isn't a valid binary upload.
+
+    Returns:
+        tuple[dict, np.ndarray, np.ndarray, np.ndarray, np.ndarray]: Metadata
+        with the same keys as the JSON upload, followed by the int64 timestamps
+        and float32 x, y and z arrays.
+    """
+    if len(body) < UPLOAD_HEADER.size:
+        raise ValueError("Binary upload is shorter than its header.")
+
+    magic, version, stage, trial, mem_step, count = UPLOAD_HEADER.unpack_from(body)
+    if magic != UPLOAD_MAGIC or version != UPLOAD_VERSION:
+        raise ValueError("Binary upload has an unsupported magic number or version.")
+    if stage >= len(UPLOAD_STAGES):
+        raise ValueError(f"Binary upload has an unknown stage {stage}.")
+    if len(body) - UPLOAD_HEADER.size != count * BYTES_PER_SAMPLE:
+        raise ValueError(f"Binary upload declares {count} samples but has {len(body) - UPLOAD_HEADER.size} bytes of samples.")
+
+    metadata = {
+        "stage": UPLOAD_STAGES[stage],
+        "trial": None if trial < 0 else trial,
+        "memStep": None if mem_step < 0 else mem_step,
+    }
+    return (metadata, *unpack_samples(memoryview(body)[UPLOAD_HEADER.size:]))
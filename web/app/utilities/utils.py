@@ -1,17 +1,5 @@
-from app.models import PatientAssessment, Patient, ZeroCrossingAnalysis, AssessmentStageData, AssessmentStage
-import statistics
-
-
-def avg_and_std(values):
-    if not values:
-        return 0, 0
-
-    avg = sum(values) / len(values)
-    if len(values) > 1:
-        std = statistics.stdev(values)
-    else:
-        std = 0.0
-    return avg, std
+from app.db import db
+from app.models import PatientAssessment, Patient, ReactionTimeSummary, ZeroCrossingAnalysis, AssessmentStageData, AssessmentStage, MemoryAnalysis
 
 
 def build_point(date_label, value, difficulty):
@@ -24,10 +12,20 @@ def build_point(date_label, value, difficulty):
 
 def get_patient_assessment_data(patient_id):
     """
-    Fetch assessments and prepare chart data for a patient
+    Prepare chart data for a patient, the table of assessments is paged by app.utilities.assessment_history
     """
-    results = PatientAssessment.query.filter_by(patient_id=patient_id) \
-        .order_by(PatientAssessment.date_taken.asc()).all()
+    # Only the charted columns are read, not whole assessments
+    rows = db.session.query(
+        PatientAssessment.date_taken,
+        PatientAssessment.difficulty,
+        PatientAssessment.score,
+        PatientAssessment.total_rounds,
+        PatientAssessment.reaction_records,
+        ReactionTimeSummary
+    ) \
+        .outerjoin(ReactionTimeSummary, ReactionTimeSummary.assessment_id == PatientAssessment.id) \
+        .filter(PatientAssessment.patient_id == patient_id) \
+        .order_by(PatientAssessment.date_taken.asc(), PatientAssessment.id.asc()).all()
 
     # Create the dataset from the memory test for charts in dictionary format
     chart_data = {
@@ -44,36 +42,34 @@ def get_patient_assessment_data(patient_id):
         }
     }
 
-    for assessment in results:
+    for assessment in rows:
+        summary = assessment.ReactionTimeSummary
         date_label = assessment.date_taken.strftime("%Y-%m-%d")
         difficulty = assessment.difficulty
 
-        # collect all reaction times for this assessment
-        reaction_times = [rt["time"] for rt in assessment.reaction_records]
-        correct_times = [rt["time"] for rt in assessment.reaction_records if rt["correct"]]
-        incorrect_times = [rt["time"] for rt in assessment.reaction_records if not rt["correct"]]
+        # Stats are stored when the memory test finishes, older assessments are summarized on the fly
+        # until `flask reaction-summaries backfill` has stored theirs
+        if summary is None:
+            summary = ReactionTimeSummary.from_records(assessment.reaction_records or [])
 
         # all reactions
-        all_avg, all_std = avg_and_std(reaction_times)
-        chart_data["reactions"]["average"].append(build_point(date_label, all_avg, difficulty))
-        chart_data["reactions"]["std"].append(build_point(date_label, all_std, difficulty))
+        chart_data["reactions"]["average"].append(build_point(date_label, summary.avg_reaction_time, difficulty))
+        chart_data["reactions"]["std"].append(build_point(date_label, summary.std_dev_reaction_time, difficulty))
 
         # correct reactions
-        correct_avg, correct_std = avg_and_std(correct_times)
-        chart_data["reactions"]["correct_avg"].append(build_point(date_label, correct_avg, difficulty))
-        chart_data["reactions"]["correct_std"].append(build_point(date_label, correct_std, difficulty))
+        chart_data["reactions"]["correct_avg"].append(build_point(date_label, summary.avg_correct_time, difficulty))
+        chart_data["reactions"]["correct_std"].append(build_point(date_label, summary.std_dev_correct_time, difficulty))
 
         # incorrect reactions
-        incorrect_avg, incorrect_std = avg_and_std(incorrect_times)
-        chart_data["reactions"]["incorrect_avg"].append(build_point(date_label, incorrect_avg, difficulty))
-        chart_data["reactions"]["incorrect_std"].append(build_point(date_label, incorrect_std, difficulty))
+        chart_data["reactions"]["incorrect_avg"].append(build_point(date_label, summary.avg_incorrect_time, difficulty))
+        chart_data["reactions"]["incorrect_std"].append(build_point(date_label, summary.std_dev_incorrect_time, difficulty))
 
         # memory score
         score_percent = (assessment.score / assessment.total_rounds) * 100
         chart_data["scores"].append(build_point(date_label, score_percent, difficulty))
 
         # Individual reaction times (many per assessment)
-        for rt in assessment.reaction_records:
+        for rt in assessment.reaction_records or []:
             point = {
                 "x": date_label,
                 "y": rt["time"],
@@ -86,26 +82,37 @@ def get_patient_assessment_data(patient_id):
             else:
                 chart_data["reactions"]["incorrect_points"].append(point)
 
-    return results, chart_data
+    return chart_data
 
 
 def get_patient_information(patient_id):
-    patient_age = Patient.query.filter_by(id=patient_id).first().age
-    patient_height = Patient.query.filter_by(id=patient_id).first().height
-    patient_gender = Patient.query.filter_by(id=patient_id).first().gender
-    patient_weight = Patient.query.filter_by(id=patient_id).first().weight
+    # One query for the four columns, or None for each if the patient doesn't exist
+    patient = db.session.query(Patient.age, Patient.height, Patient.gender, Patient.weight).filter(Patient.id == patient_id).first()
+    if patient is None:
+        return None, None, None, None
 
-    return patient_age, patient_height, patient_gender, patient_weight
+    return patient.age, patient.height, patient.gender, patient.weight
 
 
 def get_gait_zero_crossing(patient_assessment_id):
-    gait_analysis = ZeroCrossingAnalysis.query. \
+    # Only the summary columns are read, the peak and trough positions aren't needed
+    gait_analysis = db.session.query(
+        ZeroCrossingAnalysis.avg_peak_distance,
+        ZeroCrossingAnalysis.std_dev_peak_distance,
+        ZeroCrossingAnalysis.avg_trough_distance,
+        ZeroCrossingAnalysis.std_dev_trough_distance,
+        ZeroCrossingAnalysis.num_peaks,
+        ZeroCrossingAnalysis.num_troughs,
+        ZeroCrossingAnalysis.step_frequency,
+        ZeroCrossingAnalysis.step_regularity,
+        ZeroCrossingAnalysis.stride_regularity
+    ). \
         join(AssessmentStageData, ZeroCrossingAnalysis.stage_data_id == AssessmentStageData.id). \
         join(PatientAssessment, AssessmentStageData.assessment_id == PatientAssessment.id). \
         filter(
         PatientAssessment.id == patient_assessment_id,
         AssessmentStageData.stage == AssessmentStage.GAIT
-    ).first()
+    ).order_by(ZeroCrossingAnalysis.id).first()
 
     if gait_analysis:
         return {
@@ -113,7 +120,53 @@ def get_gait_zero_crossing(patient_assessment_id):
             'std_dev_peak_distance': gait_analysis.std_dev_peak_distance,
             'avg_trough_distance': gait_analysis.avg_trough_distance,
             'std_dev_trough_distance': gait_analysis.std_dev_trough_distance,
-            'num_peaks': len(gait_analysis.peak_indices),
-            'num_troughs': len(gait_analysis.trough_indices)
+            'num_peaks': gait_analysis.num_peaks,
+            'num_troughs': gait_analysis.num_troughs,
+            'step_frequency': gait_analysis.step_frequency,
+            'step_regularity': gait_analysis.step_regularity,
+            'stride_regularity': gait_analysis.stride_regularity
         }
     return None
+
+
+def get_reaction_analyses(patient_assessment_id):
+    """
+    Get the analysis of every RT_TEST trial of an assessment in one query.
+
+    Args:
+        patient_assessment_id (int): ID of the PatientAssessment.
+
+    Returns:
+        list[dict]: One dict per trial in the order they were taken, with its round starting at 1 and
+        the time_to_move, average_accl_post_threshold, max_accl and no_movement of its first analysis,
+        all None if the trial hasn't been analyzed.
+    """
+    # A reanalysis can add analyses to a trial, the first one is shown
+    earlier = db.aliased(MemoryAnalysis)
+    first_analysis_id = db.session.query(db.func.min(earlier.id)) \
+        .filter(earlier.assessment_stage_data_id == AssessmentStageData.id) \
+        .correlate(AssessmentStageData).scalar_subquery()
+
+    trials = db.session.query(
+        MemoryAnalysis.time_to_move,
+        MemoryAnalysis.average_accl_post_threshold,
+        MemoryAnalysis.max_accl,
+        MemoryAnalysis.no_movement
+    ). \
+        select_from(AssessmentStageData). \
+        outerjoin(MemoryAnalysis, MemoryAnalysis.id == first_analysis_id). \
+        filter(
+        AssessmentStageData.assessment_id == patient_assessment_id,
+        AssessmentStageData.stage == AssessmentStage.RT_TEST
+    ).order_by(AssessmentStageData.id).all()
+
+    return [
+        {
+            'round': idx + 1,
+            'time_to_move': trial.time_to_move,
+            'average_accl_post_threshold': trial.average_accl_post_threshold,
+            'max_accl': trial.max_accl,
+            'no_movement': trial.no_movement
+        }
+        for idx, trial in enumerate(trials)
+    ]
@@ -0,0 +1,14 @@
+import numpy as np
+
+def make_gait_payload(n_samples: int, fs: int = 50) -> dict:
+    """Helper to build a GAIT upload body of n_samples readings at fs Hz."""
+    rng = np.random.default_rng(0)
+    xyz = rng.normal(0, 1, (n_samples, 3)).round(2)
+    start_ms = 1700000000000
+    return {
+        "metadata": {"stage": "GAIT", "trial": None, "memStep": None},
+        "data": [
+            {"timestamp": start_ms + i * (1000 // fs), "x": float(x), "y": float(y), "z": float(z)}
+            for i, (x, y, z) in enumerate(xyz)
+        ]
+    }
@@ -0,0 +1,65 @@
+import time
+
+from flask.testing import FlaskClient
+import pytest
+
+from app.models import AssessmentStage, AssessmentStageData, StageDataPoint
+from app.db import db
+from tests.benchmarks.payloads import make_gait_payload
+
+def ingest_orm(payload: dict) -> int:
+    """Store a payload with one StageDataPoint object per reading."""
+    stage_data = AssessmentStageData.from_json(payload, AssessmentStage.GAIT, None)
+    db.session.add(stage_data)
+    db.session.commit()
+    return stage_data.id
+
+def ingest_bulk(payload: dict) -> int:
+    """Store a payload with a single batched insert."""
+    stage_data = AssessmentStageData.bulk_from_json(payload, AssessmentStage.GAIT, None)
+    db.session.commit()
+    return stage_data.id
+
+def samples_per_second(ingest, payload: dict, repeats: int = 3) -> tuple[float, int]:
+    """Return the best samples/second over a few repeats and the last stored ID."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stage_data_id = ingest(payload)
+        best = min(best, time.perf_counter() - start)
+    return len(payload["data"]) / best, stage_data_id
+
+def stored_points(stage_data_id: int) -> list[tuple]:
+    """Helper to read the stored points of a stage, in timestamp order."""
+    columns = (StageDataPoint.timestamp, StageDataPoint.x, StageDataPoint.y, StageDataPoint.z)
+    return db.session.query(*columns).filter_by(sensor_id=stage_data_id).order_by(StageDataPoint.timestamp).all()
+
+def test_bulk_ingest_matches_orm(test_client: FlaskClient):
+    """
+    GIVEN a 60 s GAIT recording at 50 Hz (3000 samples)
+    WHEN it is stored with the ORM path and with the bulk insert path
+    THEN both store identical points.
+    """
+    payload = make_gait_payload(3000)
+
+    bulk_points = stored_points(ingest_bulk(payload))
+
+    assert len(bulk_points) == 3000 - 49
+    assert bulk_points == stored_points(ingest_orm(payload))
+
+@pytest.mark.benchmark
+def test_bulk_ingest_throughput(test_client: FlaskClient, record_property):
+    """
+    GIVEN a 60 s GAIT recording at 50 Hz (3000 samples)
+    WHEN it is stored with the ORM path and with the bulk insert path
+    THEN the bulk path ingests more samples per second.
+    """
+    payload = make_gait_payload(3000)
+
+    orm_rate, _ = samples_per_second(ingest_orm, payload)
+    bulk_rate, _ = samples_per_second(ingest_bulk, payload)
+
+    record_property("orm_samples_per_second", round(orm_rate))
+    record_property("bulk_samples_per_second", round(bulk_rate))
+
+    assert bulk_rate > orm_rate
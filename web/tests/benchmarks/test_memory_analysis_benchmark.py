@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utilities.memory_signal import movement_features, ragged_batch
+
+def movement_features_pandas(timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray, threshold: float = 2) -> tuple[float, float, float] | None:
+    """
+    The per-trial DataFrame computation memory_analysis used before it was vectorized,
+    returning None where it raised a ValueError for a trial without movement.
+    """
+    table = pd.DataFrame({"X": x, "Y": y, "Z": z, "Timestamp": pd.to_datetime(timestamps, unit="ms")})
+    table['norm'] = np.linalg.norm(table[['X','Y','Z']].values, axis=1)
+    max_norm = table['norm'].max()
+
+    if max_norm < threshold:
+        return None
+
+    first_above_threshold = table.loc[table['norm'] > threshold, 'Timestamp'].min()
+    time_taken = first_above_threshold - table['Timestamp'].min()
+    average_norm = table[table['Timestamp'] >= first_above_threshold]['norm'].mean()
+    return time_taken.total_seconds() * 1000, average_norm, max_norm
+
+def make_trials(n_trials: int, seed: int) -> list[tuple[np.ndarray, ...]]:
+    """Helper to build RT trials of random length at 100 Hz, some of them without movement."""
+    rng = np.random.default_rng(seed)
+    trials = []
+    for _ in range(n_trials):
+        n = int(rng.integers(1, 300))
+        timestamps = np.sort(1700000000000 + rng.integers(0, n * 10, n))
+        peak = rng.choice([1.0, 6.0, 12.0])
+        norm = peak * np.exp(-((np.arange(n) - rng.integers(0, n)) / 20.0) ** 2) + np.abs(rng.normal(0, 0.2, n))
+        direction = rng.normal(size=3)
+        direction /= np.linalg.norm(direction)
+        trials.append((timestamps, norm * direction[0], norm * direction[1], norm * direction[2]))
+    return trials
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_movement_features_match_pandas(seed: int):
+    """
+    GIVEN RT trials of random lengths with duplicate timestamps, some without movement
+    WHEN their movement features are computed as one ragged batch
+    THEN each trial gets the values of the per-trial DataFrame computation.
+    """
+    trials = make_trials(100, seed)
+    columns, offsets = ragged_batch(trials)
+    time_to_move, average_accl, max_accl, moved = movement_features(*columns, offsets)
+
+    for i, trial in enumerate(trials):
+        expected = movement_features_pandas(*trial)
+        assert moved[i] == (expected is not None)
+        if expected is not None:
+            assert (time_to_move[i], average_accl[i], max_accl[i]) == pytest.approx(expected, rel=1e-12)
+    assert not moved.all() and moved.any()
+
+@pytest.mark.benchmark
+def test_batch_movement_features_speed(record_property):
+    """
+    GIVEN 500 RT trials
+    WHEN their movement features are computed per trial with DataFrames and as one ragged batch
+    THEN the batch is faster.
+    """
+    trials = make_trials(500, seed=0)
+
+    start = time.perf_counter()
+    for trial in trials:
+        movement_features_pandas(*trial)
+    pandas_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns, offsets = ragged_batch(trials)
+    movement_features(*columns, offsets)
+    batch_time = time.perf_counter() - start
+
+    record_property("pandas_ms", round(pandas_time * 1000, 2))
+    record_property("batch_ms", round(batch_time * 1000, 2))
+
+    assert batch_time < pandas_time
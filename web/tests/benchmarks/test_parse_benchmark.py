@@ -0,0 +1,74 @@
+from datetime import datetime
+import time
+
+import pytest
+
+from app.models import AssessmentStage, AssessmentStageData
+from tests.benchmarks.payloads import make_gait_payload
+
+def parse_per_point(json_data: dict) -> list[dict]:
+    """The per-point parse that AssessmentStageData used before it was vectorized."""
+    rows = []
+    initial_ts = None
+    for point in json_data["data"]:
+        ts = datetime.fromtimestamp(point["timestamp"] / 1000.0)
+
+        if not initial_ts:
+            initial_ts = ts
+        elif (ts - initial_ts).total_seconds() < 1:
+            continue
+
+        rows.append({"timestamp": ts, "x": point["x"], "y": point["y"], "z": point["z"]})
+    return rows
+
+def best_time(parse, payload: dict, repeats: int = 3) -> tuple[float, object]:
+    """Return the best time in seconds over a few repeats and the last result."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = parse(payload)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def parse_rows(body: dict) -> list[dict]:
+    """Parse a GAIT payload into rows with the vectorized parse."""
+    return AssessmentStageData.parse_points(body, AssessmentStage.GAIT)
+
+def parse_arrays(body: dict) -> tuple:
+    """Parse a GAIT payload into reading arrays with the vectorized parse."""
+    return AssessmentStageData.reading_arrays(body, AssessmentStage.GAIT)
+
+@pytest.mark.parametrize("n_samples", [1_000, 10_000])
+def test_vectorized_parse_matches_per_point(n_samples: int):
+    """
+    GIVEN GAIT uploads of 1k and 10k samples
+    WHEN they are parsed per point and with the vectorized parse
+    THEN both produce identical rows and readings.
+    """
+    payload = make_gait_payload(n_samples)
+    per_point_rows = parse_per_point(payload)
+    arrays = parse_arrays(payload)
+
+    assert parse_rows(payload) == per_point_rows
+    assert arrays[0].tolist() == [round(row["timestamp"].timestamp() * 1000) for row in per_point_rows]
+    assert arrays[1].tolist() == [row["x"] for row in per_point_rows]
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("n_samples", [1_000, 10_000, 100_000])
+def test_vectorized_parse_throughput(n_samples: int, record_property):
+    """
+    GIVEN GAIT uploads of 1k, 10k and 100k samples
+    WHEN they are parsed per point and with the vectorized parse
+    THEN the vectorized array parse is faster.
+    """
+    payload = make_gait_payload(n_samples)
+
+    per_point_time, _ = best_time(parse_per_point, payload)
+    rows_time, _ = best_time(parse_rows, payload)
+    arrays_time, _ = best_time(parse_arrays, payload)
+
+    record_property("per_point_samples_per_second", round(n_samples / per_point_time))
+    record_property("vectorized_rows_samples_per_second", round(n_samples / rows_time))
+    record_property("vectorized_arrays_samples_per_second", round(n_samples / arrays_time))
+
+    assert arrays_time < per_point_time
@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utilities.gait_signal import filtered_norm, find_peaks_and_troughs
+
+def find_peaks_and_troughs_loop(signal: np.ndarray, threshold: float) -> tuple[list[int], list[int]]:
+    """
+    The per-segment pandas loop identify_peaks used before it was vectorized.
+
+    Segments without any reading are skipped, where the loop used to raise a TypeError.
+    """
+    series = pd.Series(signal)
+    zero_crossings = np.where(np.diff(np.sign(series.dropna())))[0]
+    peaks, troughs = [], []
+
+    for i in range(len(zero_crossings) - 1):
+        start_idx = zero_crossings[i]
+        end_idx = zero_crossings[i + 1]
+        segment = series.iloc[start_idx:end_idx]
+        if segment.isna().all():
+            continue
+
+        local_min_idx = start_idx + segment.idxmin() - segment.index[0]
+        local_max_idx = start_idx + segment.idxmax() - segment.index[0]
+
+        min_val = series.iloc[local_min_idx]
+        max_val = series.iloc[local_max_idx]
+
+        if abs(min_val) > abs(max_val) and abs(min_val) > threshold:
+            troughs.append(local_min_idx)
+        elif abs(max_val) > threshold:
+            peaks.append(local_max_idx)
+
+    return peaks, troughs
+
+def make_walking_signal(duration_s: float, amplitude: float, noise: float, seed: int, fs: int = 50) -> np.ndarray:
+    """Helper to build the filtered norm of a noisy walking-like recording."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration_s * fs)) / fs
+    x = 0.3 * np.sin(2 * np.pi * 0.95 * t) + rng.normal(0, noise, len(t))
+    y = amplitude * np.sin(2 * np.pi * 1.9 * t) + rng.normal(0, noise, len(t))
+    z = 0.15 * np.sin(2 * np.pi * 1.9 * t + 1.0) + rng.normal(0, noise, len(t))
+    return filtered_norm(x, y, z, 20)
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("amplitude, noise", [(1.0, 0.05), (0.3, 0.2), (0.15, 0.05)])
+def test_vectorized_peaks_match_loop(seed: int, amplitude: float, noise: float):
+    """
+    GIVEN noisy 60 s walking-like signals of different amplitudes
+    WHEN peaks and troughs are found with the vectorized implementation
+    THEN they are the same indices as the per-segment loop.
+    """
+    signal = make_walking_signal(60, amplitude, noise, seed)
+    assert find_peaks_and_troughs(signal, 0.2) == find_peaks_and_troughs_loop(signal, 0.2)
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("duration_s", [600, 1800])
+def test_vectorized_peak_detection_speed(duration_s: int, record_property):
+    """
+    GIVEN 10 and 30 minute walking recordings at 50 Hz
+    WHEN peaks and troughs are found with the per-segment loop and the vectorized implementation
+    THEN the vectorized implementation is faster.
+    """
+    signal = make_walking_signal(duration_s, 1.0, 0.1, seed=0)
+
+    start = time.perf_counter()
+    find_peaks_and_troughs_loop(signal, 0.2)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    find_peaks_and_troughs(signal, 0.2)
+    vectorized_time = time.perf_counter() - start
+
+    record_property("loop_ms", round(loop_time * 1000, 2))
+    record_property("vectorized_ms", round(vectorized_time * 1000, 2))
+
+    assert vectorized_time < loop_time
@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.utilities.gait_signal import PEAK_THRESHOLD, WINDOW_SIZE, filtered_norm, find_peaks_and_troughs, resampled_filtered_norm, resampled_peaks_and_troughs
+from app.utilities.resampling import resample_uniform
+
+def make_jittered_recording(duration_s: int, rate_hz: int = 50, seed: int = 0) -> tuple[np.ndarray, ...]:
+    """Helper to build a walking recording with jittered timestamps and a few gaps."""
+    rng = np.random.default_rng(seed)
+    n = duration_s * rate_hz
+    intervals = 1000 / rate_hz + rng.uniform(-4, 4, n)
+    intervals[rng.choice(n, size=duration_s // 60, replace=False)] += 1000
+    timestamps = 1700000000000 + np.rint(np.cumsum(intervals)).astype(np.int64)
+    t = (timestamps - timestamps[0]) / 1000
+    y = np.sin(2 * np.pi * 1.9 * t) + rng.normal(0, 0.1, n)
+    return timestamps, 0.3 * np.sin(2 * np.pi * 0.95 * t), y, np.full(n, 0.1)
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("duration_s", [600, 1800])
+def test_resampling_cost(duration_s: int, record_property):
+    """
+    GIVEN 10 and 30 minute jittered 50 Hz recordings with gaps
+    WHEN the gait peaks are found on the raw readings and on readings resampled at 50 Hz
+    THEN the cost of resampling is reported and stays small next to the analysis.
+    """
+    timestamps, x, y, z = make_jittered_recording(duration_s)
+
+    start = time.perf_counter()
+    find_peaks_and_troughs(filtered_norm(x, y, z, WINDOW_SIZE), PEAK_THRESHOLD)
+    raw_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    resample_uniform(timestamps, x, y, z, 50)
+    resample_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    resampled_peaks_and_troughs(timestamps, *resampled_filtered_norm(timestamps, x, y, z, 50))
+    resampled_time = time.perf_counter() - start
+
+    record_property("raw_ms", round(raw_time * 1000, 2))
+    record_property("resample_ms", round(resample_time * 1000, 2))
+    record_property("resampled_analysis_ms", round(resampled_time * 1000, 2))
+
+    assert resample_time < 0.1 * duration_s / 60
@@ -0,0 +1,42 @@
+import json
+import os
+
+from flask.testing import FlaskClient
+import pytest
+
+from app.models import AssessmentStageData
+from tests.benchmarks.watch_benchmark import Scenario, FlaskClientSession, run_scenario, scenario_matrix, write_results
+
+@pytest.mark.benchmark
+def test_watch_ingest_benchmark(test_app, test_client: FlaskClient, tmp_path, record_property):
+    """
+    GIVEN a small matrix of recording lengths, sample rates, trial counts, compressions and wire formats
+    WHEN the stub uploads each scenario through the test client
+    THEN every scenario reports latency percentiles, throughput and DB growth as JSON.
+
+    Set BENCHMARK_RESULTS to keep the JSON file, e.g. to compare it with another commit.
+    """
+    scenarios = scenario_matrix([10, 60], [50, 100], [5], [None, "gzip"], repeats=2) + [
+        Scenario(60, 50, 5, wire_format="binary", storage=AssessmentStageData.STORAGE_PACKED, repeats=2),
+        Scenario(60, 50, 5, wire_format="binary", storage=AssessmentStageData.STORAGE_PACKED, repeats=2, compression="deflate")
+    ]
+    session = FlaskClientSession(test_client)
+
+    results = [run_scenario(test_app, scenario, session) for scenario in scenarios]
+    path = os.environ.get("BENCHMARK_RESULTS", str(tmp_path / "ingest_benchmark.json"))
+    write_results(results, path)
+
+    for result in results:
+        record_property(f"{result.name}_p95_ms", result.latency_ms["p95"])
+        record_property(f"{result.name}_samples_per_second", result.samples_per_second)
+
+    with open(path) as f:
+        document = json.load(f)
+
+    assert set(document["results"]) == {scenario.name for scenario in scenarios}
+    for scenario in scenarios:
+        result = document["results"][scenario.name]
+        assert result["uploads"] == scenario.repeats * (1 + scenario.n_trials)
+        assert result["samples"] > scenario.repeats * scenario.gait_duration_s * scenario.sample_rate_hz
+        assert 0 < result["latency_ms"]["p50"] <= result["latency_ms"]["p95"] <= result["latency_ms"]["p99"]
+        assert result["db_growth_bytes"] >= 0
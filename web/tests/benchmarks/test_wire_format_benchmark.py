@@ -0,0 +1,72 @@
+import time
+
+from flask.testing import FlaskClient
+import pytest
+
+from app.models import AssessmentStage, AssessmentStageData, PatientAssessment
+from app.db import db
+from tests.stubs.watch_stub import BINARY_CONTENT_TYPE, GaitSignalGenerator, make_binary_payload, make_sensor_dto
+
+def create_gait_assessment() -> PatientAssessment:
+    """Helper to create a running assessment in the GAIT stage."""
+    assessment = PatientAssessment(
+        patient_id=1,
+        difficulty="Easy",
+        is_running=True,
+        current_step=PatientAssessment.STEP_ORDER.index(AssessmentStage.GAIT),
+        memorization_time=3
+    )
+    db.session.add(assessment)
+    db.session.commit()
+    return assessment
+
+def upload(test_client: FlaskClient, payload: dict, wire_format: str) -> tuple[float, int, int]:
+    """
+    Upload a stub payload in the given wire format.
+
+    Returns:
+        tuple[float, int, int]: Seconds taken, body size in bytes and stored sample count.
+    """
+    assessment = create_gait_assessment()
+    url = f"/assessments/memory_test/{assessment.join_code}/GAIT/upload"
+
+    if wire_format == "binary":
+        body = make_binary_payload(payload)
+        start = time.perf_counter()
+        response = test_client.post(url, data=body, content_type=BINARY_CONTENT_TYPE)
+    else:
+        body = test_client.application.json.dumps(payload).encode()
+        start = time.perf_counter()
+        response = test_client.post(url, data=body, content_type="application/json")
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    stored = db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).one()
+    return elapsed, len(body), stored.sample_count
+
+@pytest.mark.parametrize("storage", [AssessmentStageData.STORAGE_ROWS, AssessmentStageData.STORAGE_PACKED])
+def test_wire_format_throughput(test_app, test_client: FlaskClient, storage: str, record_property):
+    """
+    GIVEN a 60 s GAIT recording generated by the watch stub
+    WHEN it is uploaded end to end as JSON and in the binary wire format
+    THEN both store the same number of samples and the binary body is much smaller.
+    """
+    readings = GaitSignalGenerator(seed=0).generate(duration_seconds=60.0)
+    payload = make_sensor_dto(stage="GAIT", readings=readings)
+
+    test_app.config["STAGE_DATA_STORAGE"] = storage
+    try:
+        json_time, json_bytes, json_samples = min(upload(test_client, payload, "json") for _ in range(3))
+        binary_time, binary_bytes, binary_samples = min(upload(test_client, payload, "binary") for _ in range(3))
+    finally:
+        test_app.config["STAGE_DATA_STORAGE"] = AssessmentStageData.STORAGE_ROWS
+
+    json_rate = len(readings) / json_time
+    binary_rate = len(readings) / binary_time
+    record_property(f"{storage}_json_samples_per_second", round(json_rate))
+    record_property(f"{storage}_binary_samples_per_second", round(binary_rate))
+    print(f"\n{storage} storage: JSON {json_bytes:,} B at {json_rate:,.0f} samples/s, "
+          f"binary {binary_bytes:,} B at {binary_rate:,.0f} samples/s")
+
+    assert json_samples == binary_samples == len(readings) - 49
+    assert binary_bytes * 2 < json_bytes
@@ -0,0 +1,296 @@
+"""
+End-to-end ingest benchmark driven by the watch stub.
+
+Runs the GAIT and RT_TEST phases of tests/stubs/watch_stub.py against the real
+upload endpoints, either in process through the Flask test client or against a
+running server, and reports upload latency percentiles, samples/second and
+database growth for each scenario.
+
+Run the full scenario matrix and write the results to a JSON file with:
+    python -m tests.benchmarks.watch_benchmark --output ingest_benchmark.json
+
+Compare the JSON files written on two commits to spot regressions.
+"""
+import argparse
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+import itertools
+import json
+import subprocess
+import time
+from typing import Optional
+
+import numpy as np
+from flask import Flask
+from flask.testing import FlaskClient
+from sqlalchemy import text
+
+from app.db import db
+from app.models import AssessmentStage, AssessmentStageData, PatientAssessment
+from tests.stubs.watch_stub import WatchStub
+
+UPLOAD_PATH = "/assessments/memory_test/{join_code}/{stage}/upload"
+
+# Recording lengths in seconds, watch sample rates in Hz and RT trial counts of the full matrix
+RECORDING_LENGTHS_S = [30, 120, 300]
+SAMPLE_RATES_HZ = [25, 50, 100]
+TRIAL_COUNTS = [5, 20]
+# Content-Encoding of the uploads, None for uncompressed bodies
+COMPRESSIONS = [None, "gzip", "deflate"]
+
+
+@dataclass
+class Scenario:
+    """
+    One benchmark configuration
+    """
+    gait_duration_s: float
+    sample_rate_hz: int
+    n_trials: int
+    wire_format: str = "json"
+    storage: str = AssessmentStageData.STORAGE_ROWS
+    repeats: int = 3
+    compression: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        name = f"gait{self.gait_duration_s:g}s-{self.sample_rate_hz}hz-{self.n_trials}trials-{self.wire_format}-{self.storage}"
+        return f"{name}-{self.compression}" if self.compression else name
+
+
+@dataclass
+class ScenarioResult:
+    """
+    Measurements of one scenario, summed over its repeats
+    """
+    scenario: dict
+    uploads: int = 0
+    samples: int = 0
+    upload_seconds: float = 0.0
+    latency_ms: dict = field(default_factory=dict)
+    samples_per_second: float = 0.0
+    db_growth_bytes: Optional[int] = None
+    db_bytes_per_sample: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return Scenario(**self.scenario).name
+
+
+class FlaskClientResponse:
+    """
+    Wraps a Flask test client response in the parts of the requests.Response API the stub uses
+    """
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.ok = response.status_code < 400
+
+    def json(self):
+        return self._response.get_json()
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise RuntimeError(f"Upload failed with {self.status_code}: {self._response.get_data(as_text=True)}")
+
+
+class FlaskClientSession:
+    """
+    Sends the stub's requests through a Flask test client instead of the network
+    """
+    def __init__(self, client: FlaskClient):
+        self.client = client
+        self.headers = {}
+
+    def get(self, url: str, timeout: Optional[float] = None, **kwargs) -> FlaskClientResponse:
+        return FlaskClientResponse(self.client.get(url, headers=self.headers, **kwargs))
+
+    def post(self, url: str, timeout: Optional[float] = None, json=None, data=None, headers: Optional[dict] = None) -> FlaskClientResponse:
+        headers = {**self.headers, **(headers or {})}
+        content_type = headers.pop("Content-Type", None)
+        if json is not None:
+            return FlaskClientResponse(self.client.post(url, json=json, headers=headers))
+        return FlaskClientResponse(self.client.post(url, data=data, headers=headers, content_type=content_type))
+
+
+class TimedSession:
+    """
+    Records the latency of every POST sent through a session
+    """
+    def __init__(self, session):
+        self.session = session
+        self.headers = session.headers
+        self.latencies = []
+
+    def get(self, url: str, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, json=None, data=None, **kwargs):
+        start = time.perf_counter()
+        response = self.session.post(url, json=json, data=data, **kwargs)
+        self.latencies.append(time.perf_counter() - start)
+        return response
+
+
+def scenario_matrix(lengths: list[float] = RECORDING_LENGTHS_S, rates: list[int] = SAMPLE_RATES_HZ,
+                    trials: list[int] = TRIAL_COUNTS, compressions: list[Optional[str]] = COMPRESSIONS, **kwargs) -> list[Scenario]:
+    """
+    Builds one scenario per combination of recording length, sample rate, trial count and compression
+    """
+    return [
+        Scenario(length, rate, n_trials, compression=compression, **kwargs)
+        for length, rate, n_trials, compression in itertools.product(lengths, rates, trials, compressions)
+    ]
+
+
+def database_size() -> Optional[int]:
+    """
+    Gets the bytes used by the database, excluding free pages, or None for databases other than SQLite
+    """
+    if db.engine.dialect.name != "sqlite":
+        return None
+    page_count = db.session.execute(text("PRAGMA page_count")).scalar()
+    free_pages = db.session.execute(text("PRAGMA freelist_count")).scalar()
+    page_size = db.session.execute(text("PRAGMA page_size")).scalar()
+    return (page_count - free_pages) * page_size
+
+
+def create_assessment() -> PatientAssessment:
+    """
+    Creates a running assessment for the stub to upload to, starting in the GAIT stage
+    """
+    assessment = PatientAssessment(
+        patient_id=1,
+        difficulty="Easy",
+        is_running=True,
+        current_step=PatientAssessment.STEP_ORDER.index(AssessmentStage.GAIT),
+        memorization_time=3
+    )
+    db.session.add(assessment)
+    db.session.commit()
+    return assessment
+
+
+def run_scenario(app: Flask, scenario: Scenario, session, base_url: str = "") -> ScenarioResult:
+    """
+    Runs the GAIT and RT_TEST upload phases of the stub for a scenario.
+
+    WatchStub.run_full_experiment targets the mock /join endpoints and /api/sensor-data,
+    which discards readings, so the phases are driven directly against the real upload
+    endpoints of a new assessment.
+
+    Args:
+        app (Flask): App whose database the assessments are created in.
+        scenario (Scenario): Configuration to run.
+        session: FlaskClientSession or requests.Session used to send requests.
+        base_url (str): Server URL, empty when using a FlaskClientSession.
+
+    Returns:
+        ScenarioResult: Measurements of the scenario.
+    """
+    result = ScenarioResult(scenario=asdict(scenario))
+    timed = TimedSession(session)
+    storage = app.config["STAGE_DATA_STORAGE"]
+    app.config["STAGE_DATA_STORAGE"] = scenario.storage
+
+    try:
+        size_before = database_size()
+        samples = 0
+        for repeat in range(scenario.repeats):
+            assessment = create_assessment()
+            stub = WatchStub(base_url=base_url, experiment_id=assessment.join_code, seed=repeat, wire_format=scenario.wire_format,
+                             compression=scenario.compression, session=timed, sample_rate_hz=scenario.sample_rate_hz)
+
+            stub.upload_url = base_url + UPLOAD_PATH.format(join_code=assessment.join_code, stage=AssessmentStage.GAIT.value)
+            stub.send_gait_data(duration_seconds=scenario.gait_duration_s)
+
+            assessment.current_step = PatientAssessment.STEP_ORDER.index(AssessmentStage.RT_TEST)
+            db.session.commit()
+            stub.upload_url = base_url + UPLOAD_PATH.format(join_code=assessment.join_code, stage=AssessmentStage.RT_TEST.value)
+            stub.send_rt_test_data(n_mem_steps=scenario.n_trials)
+            samples += stub.samples_sent
+        size_after = database_size()
+    finally:
+        app.config["STAGE_DATA_STORAGE"] = storage
+
+    latencies_ms = np.array(timed.latencies) * 1000
+    result.uploads = len(latencies_ms)
+    result.samples = samples
+    result.upload_seconds = round(float(sum(timed.latencies)), 6)
+    result.latency_ms = {
+        "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+        "max": round(float(latencies_ms.max()), 3)
+    }
+    result.samples_per_second = round(result.samples / result.upload_seconds, 1)
+    if size_before is not None:
+        result.db_growth_bytes = size_after - size_before
+        result.db_bytes_per_sample = round(result.db_growth_bytes / result.samples, 2)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    """
+    Gets the commit the benchmark runs on, so results can be compared between commits
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(results: list[ScenarioResult], path: str) -> dict:
+    """
+    Writes scenario results to a JSON file.
+
+    Returns:
+        dict: The written document.
+    """
+    document = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "results": {result.name: asdict(result) for result in results}
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    return document
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark watch upload ingest")
+    parser.add_argument("--output", default="ingest_benchmark.json")
+    parser.add_argument("--base-url", default=None, help="Benchmark a running server instead of the test client")
+    parser.add_argument("--lengths", type=float, nargs="+", default=RECORDING_LENGTHS_S)
+    parser.add_argument("--rates", type=int, nargs="+", default=SAMPLE_RATES_HZ)
+    parser.add_argument("--trials", type=int, nargs="+", default=TRIAL_COUNTS)
+    parser.add_argument("--wire-format", choices=["json", "binary"], default="json")
+    parser.add_argument("--storage", choices=[AssessmentStageData.STORAGE_ROWS, AssessmentStageData.STORAGE_PACKED], default=AssessmentStageData.STORAGE_ROWS)
+    parser.add_argument("--compressions", choices=["none", "gzip", "deflate"], nargs="+", default=["none", "gzip", "deflate"])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    from run import create_app
+
+    app = create_app()
+    compressions = [None if compression == "none" else compression for compression in args.compressions]
+    scenarios = scenario_matrix(args.lengths, args.rates, args.trials, compressions, wire_format=args.wire_format,
+                                storage=args.storage, repeats=args.repeats)
+
+    with app.app_context():
+        if args.base_url:
+            import requests
+            session, base_url = requests.Session(), args.base_url.rstrip("/")
+        else:
+            session, base_url = FlaskClientSession(app.test_client()), ""
+
+        results = []
+        for scenario in scenarios:
+            result = run_scenario(app, scenario, session, base_url)
+            results.append(result)
+            print(f"{scenario.name}: p50 {result.latency_ms['p50']} ms, p95 {result.latency_ms['p95']} ms, "
+                  f"p99 {result.latency_ms['p99']} ms, {result.samples_per_second:,.0f} samples/s, "
+                  f"{result.db_growth_bytes} bytes")
+
+    write_results(results, args.output)
+    print(f"Wrote {len(results)} results to {args.output}")
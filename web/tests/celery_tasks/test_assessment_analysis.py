@@ -0,0 +1,122 @@
+from flask.testing import FlaskClient
+import numpy as np
+import pytest
+
+from app import db
+from app.models import AssessmentStage, AssessmentStageData, MemoryAnalysis, PatientAssessment, ZeroCrossingAnalysis
+from app.celery_tasks.assessment_analysis import analyze_assessment
+from app.celery_tasks.memory_analysis import memory_analysis
+from app.celery_tasks.peak_identification import identify_peaks
+
+def add_stage_data(assessment_id: int, stage: AssessmentStage, amplitude: float, packed: bool, seed: int) -> AssessmentStageData:
+    """Helper to store 20 s of noisy sinusoidal readings at 50 Hz for a stage."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(1000) / 50
+    timestamps = 1700000000000 + np.arange(1000, dtype=np.int64) * 20
+    x = amplitude * np.sin(2 * np.pi * 1.9 * t) + rng.normal(0, 0.05, 1000)
+    stage_data = AssessmentStageData.from_arrays(timestamps, x, 0.3 * x, np.full(1000, 0.1), stage, assessment_id, packed)
+    db.session.add(stage_data)
+    db.session.commit()
+    return stage_data
+
+@pytest.fixture
+def assessment_with_stages(test_client: FlaskClient) -> tuple[int, list[AssessmentStageData]]:
+    """
+    Create a finished assessment with row and packed GAIT stages, two RT trials with
+    movement and one trial without any movement.
+    """
+    assessment = PatientAssessment(patient_id=1, difficulty="Easy", is_running=False)
+    db.session.add(assessment)
+    db.session.commit()
+
+    stages = [
+        add_stage_data(assessment.id, AssessmentStage.GAIT, 1.0, packed=False, seed=0),
+        add_stage_data(assessment.id, AssessmentStage.GAIT, 1.0, packed=True, seed=1),
+        add_stage_data(assessment.id, AssessmentStage.RT_TEST, 5.0, packed=False, seed=2),
+        add_stage_data(assessment.id, AssessmentStage.RT_TEST, 5.0, packed=True, seed=3),
+        add_stage_data(assessment.id, AssessmentStage.RT_TEST, 0.5, packed=False, seed=4)
+    ]
+    return assessment.id, stages
+
+def analyses_of(stage_data_id: int) -> tuple[list, list]:
+    """Helper to get the comparable results stored for a stage."""
+    gait = [
+        (analysis.avg_peak_distance, analysis.std_dev_peak_distance, analysis.peak_positions().tolist(), analysis.trough_positions().tolist())
+        for analysis in db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stage_data_id)
+    ]
+    memory = [
+        (analysis.time_to_move, analysis.average_accl_post_threshold, analysis.max_accl, analysis.no_movement)
+        for analysis in db.session.query(MemoryAnalysis).filter_by(assessment_stage_data_id=stage_data_id)
+    ]
+    return gait, memory
+
+def test_analyze_assessment_matches_stage_tasks(assessment_with_stages: tuple[int, list[AssessmentStageData]]):
+    """
+    GIVEN a finished assessment with GAIT and RT_TEST stage data
+    WHEN the analyze_assessment task is executed
+    THEN every stage gets the results the per-stage tasks store, with the trial without movement marked as such.
+    """
+    assessment_id, stages = assessment_with_stages
+    result = analyze_assessment(assessment_id)
+
+    assert result == {"analyzed": [stage.id for stage in stages], "no_movement": [stages[4].id]}
+    batch = [analyses_of(stage.id) for stage in stages]
+
+    for analysis in db.session.query(ZeroCrossingAnalysis).filter(ZeroCrossingAnalysis.stage_data_id.in_([stage.id for stage in stages])):
+        db.session.delete(analysis)
+    db.session.query(MemoryAnalysis).filter(MemoryAnalysis.assessment_stage_data_id.in_([stage.id for stage in stages])).delete()
+    db.session.commit()
+
+    for stage in stages[:2]:
+        identify_peaks(stage.id)
+    for stage in stages[2:]:
+        memory_analysis(stage.id)
+
+    assert batch == [analyses_of(stage.id) for stage in stages]
+    assert all(len(gait) == 1 and len(gait[0][2]) > 10 for gait, _ in batch[:2])
+    assert all(len(memory) == 1 for _, memory in batch[2:])
+    assert batch[4][1][0][:2] == (None, None)
+
+def test_analyze_assessment_skips_analyzed_stages(assessment_with_stages: tuple[int, list[AssessmentStageData]]):
+    """
+    GIVEN an assessment whose GAIT stage was already analyzed, e.g. while it was streamed
+    WHEN the analyze_assessment task is executed twice
+    THEN no stage data is analyzed twice.
+    """
+    assessment_id, stages = assessment_with_stages
+    identify_peaks(stages[0].id)
+
+    assert analyze_assessment(assessment_id)["analyzed"] == [stage.id for stage in stages[1:]]
+    assert analyze_assessment(assessment_id) == {"analyzed": [], "no_movement": []}
+
+    stage_ids = [stage.id for stage in stages]
+    assert db.session.query(ZeroCrossingAnalysis).filter(ZeroCrossingAnalysis.stage_data_id.in_(stage_ids)).count() == 2
+    assert db.session.query(MemoryAnalysis).filter(MemoryAnalysis.assessment_stage_data_id.in_(stage_ids)).count() == 3
+
+def test_run_celery_tasks_queues_one_task(assessment_with_stages: tuple[int, list[AssessmentStageData]], monkeypatch: pytest.MonkeyPatch):
+    """
+    GIVEN a finished assessment with several stages
+    WHEN its celery tasks are run
+    THEN a single analyze_assessment task is queued for the assessment.
+    """
+    assessment_id, _ = assessment_with_stages
+    queued = []
+    monkeypatch.setattr(analyze_assessment, "delay", queued.append)
+
+    db.session.get(PatientAssessment, assessment_id).run_celery_tasks()
+
+    assert queued == [assessment_id]
+
+def test_load_arrays_matches_as_arrays(assessment_with_stages: tuple[int, list[AssessmentStageData]]):
+    """
+    GIVEN row and packed stage data
+    WHEN their readings are loaded together
+    THEN each stage's arrays are the ones as_arrays returns.
+    """
+    _, stages = assessment_with_stages
+    arrays = AssessmentStageData.load_arrays(stages)
+
+    assert sorted(arrays) == sorted(stage.id for stage in stages)
+    for stage in stages:
+        for expected, actual in zip(stage.as_arrays(), arrays[stage.id]):
+            np.testing.assert_array_equal(actual, expected)
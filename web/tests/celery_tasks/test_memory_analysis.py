@@ -127,4 +127,51 @@ def test_memory_analysis_celery_integration(test_client: FlaskClient, generate_s
     # Validate computed values (these expected values are based on the generated data)
     assert analysis.time_to_move <= 60 and analysis.time_to_move >= 40, "Time to move should be between 40 and 60 ms."
     assert analysis.average_accl_post_threshold > 0, "Average acceleration post-threshold should be positive."
-    assert analysis.max_accl > 9 and analysis.max_accl < 10, "Max acceleration should be between 9 and 10 G."
\ No newline at end of file
+    assert analysis.max_accl > 9 and analysis.max_accl < 10, "Max acceleration should be between 9 and 10 G."
+
+
+def test_memory_analysis_without_movement(test_client: FlaskClient):
+    """
+    GIVEN an RT_TEST AssessmentStageData whose acceleration never exceeds the movement threshold
+    WHEN the memory_analysis task is executed
+    THEN a MemoryAnalysis marked as having no movement is stored instead of the task failing.
+    """
+    stage_data = AssessmentStageData(stage=AssessmentStage.RT_TEST)
+    start_time = datetime.now()
+    stage_data.points = [
+        StageDataPoint(timestamp=start_time + timedelta(milliseconds=10 * i), x=0.5, y=0.5, z=0.5)
+        for i in range(50)
+    ]
+    db.session.add(stage_data)
+    db.session.commit()
+
+    memory_analysis(stage_data.id)
+
+    analysis: MemoryAnalysis = MemoryAnalysis.query.filter_by(assessment_stage_data_id=stage_data.id).one()
+    assert analysis.no_movement
+    assert analysis.time_to_move is None
+    assert analysis.average_accl_post_threshold is None
+    assert analysis.max_accl == pytest.approx(np.sqrt(0.75))
+
+
+def test_memory_analysis_rerun_replaces_analysis(test_app, test_client: FlaskClient, generate_stage_data_points: int):
+    """
+    GIVEN an RT_TEST stage analyzed by memory_analysis
+    WHEN the task runs again on the same readings and then with a resample rate configured
+    THEN the first rerun keeps the analysis and the second replaces it, leaving a single analysis.
+    """
+    # run() keeps the task in the test app's context, whose config is changed below
+    memory_analysis.run(generate_stage_data_points)
+    first = MemoryAnalysis.query.filter_by(assessment_stage_data_id=generate_stage_data_points).one()
+    first_id, first_fingerprint = first.id, first.fingerprint
+
+    memory_analysis.run(generate_stage_data_points)
+    assert MemoryAnalysis.query.filter_by(assessment_stage_data_id=generate_stage_data_points).one().id == first_id
+
+    test_app.config["RESAMPLE_RATE_HZ"] = 50
+    try:
+        memory_analysis.run(generate_stage_data_points)
+    finally:
+        test_app.config["RESAMPLE_RATE_HZ"] = None
+
+    assert MemoryAnalysis.query.filter_by(assessment_stage_data_id=generate_stage_data_points).one().fingerprint != first_fingerprint
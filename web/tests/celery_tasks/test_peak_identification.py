@@ -5,7 +5,8 @@ import numpy as np
 
 from app import db
 from app.models import AssessmentStageData, AssessmentStage, StageDataPoint, ZeroCrossingAnalysis
-from app.celery_tasks.peak_identification import identify_peaks
+from app.celery_tasks.peak_identification import analyze_gait, identify_peaks
+from app.utilities.gait_signal import find_peaks_and_troughs
 
 def create_sinusoidal_data(stage_data: AssessmentStageData, amplitude: float, frequency: float, duration: float, fs: int):
     """
@@ -75,8 +76,8 @@ def test_identify_peaks(test_client: FlaskClient, sample_assessment_stage_data:
     ).first()
     
     assert analysis is not None, "ZeroCrossingAnalysis should be created."
-    assert len(analysis.peak_indices) > 0, "There should be detected peak indices."
-    assert len(analysis.trough_indices) > 0, "There should be detected trough indices."
+    assert analysis.num_peaks > 0, "There should be detected peak indices."
+    assert analysis.num_troughs > 0, "There should be detected trough indices."
     
     # Check that average distances are 2 seconds apart (since period is 2s, peaks/troughs every 1s)
     assert analysis.avg_peak_distance == pytest.approx(1.0, abs=0.1), "Average peak distance of eulidian norm should be approximately 1 second."
@@ -86,6 +87,57 @@ def test_identify_peaks(test_client: FlaskClient, sample_assessment_stage_data:
     assert analysis.std_dev_peak_distance < 0.05, "Standard deviation of peak distances should be near zero."
     assert analysis.std_dev_trough_distance < 0.05, "Standard deviation of trough distances should be near zero."
 
+    # The norm repeats every second, and every repetition is the same
+    assert analysis.step_frequency == pytest.approx(1.0, abs=0.05), "Dominant step frequency should be the 1 Hz of the norm."
+    assert analysis.step_regularity > 0.9 and analysis.stride_regularity > 0.9, "A clean sine wave should be regular."
+
+
+def test_identify_peaks_storage_backends(test_app, test_client: FlaskClient, sample_assessment_stage_data: AssessmentStageData):
+    """
+    GIVEN a sample AssessmentStageData with sinusoidal data
+    WHEN the gait analysis stores its results as PeakIndex/TroughIndex rows and as packed blobs
+    THEN both analyses have the same positions and counts, and the packed one adds no index rows.
+    """
+    analyses = {}
+    for storage in [ZeroCrossingAnalysis.STORAGE_ROWS, ZeroCrossingAnalysis.STORAGE_PACKED]:
+        test_app.config["PEAK_INDEX_STORAGE"] = storage
+        try:
+            analyses[storage] = analyze_gait(sample_assessment_stage_data.id, *sample_assessment_stage_data.as_arrays())
+        finally:
+            test_app.config["PEAK_INDEX_STORAGE"] = ZeroCrossingAnalysis.STORAGE_PACKED
+        db.session.add(analyses[storage])
+    db.session.commit()
+
+    rows, packed = analyses[ZeroCrossingAnalysis.STORAGE_ROWS], analyses[ZeroCrossingAnalysis.STORAGE_PACKED]
+    assert not rows.is_packed and packed.is_packed
+    assert len(packed.packed_peaks) == 4 * packed.num_peaks
+    assert packed.peak_indices == [] and packed.trough_indices == []
+    assert (rows.num_peaks, rows.num_troughs) == (packed.num_peaks, packed.num_troughs) == (len(rows.peak_indices), len(rows.trough_indices))
+    np.testing.assert_array_equal(packed.peak_positions(), rows.peak_positions())
+    np.testing.assert_array_equal(packed.trough_positions(), rows.trough_positions())
+
+def test_identify_peaks_rerun_replaces_analysis(test_app, test_client: FlaskClient, sample_assessment_stage_data: AssessmentStageData):
+    """
+    GIVEN a stage analyzed by identify_peaks
+    WHEN identify_peaks runs again on the same readings and then with a resample rate configured
+    THEN the first rerun keeps the analysis and the second replaces it, leaving a single analysis.
+    """
+    stage_data_id = sample_assessment_stage_data.id
+    # run() keeps the task in the test app's context, whose config is changed below
+    identify_peaks.run(stage_data_id)
+    first = db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stage_data_id).one()
+    first_id, first_fingerprint = first.id, first.fingerprint
+
+    identify_peaks.run(stage_data_id)
+    assert db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stage_data_id).one().id == first_id
+
+    test_app.config["RESAMPLE_RATE_HZ"] = 50
+    try:
+        identify_peaks.run(stage_data_id)
+    finally:
+        test_app.config["RESAMPLE_RATE_HZ"] = None
+
+    assert db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stage_data_id).one().fingerprint != first_fingerprint
 
 def test_identify_peaks_no_data(test_client: FlaskClient):
     """
@@ -120,8 +172,8 @@ def test_identify_peaks_celery_integration(test_client: FlaskClient, sample_asse
     ).first()
    
     assert analysis is not None, "ZeroCrossingAnalysis should be created."
-    assert len(analysis.peak_indices) > 0, "There should be detected peak indices."
-    assert len(analysis.trough_indices) > 0, "There should be detected trough indices."
+    assert analysis.num_peaks > 0, "There should be detected peak indices."
+    assert analysis.num_troughs > 0, "There should be detected trough indices."
     
     # Check that average distances are 2 seconds apart (since period is 2s, peaks/troughs every 1s)
     assert analysis.avg_peak_distance == pytest.approx(1.0, abs=0.1), "Average peak distance of eulidian norm should be approximately 1 second."
@@ -158,11 +210,29 @@ def test_identify_peaks_under_threshold(test_client: FlaskClient):
     ).first()
     
     assert analysis is not None, "ZeroCrossingAnalysis should be created."
-    assert len(analysis.peak_indices) == 0, "There should be no detected peak indices."
-    assert len(analysis.trough_indices) == 0, "There should be no detected trough indices."
+    assert analysis.num_peaks == 0, "There should be no detected peak indices."
+    assert analysis.num_troughs == 0, "There should be no detected trough indices."
 
     assert analysis.avg_peak_distance == 0, "Average peak distance should be zero."
     assert analysis.avg_trough_distance == 0, "Average trough distance should be zero." 
 
     assert analysis.std_dev_peak_distance == 0, "Standard deviation of peak distances should be zero."
-    assert analysis.std_dev_trough_distance == 0, "Standard deviation of trough distances should be zero."
\ No newline at end of file
+    assert analysis.std_dev_trough_distance == 0, "Standard deviation of trough distances should be zero."
+
+def test_vectorized_peaks_ties_and_short_signals():
+    """
+    GIVEN a signal whose segments repeat their extremum or fall in the filter warm-up,
+    and signals too short to have segments
+    WHEN peaks and troughs are found
+    THEN the first occurrence of each extremum is used like idxmin/idxmax, segments
+    without readings are skipped, and short signals have none.
+    """
+    signal = np.array([np.nan] * 25 + [0.5, 0.5, -0.9, -0.9, -0.2, 0.6, 0.6, -0.1, -0.7, 0.05, 0.0] * 6)
+
+    peaks, troughs = find_peaks_and_troughs(signal, 0.2)
+
+    # Crossings are found on the signal without its 25 NaN, but segments are taken in the full signal
+    assert peaks == [25, 30, 31, 36, 41, 42, 47, 52, 53, 58, 63]
+    assert troughs == [27, 28, 33, 38, 39, 44, 49, 50, 55, 60, 61]
+    assert find_peaks_and_troughs(np.full(10, np.nan), 0.2) == ([], [])
+    assert find_peaks_and_troughs(np.array([np.nan] * 25 + [1.0, -1.0]), 0.2) == ([], [])
@@ -0,0 +1,31 @@
+from flask.testing import FlaskClient
+
+from app.models import ReactionTimeSummary
+from app.db import db
+from tests.models.test_reaction_time_summary import RECORDS, create_assessment
+
+def test_backfill_command_summarizes_assessments(test_app, test_client: FlaskClient):
+    """
+    GIVEN finished assessments without a reaction time summary, and one that already has one
+    WHEN the reaction-summaries backfill command is run
+    THEN the missing summaries are stored and the existing one is kept.
+    """
+    pending = [create_assessment(1, RECORDS), create_assessment(1, RECORDS[:1])]
+    summarized = create_assessment(1, RECORDS)
+    summarized.summarize_reactions()
+    summarized.reaction_summary.num_reactions = 99
+    db.session.commit()
+
+    result = test_app.test_cli_runner().invoke(args=["reaction-summaries", "backfill", "--batch-size", "1"])
+
+    assert result.exit_code == 0, result.output
+    assert "Done. Summarized" in result.output
+
+    db.session.expire_all()
+    counts = {
+        summary.assessment_id: summary.num_reactions
+        for summary in db.session.query(ReactionTimeSummary).filter(
+            ReactionTimeSummary.assessment_id.in_([assessment.id for assessment in [*pending, summarized]])
+        )
+    }
+    assert counts == {pending[0].id: 4, pending[1].id: 1, summarized.id: 99}
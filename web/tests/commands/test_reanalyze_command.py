@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+from flask.testing import FlaskClient
+import numpy as np
+import pytest
+
+from app import create_app
+from app.db import db
+from app.models import AssessmentStage, AssessmentStageData, MemoryAnalysis, PatientAssessment, ZeroCrossingAnalysis
+from app.celery_tasks.memory_analysis import memory_analysis
+from app.celery_tasks.peak_identification import identify_peaks
+
+def create_assessment_with_stages(stage: AssessmentStage, n_stages: int, date_taken: datetime) -> list[int]:
+    """Helper to store an assessment with noisy sinusoidal readings for several stages of a kind."""
+    assessment = PatientAssessment(patient_id=1, difficulty="Easy", is_running=False, date_taken=date_taken)
+    db.session.add(assessment)
+    db.session.commit()
+
+    ids = []
+    for seed in range(n_stages):
+        rng = np.random.default_rng(seed)
+        t = np.arange(600) / 50
+        x = 4 * np.sin(2 * np.pi * 1.9 * t) + rng.normal(0, 0.05, 600)
+        stage_data = AssessmentStageData.from_arrays(
+            1700000000000 + np.arange(600, dtype=np.int64) * 20, x, 0.3 * x, np.full(600, 0.1), stage, assessment.id, seed % 2 == 1
+        )
+        db.session.add(stage_data)
+        db.session.commit()
+        ids.append(stage_data.id)
+    return ids
+
+def next_assessment_date() -> datetime:
+    """Helper to get a date after every stored assessment, so --since only selects the assessments of a test."""
+    latest = db.session.query(db.func.max(PatientAssessment.date_taken)).scalar() or datetime(2000, 1, 1)
+    return datetime.combine(latest.date() + timedelta(days=1), datetime.min.time())
+
+def test_reanalyze_dry_run_reports_changes(test_app, test_client: FlaskClient):
+    """
+    GIVEN RT trials of a recent assessment, one with a stored result that is out of date and one never analyzed
+    WHEN reanalyze is run as a dry run
+    THEN both differences are reported and nothing is written.
+    """
+    since = next_assessment_date()
+    ids = create_assessment_with_stages(AssessmentStage.RT_TEST, 3, since)
+    for stage_id in ids[:2]:
+        memory_analysis(stage_id)
+    stale = db.session.query(MemoryAnalysis).filter_by(assessment_stage_data_id=ids[0]).one()
+    stale.max_accl = 1.0
+    db.session.commit()
+
+    result = test_app.test_cli_runner().invoke(args=["reanalyze", "--stage", "RT_TEST", "--since", f"{since:%Y-%m-%d}", "--workers", "1", "--dry-run"])
+
+    assert result.exit_code == 0, result.output
+    assert "Comparing 3 RT_TEST stages" in result.output
+    assert f"stage data {ids[0]}: max_accl 1.0 -> " in result.output
+    assert f"stage data {ids[1]}:" not in result.output
+    assert f"stage data {ids[2]}: new analysis" in result.output
+    assert "Done. Compared 3 stages (1,800 samples)" in result.output and "2 changed" in result.output
+
+    db.session.expire_all()
+    assert db.session.get(MemoryAnalysis, stale.id).max_accl == 1.0
+    assert db.session.query(MemoryAnalysis).filter_by(assessment_stage_data_id=ids[2]).count() == 0
+
+def test_reanalyze_compares_against_shown_analysis(test_app, test_client: FlaskClient):
+    """
+    GIVEN an RT trial with an out of date analysis and a later up to date copy of it
+    WHEN reanalyze is run as a dry run
+    THEN the change is reported against the first analysis, which is the one the dashboard shows.
+    """
+    since = next_assessment_date()
+    stage_id = create_assessment_with_stages(AssessmentStage.RT_TEST, 1, since)[0]
+    memory_analysis(stage_id)
+    shown = db.session.query(MemoryAnalysis).filter_by(assessment_stage_data_id=stage_id).one()
+    db.session.add(MemoryAnalysis(
+        assessment_stage_data_id=stage_id, time_to_move=shown.time_to_move, average_accl_post_threshold=shown.average_accl_post_threshold,
+        max_accl=shown.max_accl, no_movement=shown.no_movement
+    ))
+    shown.max_accl = 1.0
+    db.session.commit()
+
+    result = test_app.test_cli_runner().invoke(args=["reanalyze", "--stage", "RT_TEST", "--since", f"{since:%Y-%m-%d}", "--workers", "1", "--dry-run"])
+
+    assert result.exit_code == 0, result.output
+    assert f"stage data {stage_id}: max_accl 1.0 -> " in result.output
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reanalyze_replaces_results(test_app, test_client: FlaskClient, workers: int):
+    """
+    GIVEN GAIT stages of a recent assessment with duplicate and out of date analyses, and of an older assessment
+    WHEN reanalyze is run in process or over a process pool with pages of 2 stages
+    THEN each recent stage ends up with exactly one up to date analysis and older stages are untouched.
+    """
+    since = next_assessment_date()
+    old_ids = create_assessment_with_stages(AssessmentStage.GAIT, 1, since - timedelta(days=1))
+    ids = create_assessment_with_stages(AssessmentStage.GAIT, 5, since)
+    identify_peaks(ids[0])
+    duplicate = ZeroCrossingAnalysis.from_peaks(ids[0], [1, 2], [0, 20], [], [])
+    db.session.add(duplicate)
+    db.session.commit()
+
+    result = test_app.test_cli_runner().invoke(args=[
+        "reanalyze", "--stage", "GAIT", "--since", f"{since:%Y-%m-%d}", "--workers", str(workers), "--page-size", "2"
+    ])
+
+    assert result.exit_code == 0, result.output
+    assert "5/5 stages" in result.output
+    assert "Done. Reanalyzed 5 stages" in result.output
+
+    db.session.expire_all()
+    analyses = db.session.query(ZeroCrossingAnalysis).filter(ZeroCrossingAnalysis.stage_data_id.in_(ids)).all()
+    assert sorted(analysis.stage_data_id for analysis in analyses) == ids
+    assert all(analysis.num_peaks > 10 for analysis in analyses)
+    assert db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=old_ids[0]).count() == 0
+
+    result = test_app.test_cli_runner().invoke(args=["reanalyze", "--stage", "GAIT", "--since", f"{since:%Y-%m-%d}", "--workers", "1", "--dry-run"])
+    assert "0 changed" in result.output
+
+def test_reanalyze_workers_use_command_database(tmp_path):
+    """
+    GIVEN an app whose database isn't the default one, with GAIT stages to reanalyze
+    WHEN reanalyze is run over a process pool
+    THEN the workers write the new analyses to that database and not to the default one.
+    """
+    other_app = create_app(test_config=True, config_overrides={"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'other.sqlite'}"})
+    default_app = create_app(test_config=True)
+    with default_app.app_context():
+        default_count = db.session.query(ZeroCrossingAnalysis).count()
+
+    with other_app.app_context():
+        ids = create_assessment_with_stages(AssessmentStage.GAIT, 4, datetime(2025, 1, 1))
+
+        result = other_app.test_cli_runner().invoke(args=["reanalyze", "--stage", "GAIT", "--workers", "2", "--page-size", "2"])
+
+        assert result.exit_code == 0, result.output
+        assert "Done. Reanalyzed 4 stages" in result.output
+        analyses = db.session.query(ZeroCrossingAnalysis).all()
+        assert sorted(analysis.stage_data_id for analysis in analyses) == ids
+
+    with default_app.app_context():
+        assert db.session.query(ZeroCrossingAnalysis).count() == default_count
@@ -0,0 +1,107 @@
+from flask import Flask
+import numpy as np
+import pytest
+
+from app import create_app
+from app.models import AssessmentStage, AssessmentStageData, PeakIndex, StageDataPoint, TroughIndex, ZeroCrossingAnalysis
+from app.db import db
+
+@pytest.fixture
+def command_app(tmp_path):
+    """
+    App on a throwaway database, since the commands convert or upgrade every row of the database they run on.
+    """
+    app = create_app(test_config=True, config_overrides={"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'commands.sqlite'}"})
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+def test_pack_command_converts_rows(command_app: Flask):
+    """
+    GIVEN stage data stored as StageDataPoint rows
+    WHEN the stage-data pack command is run
+    THEN the readings are moved into a packed blob and the rows are deleted.
+    """
+    body = {
+        "data": [
+            {"timestamp": 1700000000000 + i * 10, "x": i / 10, "y": -i / 10, "z": 1.5}
+            for i in range(50)
+        ]
+    }
+    stage_data = AssessmentStageData.from_json(body, AssessmentStage.RT_TEST, None)
+    db.session.add(stage_data)
+    db.session.commit()
+    expected = stage_data.as_arrays()
+
+    result = command_app.test_cli_runner().invoke(args=["stage-data", "pack", "--batch-size", "2"])
+
+    assert result.exit_code == 0, result.output
+    assert "Done. Packed" in result.output
+
+    db.session.expire_all()
+    stage_data = db.session.get(AssessmentStageData, stage_data.id)
+    assert stage_data.is_packed
+    assert stage_data.sample_count == 50
+    assert db.session.query(StageDataPoint).filter_by(sensor_id=stage_data.id).count() == 0
+    for before, after in zip(expected, stage_data.as_arrays()):
+        np.testing.assert_allclose(after, before, atol=1e-6)
+
+def test_pack_peaks_command_converts_rows(command_app: Flask):
+    """
+    GIVEN gait analyses storing their positions as PeakIndex and TroughIndex rows without counts
+    WHEN the stage-data pack-peaks command is run
+    THEN the positions are moved into packed blobs, the counts are filled in and the rows are deleted.
+    """
+    analyses = []
+    for peaks, troughs in [([30, 10, 20], [15, 25]), ([], [])]:
+        analysis = ZeroCrossingAnalysis.from_peaks(None, peaks, [], troughs, [], packed=False)
+        analysis.num_peaks = analysis.num_troughs = None
+        db.session.add(analysis)
+        analyses.append(analysis)
+    db.session.commit()
+    ids = [analysis.id for analysis in analyses]
+
+    result = command_app.test_cli_runner().invoke(args=["stage-data", "pack-peaks", "--batch-size", "1"])
+
+    assert result.exit_code == 0, result.output
+    assert "Done. Packed" in result.output
+
+    db.session.expire_all()
+    converted, empty = (db.session.get(ZeroCrossingAnalysis, analysis_id) for analysis_id in ids)
+    assert converted.is_packed and empty.is_packed
+    assert converted.peak_positions().tolist() == [10, 20, 30]
+    assert converted.trough_positions().tolist() == [15, 25]
+    assert (converted.num_peaks, converted.num_troughs, empty.num_peaks, empty.num_troughs) == (3, 2, 0, 0)
+    assert db.session.query(PeakIndex).filter(PeakIndex.analysis_id.in_(ids)).count() == 0
+    assert db.session.query(TroughIndex).filter(TroughIndex.analysis_id.in_(ids)).count() == 0
+
+def test_upgrade_db_is_idempotent(command_app: Flask):
+    """
+    GIVEN a database that already matches the models
+    WHEN the upgrade-db command is run
+    THEN no columns are added and the command succeeds.
+    """
+    result = command_app.test_cli_runner().invoke(args=["upgrade-db"])
+
+    assert result.exit_code == 0, result.output
+    assert "Added columns" not in result.output
+    assert "Added indexes" not in result.output
+    assert "Database schema is up to date." in result.output
+
+def test_upgrade_db_drops_only_superseded_indexes(command_app: Flask):
+    """
+    GIVEN a database with the global upload_id index that was replaced and an index created by hand
+    WHEN the upgrade-db command is run
+    THEN the replaced index is dropped and the one created by hand is kept.
+    """
+    db.session.execute(db.text("CREATE UNIQUE INDEX ix_assessmentstagedata_upload_id ON assessmentstagedata (upload_id)"))
+    db.session.execute(db.text("CREATE INDEX ix_assessmentstagedata_received ON assessmentstagedata (received_samples)"))
+    db.session.commit()
+
+    result = command_app.test_cli_runner().invoke(args=["upgrade-db"])
+
+    assert result.exit_code == 0, result.output
+    assert "Dropped indexes from assessmentstagedata: ix_assessmentstagedata_upload_id" in result.output
+    indexes = {index["name"] for index in db.inspect(db.engine).get_indexes("assessmentstagedata")}
+    assert "ix_assessmentstagedata_received" in indexes
+    assert "ix_assessmentstagedata_upload_id" not in indexes
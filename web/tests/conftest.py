@@ -1,5 +1,8 @@
+from contextlib import contextmanager
+
 import pytest
 
+from app.utilities.query_stats import count_queries
 from run import create_app
 
 # Based off example at: https://testdriven.io/blog/flask-pytest/
@@ -20,4 +23,20 @@ def test_client(test_app):
     # Create a test client using the Flask application configured for testing
     with test_app.test_client() as testing_client:
         with test_app.app_context():
-            yield testing_client
\ No newline at end of file
+            yield testing_client
+
+
+@pytest.fixture(scope='function')
+def max_queries():
+    """
+    Context manager asserting that its with block runs at most the given number of SQL statements.
+
+    Usage: with max_queries(5) as counter: ...
+    """
+    @contextmanager
+    def check(limit: int):
+        with count_queries() as counter:
+            yield counter
+        assert counter.count <= limit, f"{counter.count} queries, over the limit of {limit}:\n" + "\n".join(counter.statements)
+
+    return check
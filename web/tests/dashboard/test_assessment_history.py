@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from flask.testing import FlaskClient
+
+from app.utilities.assessment_history import decode_cursor, encode_cursor
+from app.db import db
+from tests.dashboard.test_query_budgets import get_page
+from tests.memory_testing.test_memory_test import create_patient_user, create_physician_user
+from tests.models.test_reaction_time_summary import RECORDS, create_assessment
+
+def create_history(patient_id: int, dates: list[datetime]) -> list[int]:
+    """Helper to create assessments of a patient taken at the given dates, returning their IDs."""
+    ids = []
+    for date_taken in dates:
+        assessment = create_assessment(patient_id, RECORDS)
+        assessment.date_taken = date_taken
+        ids.append(assessment.id)
+    db.session.commit()
+    return ids
+
+def read_history(test_app, user_id: int, limit: int = 2) -> list[dict]:
+    """Helper to read every page of the assessment history API as a user."""
+    assessments = []
+    cursor = None
+    while True:
+        url = f"/api/assessments?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = get_page(test_app, user_id, url)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        assert len(page["assessments"]) <= limit
+        assessments.extend(page["assessments"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            return assessments
+
+def test_history_pages_newest_first(test_app, test_client: FlaskClient):
+    """
+    GIVEN a patient with assessments, two of them taken at the same time
+    WHEN they page through their history 2 assessments at a time
+    THEN every assessment is returned once, newest first and by descending ID for equal dates.
+    """
+    user, patient = create_patient_user("History Patient", f"{uuid4()}@test.com")
+    start = datetime(2025, 3, 1, 9, 30)
+    dates = [start, start + timedelta(days=2), start + timedelta(days=1), start + timedelta(days=1), start + timedelta(days=3)]
+    ids = create_history(patient.id, dates)
+    user_id = user.id
+
+    assessments = read_history(test_app, user_id)
+
+    assert [assessment["id"] for assessment in assessments] == [ids[4], ids[1], ids[3], ids[2], ids[0]]
+    assert assessments[-1]["date_taken"] == "2025-03-01T04:30:00-05:00"
+    assert set(assessments[0]) == {"id", "date_taken", "score", "total_rounds", "avg_reaction_time", "difficulty"}
+
+def test_history_pages_mixed_date_formats(test_app, test_client: FlaskClient):
+    """
+    GIVEN an assessment dated by the database's default timestamp and another given the same date in Python
+    WHEN the patient pages through their history 1 assessment at a time
+    THEN both are returned once even though their dates are stored in different formats.
+    """
+    user, patient = create_patient_user("Format Patient", f"{uuid4()}@test.com")
+    defaulted = create_assessment(patient.id, RECORDS)
+    ids = [defaulted.id, *create_history(patient.id, [defaulted.date_taken, defaulted.date_taken])]
+    user_id = user.id
+
+    assessments = read_history(test_app, user_id, limit=1)
+
+    assert sorted(assessment["id"] for assessment in assessments) == sorted(ids)
+
+def test_history_selected_fields(test_app, test_client: FlaskClient):
+    """
+    GIVEN a patient with an assessment
+    WHEN they request their history with selected fields
+    THEN each assessment only has its ID and those fields.
+    """
+    user, patient = create_patient_user("Fields Patient", f"{uuid4()}@test.com")
+    assessment_id = create_history(patient.id, [datetime(2025, 3, 1)])[0]
+    user_id = user.id
+
+    response = get_page(test_app, user_id, "/api/assessments?fields=memory_accuracy,num_shapes")
+
+    assert response.status_code == 200
+    assert response.get_json()["assessments"] == [{"id": assessment_id, "memory_accuracy": None, "num_shapes": 3}]
+
+def test_history_rejects_invalid_parameters(test_app, test_client: FlaskClient):
+    """
+    GIVEN a logged in patient
+    WHEN they request their history with an unknown field, an invalid cursor or a limit out of range
+    THEN each request is rejected with a 400 error.
+    """
+    user, _ = create_patient_user("Invalid Patient", f"{uuid4()}@test.com")
+    user_id = user.id
+
+    for query in ("fields=score,reaction_records", "cursor=not-a-cursor", "limit=0", "limit=101"):
+        response = get_page(test_app, user_id, f"/api/assessments?{query}")
+        assert response.status_code == 400, query
+        assert response.get_json()["success"] is False
+
+def test_history_only_for_own_patients(test_app, test_client: FlaskClient):
+    """
+    GIVEN two physicians with a patient each
+    WHEN the physicians and the patients request each patient's history
+    THEN only the patient's own physician and the patient themselves can read it.
+    """
+    own_user, own_physician = create_physician_user("Own Physician", f"{uuid4()}@test.com")
+    other_user, _ = create_physician_user("Other Physician", f"{uuid4()}@test.com")
+    patient_user, patient = create_patient_user("Shared Patient", f"{uuid4()}@test.com", own_physician)
+    other_patient_user, _ = create_patient_user("Other Patient", f"{uuid4()}@test.com")
+    create_history(patient.id, [datetime(2025, 3, 1)])
+    url = f"/api/assessments?patient_id={patient.id}"
+
+    assert get_page(test_app, own_user.id, url).status_code == 200
+    assert get_page(test_app, patient_user.id, url).status_code == 200
+    assert get_page(test_app, other_user.id, url).status_code == 403
+    assert get_page(test_app, other_patient_user.id, url).status_code == 403
+
+def test_assessments_page_lists_first_page(test_app, test_client: FlaskClient):
+    """
+    GIVEN a patient with more assessments than fit in a page
+    WHEN they view the assessments page
+    THEN only the newest page is listed along with a button to load the next one.
+    """
+    user, patient = create_patient_user("Long History Patient", f"{uuid4()}@test.com")
+    start = datetime(2024, 1, 1, 12, 0)
+    create_history(patient.id, [start + timedelta(days=i) for i in range(test_app.config["ASSESSMENT_PAGE_SIZE"] + 1)])
+    user_id = user.id
+
+    page = get_page(test_app, user_id, "/assessments").get_data(as_text=True)
+
+    assert page.count("Short-Term Memory Test</td>") == test_app.config["ASSESSMENT_PAGE_SIZE"]
+    assert "2024-01-01 07:00" not in page
+    assert "2024-01-21 07:00" in page
+    assert 'id="loadMoreAssessments"' in page
+
+def test_cursor_round_trip():
+    """
+    GIVEN the stored date and ID of an assessment
+    WHEN they are encoded in a cursor
+    THEN decoding the cursor gives them back.
+    """
+    assert decode_cursor(encode_cursor("2025-03-01 09:30:00.000000", 42)) == ("2025-03-01 09:30:00.000000", 42)
+
+def test_history_page_uses_index(test_app, test_client: FlaskClient):
+    """
+    GIVEN the query of a page after a cursor
+    WHEN SQLite plans it
+    THEN it is read from the (patient_id, date_taken, id) index.
+    """
+    plan = db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT id FROM patientassessment WHERE patient_id = 1 "
+        "AND (date_taken < '2025-03-01' OR (date_taken = '2025-03-01' AND id < 5)) "
+        "ORDER BY date_taken DESC, id DESC LIMIT 3"
+    )).all()
+
+    assert any("ix_patientassessment_patient_date" in row[-1] for row in plan)
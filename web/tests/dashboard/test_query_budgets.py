@@ -0,0 +1,137 @@
+from uuid import uuid4
+
+from flask.testing import FlaskClient
+import pytest
+
+from app.models import AssessmentStage, AssessmentStageData, MemoryAnalysis
+from app.db import db
+from tests.memory_testing.test_memory_test import create_patient_user, create_physician_user
+from tests.models.test_reaction_time_summary import RECORDS, create_assessment
+
+def get_page(test_app, user_id: int, url: str):
+    """Helper to request a page as a user with a new client in its own app context, so it doesn't reuse the test's session."""
+    client = test_app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+    with test_app.app_context():
+        return client.get(url)
+
+def create_physician_with_patients(n_patients: int, n_assessments: int):
+    """Helper to create a physician whose patients each have finished assessments."""
+    user, physician = create_physician_user("Budget Physician", f"{uuid4()}@test.com")
+    patients = []
+    for i in range(n_patients):
+        _, patient = create_patient_user(f"Budget Patient {i}", f"{uuid4()}@test.com", physician)
+        for _ in range(n_assessments):
+            create_assessment(patient.id, RECORDS)
+        patients.append(patient)
+    return user, patients
+
+def create_assessment_with_trials(patient_id: int, n_trials: int):
+    """Helper to create an assessment with analyzed RT_TEST trials."""
+    assessment = create_assessment(patient_id, RECORDS)
+    trials = [AssessmentStageData(assessment_id=assessment.id, stage=AssessmentStage.RT_TEST) for _ in range(n_trials)]
+    db.session.add_all(trials)
+    db.session.flush()
+    db.session.add_all(
+        MemoryAnalysis(assessment_stage_data_id=trial.id, time_to_move=100.0 + i, average_accl_post_threshold=3.0, max_accl=5.0)
+        for i, trial in enumerate(trials)
+    )
+    db.session.commit()
+    return assessment
+
+def test_patient_details_query_budget(test_app, test_client: FlaskClient, max_queries):
+    """
+    GIVEN physicians with 2 and with 8 patients that each have assessments
+    WHEN they view their patient list
+    THEN both pages run the same small number of queries.
+    """
+    counts = []
+    for n_patients in (2, 8):
+        user, _ = create_physician_with_patients(n_patients, 2)
+        user_id = user.id
+        with max_queries(6) as counter:
+            response = get_page(test_app, user_id, "/patient_details")
+        assert response.status_code == 200
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
+
+@pytest.mark.parametrize("url", ["/", "/assessments", "/assessments/memory_test/customize"])
+def test_physician_roster_pages_query_budget(test_app, test_client: FlaskClient, max_queries, url: str):
+    """
+    GIVEN physicians with 2 and with 8 patients
+    WHEN they view a page listing or counting their patients
+    THEN both pages run the same small number of queries.
+    """
+    counts = []
+    for n_patients in (2, 8):
+        user, _ = create_physician_with_patients(n_patients, 1)
+        with max_queries(5) as counter:
+            response = get_page(test_app, user.id, url)
+        assert response.status_code == 200
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
+
+def test_specific_patient_query_budget(test_app, test_client: FlaskClient, max_queries):
+    """
+    GIVEN patients with 1 and with 10 assessments
+    WHEN their physician views each patient's page
+    THEN both pages run the same small number of queries.
+    """
+    user, patients = create_physician_with_patients(2, 0)
+    for patient, n_assessments in zip(patients, (1, 10)):
+        for _ in range(n_assessments):
+            create_assessment(patient.id, RECORDS).summarize_reactions()
+    db.session.commit()
+    user_id = user.id
+    patient_ids = [patient.id for patient in patients]
+
+    counts = []
+    for patient_id in patient_ids:
+        with max_queries(6) as counter:
+            response = get_page(test_app, user_id, f"/patient_details?patient_id={patient_id}")
+        assert response.status_code == 200
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
+
+def test_profile_query_budget(test_app, test_client: FlaskClient, max_queries):
+    """
+    GIVEN a logged in patient
+    WHEN they view their profile
+    THEN the patient profile is read with one query rather than one per column.
+    """
+    user, _ = create_patient_user("Profile Patient", f"{uuid4()}@test.com")
+    user_id = user.id
+
+    with max_queries(3):
+        response = get_page(test_app, user_id, "/profile")
+
+    assert response.status_code == 200
+
+@pytest.mark.parametrize("url, trial_marker", [
+    ("/reaction_data?assessment_id={assessment_id}&patient_id={patient_id}&name=Reaction", "{time_to_move}</td>"),
+    ("/api/reaction_data?assessment_id={assessment_id}", '"time_to_move":{time_to_move}')
+])
+def test_reaction_data_query_budget(test_app, test_client: FlaskClient, max_queries, url: str, trial_marker: str):
+    """
+    GIVEN assessments with 5 and with 500 analyzed RT trials
+    WHEN their reaction data is viewed as a page or as JSON
+    THEN both run the same small number of queries and list every trial.
+    """
+    user, patient = create_patient_user("Reaction Patient", f"{uuid4()}@test.com")
+    user_id = user.id
+    patient_id = patient.id
+
+    counts = []
+    for n_trials in (5, 500):
+        assessment_id = create_assessment_with_trials(patient_id, n_trials).id
+        with max_queries(5) as counter:
+            response = get_page(test_app, user_id, url.format(assessment_id=assessment_id, patient_id=patient_id))
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).replace(" ", "").count(trial_marker.format(time_to_move=100.0 + n_trials - 1)) == 1
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
@@ -0,0 +1,54 @@
+from uuid import uuid4
+
+from flask.testing import FlaskClient
+
+from app.models import AssessmentStage, AssessmentStageData, MemoryAnalysis
+from app.utilities.utils import get_reaction_analyses
+from app.db import db
+from tests.dashboard.test_query_budgets import get_page
+from tests.memory_testing.test_memory_test import create_patient_user, create_physician_user
+from tests.models.test_reaction_time_summary import RECORDS, create_assessment
+
+def test_reaction_analyses_first_analysis_per_trial(test_client: FlaskClient):
+    """
+    GIVEN an assessment with a reanalyzed RT trial, an RT trial without analysis and a GAIT stage
+    WHEN its reaction analyses are read
+    THEN there is one entry per RT trial in order, with the first analysis of each trial or None values.
+    """
+    _, patient = create_patient_user("Trials Patient", f"{uuid4()}@test.com")
+    assessment = create_assessment(patient.id, RECORDS)
+    gait, reanalyzed, pending = (AssessmentStageData(assessment_id=assessment.id, stage=stage) for stage in (AssessmentStage.GAIT, AssessmentStage.RT_TEST, AssessmentStage.RT_TEST))
+    db.session.add_all([gait, reanalyzed, pending])
+    db.session.flush()
+    db.session.add_all([
+        MemoryAnalysis(assessment_stage_data_id=reanalyzed.id, time_to_move=250.0, average_accl_post_threshold=2.5, max_accl=4.0),
+        MemoryAnalysis(assessment_stage_data_id=reanalyzed.id, time_to_move=260.0, average_accl_post_threshold=2.6, max_accl=4.1),
+    ])
+    db.session.commit()
+
+    trials = get_reaction_analyses(assessment.id)
+
+    assert trials == [
+        {"round": 1, "time_to_move": 250.0, "average_accl_post_threshold": 2.5, "max_accl": 4.0, "no_movement": False},
+        {"round": 2, "time_to_move": None, "average_accl_post_threshold": None, "max_accl": None, "no_movement": None},
+    ]
+
+def test_reaction_data_json_access(test_app, test_client: FlaskClient):
+    """
+    GIVEN an assessment of a physician's patient
+    WHEN the physician, the patient, another physician and another patient request its reaction data as JSON
+    THEN only the physician and the patient can read it, and an unknown assessment is not found.
+    """
+    own_user, own_physician = create_physician_user("Reaction Physician", f"{uuid4()}@test.com")
+    other_user, _ = create_physician_user("Other Reaction Physician", f"{uuid4()}@test.com")
+    patient_user, patient = create_patient_user("Reaction JSON Patient", f"{uuid4()}@test.com", own_physician)
+    other_patient_user, _ = create_patient_user("Other Reaction Patient", f"{uuid4()}@test.com")
+    url = f"/api/reaction_data?assessment_id={create_assessment(patient.id, RECORDS).id}"
+
+    response = get_page(test_app, own_user.id, url)
+    assert response.status_code == 200
+    assert response.get_json()["trials"] == []
+    assert get_page(test_app, patient_user.id, url).status_code == 200
+    assert get_page(test_app, other_user.id, url).status_code == 403
+    assert get_page(test_app, other_patient_user.id, url).status_code == 403
+    assert get_page(test_app, own_user.id, "/api/reaction_data?assessment_id=0").status_code == 404
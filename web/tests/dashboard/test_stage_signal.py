@@ -0,0 +1,103 @@
+from uuid import uuid4
+
+from flask.testing import FlaskClient
+import numpy as np
+
+from app.models import AssessmentStage, AssessmentStageData, ZeroCrossingAnalysis
+from app.db import db
+from tests.dashboard.test_query_budgets import get_page
+from tests.memory_testing.test_memory_test import create_patient_user, create_physician_user
+from tests.models.test_reaction_time_summary import RECORDS, create_assessment
+
+def create_gait_stage(patient_id: int, duration_s: int) -> AssessmentStageData:
+    """Helper to store a walking recording at 50 Hz with a peak and trough every half step."""
+    t = np.arange(0, duration_s, 0.02)
+    timestamps = 1700000000000 + np.rint(t * 1000).astype(np.int64)
+    y = 3 * np.sin(2 * np.pi * 1.9 * t)
+    stage_data = AssessmentStageData.from_arrays(timestamps, 0.3 * np.sin(2 * np.pi * 0.95 * t), y, np.full(len(t), 0.1),
+                                                 AssessmentStage.GAIT, create_assessment(patient_id, RECORDS).id, packed=True)
+    db.session.add(stage_data)
+    db.session.flush()
+
+    stored, *_ = stage_data.as_arrays()
+    peaks = np.arange(10, len(stored), 26).tolist()
+    troughs = np.arange(23, len(stored), 26).tolist()
+    db.session.add(ZeroCrossingAnalysis.from_peaks(stage_data.id, peaks, stored[peaks], troughs, stored[troughs]))
+    db.session.commit()
+    return stage_data
+
+def test_signal_size_capped(test_app, test_client: FlaskClient):
+    """
+    GIVEN a 1 minute and a 20 minute gait recording
+    WHEN their signals are requested 200 pixels wide
+    THEN every series and marker list has at most 200 points whatever the recording length.
+    """
+    user, patient = create_patient_user("Signal Patient", f"{uuid4()}@test.com")
+    stage_ids = [create_gait_stage(patient.id, duration_s).id for duration_s in (60, 1200)]
+    user_id = user.id
+
+    for stage_id in stage_ids:
+        response = get_page(test_app, user_id, f"/api/stage_data/{stage_id}/signal?width=200")
+        assert response.status_code == 200
+        signal = response.get_json()
+        assert signal["stage"] == "GAIT"
+        assert all(len(series["t"]) == len(series["values"]) == 200 for series in signal["series"].values())
+        assert signal["series"]["norm"]["t"][0] == signal["start"]
+        assert signal["series"]["norm"]["t"][-1] == signal["end"]
+        assert 0 < len(signal["peaks"]["t"]) <= 200
+        assert 0 < len(signal["troughs"]["t"]) <= 200
+
+def test_signal_zoom_window(test_app, test_client: FlaskClient):
+    """
+    GIVEN a gait recording
+    WHEN a 10 second window of it is requested wider than its number of readings
+    THEN every reading of the window is returned and only the markers inside it.
+    """
+    user, patient = create_patient_user("Zoom Patient", f"{uuid4()}@test.com")
+    stage_data = create_gait_stage(patient.id, 120)
+    timestamps, x, y, z = stage_data.as_arrays()
+    stage_id, user_id = stage_data.id, user.id
+    start, end = int(timestamps[1000]), int(timestamps[1000]) + 10000
+
+    response = get_page(test_app, user_id, f"/api/stage_data/{stage_id}/signal?width=1000&start={start}&end={end}")
+
+    signal = response.get_json()
+    window = (timestamps >= start) & (timestamps <= end)
+    assert signal["totalSamples"] == window.sum() == len(signal["series"]["x"]["t"])
+    assert signal["series"]["x"]["t"] == timestamps[window].tolist()
+    np.testing.assert_allclose(signal["series"]["norm"]["values"], np.sqrt(x ** 2 + y ** 2 + z ** 2)[window])
+    assert all(start <= t <= end for t in signal["peaks"]["t"] + signal["troughs"]["t"])
+    assert len(signal["peaks"]["t"]) in (19, 20)
+
+def test_signal_access_and_validation(test_app, test_client: FlaskClient):
+    """
+    GIVEN a physician's patient with a gait recording
+    WHEN its signal is requested by another physician, with an invalid width or window, or for an unknown stage
+    THEN the requests are rejected.
+    """
+    own_user, own_physician = create_physician_user("Signal Physician", f"{uuid4()}@test.com")
+    other_user, _ = create_physician_user("Other Signal Physician", f"{uuid4()}@test.com")
+    _, patient = create_patient_user("Signal Access Patient", f"{uuid4()}@test.com", own_physician)
+    url = f"/api/stage_data/{create_gait_stage(patient.id, 30).id}/signal"
+
+    assert get_page(test_app, own_user.id, url).status_code == 200
+    assert get_page(test_app, other_user.id, url).status_code == 403
+    assert get_page(test_app, own_user.id, url + "?width=2").status_code == 400
+    assert get_page(test_app, own_user.id, url + "?width=100000").status_code == 400
+    assert get_page(test_app, own_user.id, url + "?start=2000&end=1000").status_code == 400
+    assert get_page(test_app, own_user.id, "/api/stage_data/0/signal").status_code == 404
+
+def test_gait_page_plots_signal(test_app, test_client: FlaskClient):
+    """
+    GIVEN a patient's analyzed gait recording
+    WHEN they view its gait data page
+    THEN the page plots the downsampled signal of the recording.
+    """
+    user, patient = create_patient_user("Gait Plot Patient", f"{uuid4()}@test.com")
+    stage_data = create_gait_stage(patient.id, 30)
+    stage_id, assessment_id, user_id = stage_data.id, stage_data.assessment_id, user.id
+
+    response = get_page(test_app, user_id, f"/gait_data?assessment_id={assessment_id}&name=Gait")
+
+    assert response.status_code == 200
+    assert f"/api/stage_data/{stage_id}/signal?" in response.get_data(as_text=True)
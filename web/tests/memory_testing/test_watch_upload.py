@@ -0,0 +1,604 @@
+import gzip
+import json
+from uuid import uuid4
+import zlib
+
+from flask.testing import FlaskClient
+import numpy as np
+import pytest
+import redis
+
+from app.models import AssessmentStage, AssessmentStageData, PatientAssessment, StageDataPoint, ZeroCrossingAnalysis
+from app.utilities.gait_signal import PEAK_THRESHOLD, WINDOW_SIZE, filtered_norm, find_peaks_and_troughs, gait_rhythm, sample_rate
+from app.utilities.ingest import delete_peak_detector, load_peak_detector
+from app.utilities.sample_packing import UPLOAD_CONTENT_TYPE, encode_upload
+from app.celery_tasks.peak_identification import gait_fingerprint
+from app.db import db
+from tests.payloads import as_upload_readings, make_upload_body, make_walking_readings
+
+def create_running_assessment(stage: AssessmentStage) -> PatientAssessment:
+    """Helper to create a running assessment sitting at the given stage."""
+    assessment = PatientAssessment(
+        patient_id=1,
+        score=0,
+        total_rounds=3,
+        avg_reaction_time=0,
+        difficulty="Easy",
+        reaction_records=[],
+        is_running=True,
+        watch_connected=True,
+        current_step=PatientAssessment.STEP_ORDER.index(stage),
+        memorization_time=3,
+        num_shapes=3
+    )
+    db.session.add(assessment)
+    db.session.commit()
+    return assessment
+
+@pytest.mark.parametrize("bulk_ingest", [True, False])
+def test_watch_upload_stores_points(test_app, test_client: FlaskClient, bulk_ingest: bool):
+    """
+    GIVEN a running assessment in the GAIT stage
+    WHEN the watch uploads its samples with bulk ingest enabled or disabled
+    THEN the same points are stored, minus the first second of startup readings.
+    """
+    test_app.config["BULK_INGEST"] = bulk_ingest
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    body = make_upload_body("GAIT", 200)
+
+    try:
+        response = test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload", json=body)
+    finally:
+        test_app.config["BULK_INGEST"] = True
+
+    assert response.status_code == 200
+    assert response.get_json() == {"success": True}
+
+    stage_data = db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).one()
+    points = db.session.query(StageDataPoint).filter_by(sensor_id=stage_data.id).order_by(StageDataPoint.timestamp).all()
+
+    # First reading is kept, the remaining 49 readings of the first second are dropped
+    assert len(points) == 200 - 49
+    assert points[1].x == pytest.approx(0.1 * 50)
+    assert points[-1].z == pytest.approx(-0.3)
+
+def post_chunk(test_client: FlaskClient, join_code: str, readings: list, seq: int, stream_id: int | None = None):
+    """Helper to post one chunk of a chunked GAIT upload."""
+    body = {
+        "metadata": {"stage": "GAIT", "trial": None, "memStep": None, "seq": seq, "streamId": stream_id},
+        "data": readings
+    }
+    return test_client.post(f"/assessments/memory_test/{join_code}/GAIT/upload/chunk", json=body)
+
+@pytest.mark.parametrize("storage", [AssessmentStageData.STORAGE_ROWS, AssessmentStageData.STORAGE_PACKED])
+def test_chunked_upload_matches_single_upload(test_app, test_client: FlaskClient, storage: str):
+    """
+    GIVEN a GAIT recording split into 2 second chunks
+    WHEN the chunks are uploaded in order and the stream is finalized
+    THEN the stored readings are the same as for a single upload of the whole recording.
+    """
+    readings = make_upload_body("GAIT", 500)["data"]
+    single = AssessmentStageData.bulk_from_json({"data": readings}, AssessmentStage.GAIT, None)
+    db.session.commit()
+
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    test_app.config["STAGE_DATA_STORAGE"] = storage
+    try:
+        stream_id = None
+        for seq, start in enumerate(range(0, 500, 100)):
+            response = post_chunk(test_client, assessment.join_code, readings[start:start + 100], seq, stream_id)
+            assert response.status_code == 200
+            stream_id = response.get_json()["streamId"]
+            assert response.get_json()["nextSeq"] == seq + 1
+    finally:
+        test_app.config["STAGE_DATA_STORAGE"] = AssessmentStageData.STORAGE_ROWS
+
+    stream = db.session.get(AssessmentStageData, stream_id)
+    assert not stream.is_finalized
+    assert stream.is_packed == (storage == AssessmentStageData.STORAGE_PACKED)
+
+    response = test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/finalize", json={"streamId": stream_id})
+    assert response.status_code == 200
+    assert response.get_json()["samples"] == single.sample_count
+
+    db.session.refresh(stream)
+    assert stream.is_finalized
+    for expected, actual in zip(single.as_arrays(), stream.as_arrays()):
+        assert actual == pytest.approx(expected, rel=1e-6)
+
+def test_chunked_upload_duplicate_and_out_of_order(test_client: FlaskClient):
+    """
+    GIVEN an open upload stream that received chunk 0
+    WHEN chunk 0 is retransmitted and chunk 2 arrives before chunk 1
+    THEN the retransmission is acknowledged without storing it again and chunk 2 is rejected.
+    """
+    readings = make_upload_body("GAIT", 300)["data"]
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+
+    stream_id = post_chunk(test_client, assessment.join_code, readings[:100], 0).get_json()["streamId"]
+
+    response = post_chunk(test_client, assessment.join_code, readings[:100], 0, stream_id)
+    assert response.status_code == 200
+    assert response.get_json()["duplicate"] is True
+
+    response = post_chunk(test_client, assessment.join_code, readings[200:], 2, stream_id)
+    assert response.status_code == 409
+    assert response.get_json()["nextSeq"] == 1
+
+    stream = db.session.get(AssessmentStageData, stream_id)
+    assert stream.sample_count == 51
+    assert db.session.query(StageDataPoint).filter_by(sensor_id=stream_id).count() == 51
+
+@pytest.mark.parametrize("storage", [AssessmentStageData.STORAGE_ROWS, AssessmentStageData.STORAGE_PACKED])
+def test_chunked_gait_upload_detects_peaks(test_app, test_client: FlaskClient, storage: str):
+    """
+    GIVEN a walking recording uploaded as a chunked GAIT stream
+    WHEN the stream is finalized
+    THEN its peak analysis and rhythm features exist right away and match a batch analysis of the stored readings.
+    """
+    readings = as_upload_readings(*make_walking_readings(1500))
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    test_app.config["STAGE_DATA_STORAGE"] = storage
+    try:
+        stream_id = None
+        for seq, start in enumerate(range(0, 1500, 100)):
+            stream_id = post_chunk(test_client, assessment.join_code, readings[start:start + 100], seq, stream_id).get_json()["streamId"]
+    finally:
+        test_app.config["STAGE_DATA_STORAGE"] = AssessmentStageData.STORAGE_ROWS
+
+    assert load_peak_detector(stream_id) is not None
+    assert db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stream_id).count() == 0
+
+    test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/finalize", json={"streamId": stream_id})
+
+    analysis = db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stream_id).one()
+    timestamps, x, y, z = db.session.get(AssessmentStageData, stream_id).as_arrays()
+    peaks, troughs = find_peaks_and_troughs(filtered_norm(x, y, z, WINDOW_SIZE), PEAK_THRESHOLD)
+
+    assert len(peaks) > 20
+    assert analysis.peak_positions().tolist() == peaks
+    assert analysis.trough_positions().tolist() == troughs
+    assert (analysis.step_frequency, analysis.step_regularity, analysis.stride_regularity) == \
+        gait_rhythm(filtered_norm(x, y, z, WINDOW_SIZE), np.zeros(1, dtype=np.int64), sample_rate(timestamps))
+    assert analysis.fingerprint == gait_fingerprint(timestamps, x, y, z)
+    assert load_peak_detector(stream_id) is None
+
+def test_chunked_gait_upload_without_detector(test_client: FlaskClient):
+    """
+    GIVEN a chunked GAIT stream whose peak detector state was lost between chunks
+    WHEN the remaining chunks are uploaded and the stream is finalized
+    THEN no partial analysis is stored, leaving the stream to the batch analysis.
+    """
+    readings = as_upload_readings(*make_walking_readings(600))
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+
+    stream_id = post_chunk(test_client, assessment.join_code, readings[:200], 0).get_json()["streamId"]
+    delete_peak_detector(stream_id)
+    post_chunk(test_client, assessment.join_code, readings[200:400], 1, stream_id)
+    post_chunk(test_client, assessment.join_code, readings[400:], 2, stream_id)
+    test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/finalize", json={"streamId": stream_id})
+
+    assert db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stream_id).count() == 0
+
+def test_chunked_gait_upload_without_redis(test_client: FlaskClient, monkeypatch):
+    """
+    GIVEN a chunked GAIT stream whose peak detector state can't be saved in Redis
+    WHEN its chunks are uploaded and the stream is finalized
+    THEN every chunk is acknowledged once and no partial analysis is stored, leaving the stream to the batch analysis.
+    """
+    def unreachable(*args):
+        raise redis.exceptions.ConnectionError("Redis is down")
+
+    monkeypatch.setattr("app.memory_test.save_peak_detector", unreachable)
+    readings = as_upload_readings(*make_walking_readings(600))
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+
+    responses = [post_chunk(test_client, assessment.join_code, readings[:300], 0)]
+    stream_id = responses[0].get_json()["streamId"]
+    responses.append(post_chunk(test_client, assessment.join_code, readings[300:], 1, stream_id))
+    test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/finalize", json={"streamId": stream_id})
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert not any(response.get_json().get("duplicate") for response in responses)
+    assert db.session.get(AssessmentStageData, stream_id).sample_count == 600 - 49
+    assert db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=stream_id).count() == 0
+
+def test_chunk_after_finalize_is_rejected(test_client: FlaskClient):
+    """
+    GIVEN a finalized upload stream
+    WHEN another chunk is sent to it
+    THEN it is rejected.
+    """
+    readings = make_upload_body("GAIT", 200)["data"]
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+
+    stream_id = post_chunk(test_client, assessment.join_code, readings[:100], 0).get_json()["streamId"]
+    test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/finalize", json={"streamId": stream_id})
+
+    response = post_chunk(test_client, assessment.join_code, readings[100:], 1, stream_id)
+    assert response.status_code == 409
+
+def test_chunk_for_unknown_stream(test_client: FlaskClient):
+    """
+    GIVEN a running assessment
+    WHEN a chunk or finalize call references a stream that doesn't exist
+    THEN a 404 is returned.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    missing_id = (db.session.query(db.func.max(AssessmentStageData.id)).scalar() or 0) + 1
+
+    assert post_chunk(test_client, assessment.join_code, [], 1, missing_id).status_code == 404
+    response = test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/finalize", json={"streamId": missing_id})
+    assert response.status_code == 404
+
+@pytest.mark.parametrize("body", [
+    "[1, 2, 3]",
+    '{"metadata": {"stage": "GAIT", "seq": 0}}',
+    '{"metadata": {"stage": "GAIT", "seq": 0}, "data": [{"timestamp": 1700000000000, "x": 0.1, "y": 0.2}]}',
+    '{"metadata": {"stage": "GAIT", "seq": 0}, "data": [{"timestamp": 1700000000000, "x": NaN, "y": 0.2, "z": 0.3}]}',
+    '{"metadata": {"stage": "RT_TEST", "seq": 0}, "data": []}',
+    '{"metadata": {"stage": "GAIT", "seq": "0"}, "data": []}',
+])
+def test_malformed_chunk_is_rejected(test_client: FlaskClient, body: str):
+    """
+    GIVEN a running assessment in the GAIT stage
+    WHEN a first chunk is sent that isn't an object, lacks its data, has an incomplete or NaN reading,
+    was recorded in another stage or has no valid seq
+    THEN it is rejected with a 400 error and no stream is created.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+
+    response = test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/chunk", data=body, content_type="application/json")
+
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+    assert db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).count() == 0
+
+@pytest.mark.parametrize("storage", [AssessmentStageData.STORAGE_ROWS, AssessmentStageData.STORAGE_PACKED])
+def test_binary_upload_matches_json_upload(test_app, test_client: FlaskClient, storage: str):
+    """
+    GIVEN the same GAIT readings as a JSON body and as a binary body
+    WHEN both are uploaded
+    THEN the same readings are stored.
+    """
+    body = make_upload_body("GAIT", 300)
+    readings = body["data"]
+    binary_body = encode_upload(
+        "GAIT",
+        [r["timestamp"] for r in readings],
+        [r["x"] for r in readings],
+        [r["y"] for r in readings],
+        [r["z"] for r in readings]
+    )
+
+    json_assessment = create_running_assessment(AssessmentStage.GAIT)
+    binary_assessment = create_running_assessment(AssessmentStage.GAIT)
+
+    test_app.config["STAGE_DATA_STORAGE"] = storage
+    try:
+        json_response = test_client.post(f"/assessments/memory_test/{json_assessment.join_code}/GAIT/upload", json=body)
+        binary_response = test_client.post(
+            f"/assessments/memory_test/{binary_assessment.join_code}/GAIT/upload",
+            data=binary_body,
+            content_type=UPLOAD_CONTENT_TYPE
+        )
+    finally:
+        test_app.config["STAGE_DATA_STORAGE"] = AssessmentStageData.STORAGE_ROWS
+
+    assert json_response.status_code == 200
+    assert binary_response.status_code == 200
+
+    json_data = db.session.query(AssessmentStageData).filter_by(assessment_id=json_assessment.id).one()
+    binary_data = db.session.query(AssessmentStageData).filter_by(assessment_id=binary_assessment.id).one()
+    assert binary_data.sample_count == json_data.sample_count == 300 - 49
+    for expected, actual in zip(json_data.as_arrays(), binary_data.as_arrays()):
+        assert actual == pytest.approx(expected, rel=1e-6)
+
+def test_binary_upload_rejects_bad_body(test_client: FlaskClient):
+    """
+    GIVEN a running GAIT assessment
+    WHEN a binary body is truncated or declares a different stage than the URL
+    THEN a 400 is returned and nothing is stored.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    url = f"/assessments/memory_test/{assessment.join_code}/GAIT/upload"
+
+    truncated = encode_upload("GAIT", [1, 2], [0, 0], [0, 0], [0, 0])[:-1]
+    wrong_stage = encode_upload("RT_TEST", [1, 2], [0, 0], [0, 0], [0, 0])
+
+    assert test_client.post(url, data=truncated, content_type=UPLOAD_CONTENT_TYPE).status_code == 400
+    assert test_client.post(url, data=wrong_stage, content_type=UPLOAD_CONTENT_TYPE).status_code == 400
+    assert db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).count() == 0
+
+@pytest.mark.parametrize("encoding, compress", [("gzip", gzip.compress), ("deflate", zlib.compress)])
+def test_compressed_json_upload(test_client: FlaskClient, encoding: str, compress):
+    """
+    GIVEN a GAIT upload compressed with gzip or deflate
+    WHEN it is sent with the matching Content-Encoding
+    THEN it is stored the same as an uncompressed upload.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    body = json.dumps(make_upload_body("GAIT", 200)).encode()
+
+    response = test_client.post(
+        f"/assessments/memory_test/{assessment.join_code}/GAIT/upload",
+        data=compress(body),
+        content_type="application/json",
+        headers={"Content-Encoding": encoding}
+    )
+
+    assert response.status_code == 200
+    stage_data = db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).one()
+    assert stage_data.sample_count == 200 - 49
+
+def test_compressed_chunk(test_client: FlaskClient):
+    """
+    GIVEN a chunk of a chunked upload compressed with gzip
+    WHEN it is sent with Content-Encoding gzip
+    THEN it is appended to a new stream.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    body = {"metadata": {"stage": "GAIT", "seq": 0}, "data": make_upload_body("GAIT", 100)["data"]}
+
+    response = test_client.post(
+        f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/chunk",
+        data=gzip.compress(json.dumps(body).encode()),
+        content_type="application/json",
+        headers={"Content-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert db.session.get(AssessmentStageData, response.get_json()["streamId"]).sample_count == 51
+
+@pytest.mark.parametrize("encoding, body, status", [
+    ("gzip", gzip.compress(bytes(64 * 1024 * 1024)), 413),
+    ("gzip", b"definitely not gzip", 400),
+    ("br", b"{}", 415),
+])
+def test_bad_compressed_upload(test_app, test_client: FlaskClient, encoding: str, body: bytes, status: int):
+    """
+    GIVEN a body that decompresses past the size cap, isn't valid, or uses an unsupported encoding
+    WHEN it is uploaded
+    THEN it is rejected without storing anything.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    test_app.config["MAX_DECOMPRESSED_BODY_SIZE"] = 1024 * 1024
+    try:
+        response = test_client.post(
+            f"/assessments/memory_test/{assessment.join_code}/GAIT/upload",
+            data=body,
+            content_type="application/json",
+            headers={"Content-Encoding": encoding}
+        )
+    finally:
+        test_app.config["MAX_DECOMPRESSED_BODY_SIZE"] = 32 * 1024 * 1024
+
+    assert response.status_code == status
+    assert db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).count() == 0
+
+def test_persist_spooled_upload(test_client: FlaskClient):
+    """
+    GIVEN a JSON upload spooled in Redis
+    WHEN the persist_upload task runs
+    THEN the readings are stored and the spool entry is marked persisted.
+    """
+    from app.celery_tasks.ingest import persist_upload
+    from app.utilities.ingest import INGEST_PERSISTED, get_spooled_upload, spool_upload
+
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    body = json.dumps(make_upload_body("GAIT", 200)).encode()
+    ingest_id = spool_upload(body, "application/json", AssessmentStage.GAIT, assessment.id)
+
+    persist_upload(ingest_id)
+
+    entry, spooled_body = get_spooled_upload(ingest_id)
+    assert entry["status"] == INGEST_PERSISTED
+    assert spooled_body is None
+
+    stage_data = db.session.get(AssessmentStageData, int(entry["stage_data_id"]))
+    assert stage_data.assessment_id == assessment.id
+    assert stage_data.sample_count == 200 - 49
+
+def test_persist_spooled_upload_failure(test_client: FlaskClient):
+    """
+    GIVEN a spooled binary upload whose body is truncated
+    WHEN the persist_upload task runs
+    THEN it raises and the spool entry is marked failed with the error.
+    """
+    from app.celery_tasks.ingest import persist_upload
+    from app.utilities.ingest import INGEST_FAILED, get_spooled_upload, spool_upload
+
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    ingest_id = spool_upload(b"RWS1", UPLOAD_CONTENT_TYPE, AssessmentStage.GAIT, assessment.id)
+
+    with pytest.raises(ValueError):
+        persist_upload(ingest_id)
+
+    entry, _ = get_spooled_upload(ingest_id)
+    assert entry["status"] == INGEST_FAILED
+    assert entry["error"]
+    assert db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).count() == 0
+
+def test_async_upload(test_app, test_client: FlaskClient, monkeypatch: pytest.MonkeyPatch):
+    """
+    GIVEN ASYNC_INGEST is enabled
+    WHEN the watch uploads its samples and the queued task runs
+    THEN the endpoint returns 202 with an ingestId whose status becomes persisted.
+    """
+    from app.celery_tasks.ingest import persist_upload
+
+    # Run the task in process instead of waiting on the worker
+    monkeypatch.setattr(persist_upload, "delay", persist_upload)
+    test_app.config["ASYNC_INGEST"] = True
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+
+    try:
+        response = test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload", json=make_upload_body("GAIT", 200))
+        bad_response = test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload", json={"metadata": {}})
+    finally:
+        test_app.config["ASYNC_INGEST"] = False
+
+    assert response.status_code == 202
+    ingest_id = response.get_json()["ingestId"]
+    assert bad_response.status_code == 400
+
+    status = test_client.get(f"/assessments/memory_test/ingest/{ingest_id}").get_json()
+    assert status["persisted"] is True
+    stage_data = db.session.get(AssessmentStageData, status["stageDataId"])
+    assert stage_data.assessment_id == assessment.id
+
+    assert test_client.get("/assessments/memory_test/ingest/unknown").status_code == 404
+
+def with_upload_id(body: dict, upload_id: str, sample_offset: int = 0, start: int = 0, end: int | None = None) -> dict:
+    """Helper to send part of an upload body under a client upload ID."""
+    return {
+        "metadata": {**body["metadata"], "uploadId": upload_id, "sampleOffset": sample_offset},
+        "data": body["data"][start:end]
+    }
+
+def test_upload_retry_is_deduplicated(test_client: FlaskClient):
+    """
+    GIVEN an upload sent with a client upload ID
+    WHEN the watch retries it with the same ID
+    THEN the retry is acknowledged as a duplicate and only one stage data is stored.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    url = f"/assessments/memory_test/{assessment.join_code}/GAIT/upload"
+    upload_id = str(uuid4())
+    body = with_upload_id(make_upload_body("GAIT", 200), upload_id)
+
+    first = test_client.post(url, json=body)
+    retry = test_client.post(url, json=body)
+
+    assert first.status_code == retry.status_code == 200
+    assert first.get_json() == {"success": True, "duplicate": False, "uploadId": upload_id, "receivedSamples": 200}
+    assert retry.get_json()["duplicate"] is True
+
+    stage_data = db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).one()
+    assert stage_data.sample_count == 200 - 49
+
+@pytest.mark.parametrize("storage", [AssessmentStageData.STORAGE_ROWS, AssessmentStageData.STORAGE_PACKED])
+def test_resumed_upload_matches_single_upload(test_app, test_client: FlaskClient, storage: str):
+    """
+    GIVEN an upload that was only partially received
+    WHEN the watch resumes it from an offset overlapping the received readings
+    THEN only the new readings are stored and the result matches a single upload.
+    """
+    body = make_upload_body("GAIT", 300)
+    single_assessment = create_running_assessment(AssessmentStage.GAIT)
+    resumed_assessment = create_running_assessment(AssessmentStage.GAIT)
+    url = f"/assessments/memory_test/{resumed_assessment.join_code}/GAIT/upload"
+    upload_id = str(uuid4())
+
+    test_app.config["STAGE_DATA_STORAGE"] = storage
+    try:
+        test_client.post(f"/assessments/memory_test/{single_assessment.join_code}/GAIT/upload", json=body)
+        partial = test_client.post(url, json=with_upload_id(body, upload_id, end=20))
+        status = test_client.get(f"{url}/{upload_id}")
+        resumed = test_client.post(url, json=with_upload_id(body, upload_id, sample_offset=10, start=10))
+    finally:
+        test_app.config["STAGE_DATA_STORAGE"] = AssessmentStageData.STORAGE_ROWS
+
+    assert partial.get_json()["receivedSamples"] == 20
+    assert status.get_json()["receivedSamples"] == 20
+    assert resumed.get_json()["receivedSamples"] == 300
+
+    single = db.session.query(AssessmentStageData).filter_by(assessment_id=single_assessment.id).one()
+    resumed = db.session.query(AssessmentStageData).filter_by(assessment_id=resumed_assessment.id).one()
+    assert resumed.sample_count == single.sample_count
+    for expected, actual in zip(single.as_arrays(), resumed.as_arrays()):
+        assert actual.tolist() == expected.tolist()
+
+def test_upload_resumed_past_received_samples(test_client: FlaskClient):
+    """
+    GIVEN an upload ID that has 50 readings received, and one that is unknown
+    WHEN bodies are sent starting past the received readings
+    THEN a 409 with the number of received readings is returned.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    url = f"/assessments/memory_test/{assessment.join_code}/GAIT/upload"
+    body = make_upload_body("GAIT", 200)
+
+    gap_id, unknown_id = str(uuid4()), str(uuid4())
+
+    test_client.post(url, json=with_upload_id(body, gap_id, end=50))
+    gap = test_client.post(url, json=with_upload_id(body, gap_id, sample_offset=100, start=100))
+    unknown = test_client.post(url, json=with_upload_id(body, unknown_id, sample_offset=100, start=100))
+
+    assert gap.status_code == unknown.status_code == 409
+    assert gap.get_json()["receivedSamples"] == 50
+    assert unknown.get_json()["receivedSamples"] == 0
+    assert test_client.get(f"{url}/{unknown_id}").status_code == 404
+
+def test_binary_upload_id_header(test_client: FlaskClient):
+    """
+    GIVEN a binary upload with its upload ID sent in the X-Upload-Id header
+    WHEN it is retried
+    THEN the retry is acknowledged as a duplicate.
+    """
+    assessment = create_running_assessment(AssessmentStage.GAIT)
+    url = f"/assessments/memory_test/{assessment.join_code}/GAIT/upload"
+    binary_body = encode_upload("GAIT", [1700000000000 + i * 20 for i in range(100)], [0.5] * 100, [0.5] * 100, [0.5] * 100)
+    headers = {"X-Upload-Id": str(uuid4())}
+
+    first = test_client.post(url, data=binary_body, content_type=UPLOAD_CONTENT_TYPE, headers=headers)
+    retry = test_client.post(url, data=binary_body, content_type=UPLOAD_CONTENT_TYPE, headers=headers)
+
+    assert first.get_json()["duplicate"] is False
+    assert retry.get_json()["duplicate"] is True
+    assert db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).count() == 1
+
+def test_same_upload_id_in_two_assessments(test_client: FlaskClient):
+    """
+    GIVEN two running assessments whose watches happen to generate the same upload ID
+    WHEN each uploads its readings under that ID
+    THEN both uploads are stored, each in its own assessment.
+    """
+    upload_id = str(uuid4())
+    body = with_upload_id(make_upload_body("GAIT", 200), upload_id)
+    assessments = [create_running_assessment(AssessmentStage.GAIT) for _ in range(2)]
+
+    responses = [test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload", json=body) for assessment in assessments]
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert [response.get_json()["duplicate"] for response in responses] == [False, False]
+    for assessment in assessments:
+        stage_data = db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).one()
+        assert stage_data.upload_id == upload_id
+
+def test_upload_retry_after_assessment_completed(test_client: FlaskClient):
+    """
+    GIVEN the upload that completed an assessment
+    WHEN the watch retries it after the assessment stopped running
+    THEN the retry is acknowledged instead of failing to find the assessment.
+    """
+    assessment = create_running_assessment(AssessmentStage.COMPLETE)
+    url = f"/assessments/memory_test/{assessment.join_code}/GAIT/upload"
+    body = with_upload_id(make_upload_body("GAIT", 200), str(uuid4()))
+
+    first = test_client.post(url, json=body)
+    db.session.refresh(assessment)
+    retry = test_client.post(url, json=body)
+
+    assert not assessment.is_running
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json()["duplicate"] is True
+
+def test_finalize_retry_after_assessment_completed(test_client: FlaskClient):
+    """
+    GIVEN a chunked upload whose finalize call completed the assessment
+    WHEN the watch retries the finalize call after the assessment stopped running
+    THEN the retry gets the same response instead of failing to find the assessment.
+    """
+    assessment = create_running_assessment(AssessmentStage.COMPLETE)
+    readings = make_upload_body("GAIT", 200)["data"]
+    stream_id = post_chunk(test_client, assessment.join_code, readings, 0).get_json()["streamId"]
+    url = f"/assessments/memory_test/{assessment.join_code}/GAIT/upload/finalize"
+
+    first = test_client.post(url, json={"streamId": stream_id})
+    db.session.refresh(assessment)
+    retry = test_client.post(url, json={"streamId": stream_id})
+
+    assert not assessment.is_running
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json() == first.get_json()
@@ -0,0 +1,97 @@
+from datetime import timedelta
+import statistics
+from uuid import uuid4
+
+from flask.testing import FlaskClient
+import pytest
+
+from app.models import AssessmentStage, PatientAssessment, ReactionTimeSummary
+from app.utilities.utils import get_patient_assessment_data
+from app.db import db
+from tests.memory_testing.test_memory_test import create_patient_user, login
+
+RECORDS = [
+    {"time": 1200.0, "correct": True, "num_shapes": 3},
+    {"time": 1850.5, "correct": False, "num_shapes": 4},
+    {"time": 990.0, "correct": True, "num_shapes": 3},
+    {"time": 2400.0, "correct": True, "num_shapes": 5}
+]
+
+def create_assessment(patient_id: int, reaction_records: list[dict], step: AssessmentStage = AssessmentStage.COMPLETE) -> PatientAssessment:
+    """Helper to create an assessment of a patient with the given reaction records."""
+    assessment = PatientAssessment(
+        patient_id=patient_id,
+        score=3,
+        total_rounds=4,
+        avg_reaction_time=sum(record["time"] for record in reaction_records) / max(len(reaction_records), 1),
+        difficulty="Easy",
+        reaction_records=reaction_records,
+        is_running=step != AssessmentStage.COMPLETE,
+        current_step=PatientAssessment.STEP_ORDER.index(step),
+        memorization_time=3,
+        num_shapes=3
+    )
+    db.session.add(assessment)
+    db.session.commit()
+    return assessment
+
+def test_summary_from_records():
+    """
+    GIVEN reaction records with correct and incorrect reactions
+    WHEN they are summarized
+    THEN the counts, averages and sample standard deviations of each group are stored, with 0 for groups too small to have them.
+    """
+    summary = ReactionTimeSummary.from_records(RECORDS)
+    times = [record["time"] for record in RECORDS]
+    correct = [record["time"] for record in RECORDS if record["correct"]]
+
+    assert (summary.num_reactions, summary.num_correct, summary.num_incorrect) == (4, 3, 1)
+    assert summary.avg_reaction_time == pytest.approx(statistics.mean(times))
+    assert summary.std_dev_reaction_time == pytest.approx(statistics.stdev(times))
+    assert summary.avg_correct_time == pytest.approx(statistics.mean(correct))
+    assert summary.std_dev_correct_time == pytest.approx(statistics.stdev(correct))
+    assert (summary.avg_incorrect_time, summary.std_dev_incorrect_time) == (1850.5, 0)
+
+    empty = ReactionTimeSummary.from_records([])
+    assert (empty.num_reactions, empty.avg_reaction_time, empty.std_dev_reaction_time) == (0, 0, 0)
+
+def test_memory_result_stores_summary(test_client: FlaskClient):
+    """
+    GIVEN a patient finishing the RT test of an assessment
+    WHEN the memory result page is shown
+    THEN the reaction time summary of the assessment is stored.
+    """
+    user, patient = create_patient_user("Summary Patient", f"{uuid4()}@test.com")
+    assessment = create_assessment(patient.id, [], AssessmentStage.RT_TEST)
+    login(test_client, user)
+    with test_client.session_transaction() as sess:
+        sess["join_code"] = assessment.join_code
+        sess["reaction_records"] = RECORDS
+
+    response = test_client.get("/assessments/memory_test/result")
+
+    assert response.status_code == 200
+    summary = db.session.query(ReactionTimeSummary).filter_by(assessment_id=assessment.id).one()
+    assert summary.num_reactions == 4
+    assert summary.avg_reaction_time == pytest.approx(statistics.mean(record["time"] for record in RECORDS))
+
+def test_chart_data_reads_summaries(test_client: FlaskClient):
+    """
+    GIVEN a patient with an assessment that has a stored summary and an older one that doesn't
+    WHEN the chart data of the patient is built
+    THEN the stored summary is used as is and the older assessment is summarized from its records.
+    """
+    _, patient = create_patient_user("Chart Patient", f"{uuid4()}@test.com")
+    older = create_assessment(patient.id, RECORDS[:2])
+    summarized = create_assessment(patient.id, RECORDS)
+    older.date_taken = summarized.date_taken - timedelta(days=7)
+    summarized.summarize_reactions()
+    summarized.reaction_summary.avg_reaction_time = 1234.0
+    db.session.commit()
+
+    chart_data = get_patient_assessment_data(patient.id)
+
+    assert [point["y"] for point in chart_data["reactions"]["average"]] == [pytest.approx(1525.25), 1234.0]
+    assert [point["y"] for point in chart_data["reactions"]["incorrect_avg"]] == [1850.5, 1850.5]
+    assert len(chart_data["reactions"]["correct_points"]) == 4
+    assert len(chart_data["reactions"]["incorrect_points"]) == 2
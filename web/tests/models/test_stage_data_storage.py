@@ -0,0 +1,112 @@
+from flask.testing import FlaskClient
+import numpy as np
+import pytest
+
+from app.models import AssessmentStage, AssessmentStageData, PatientAssessment, StageDataPoint, ZeroCrossingAnalysis
+from app.db import db
+from app.celery_tasks.peak_identification import identify_peaks
+from tests.payloads import make_upload_body
+
+def test_packed_and_row_storage_match(test_client: FlaskClient):
+    """
+    GIVEN the same upload stored with row storage and packed storage
+    WHEN both are read back with as_arrays
+    THEN they hold the same readings, and the packed stage has no StageDataPoint rows.
+    """
+    body = make_upload_body("GAIT", 500, interval_ms=10, frequency=0.5)
+
+    rows = AssessmentStageData.bulk_from_json(body, AssessmentStage.GAIT, None)
+    packed = AssessmentStageData.packed_from_json(body, AssessmentStage.GAIT, None)
+    db.session.add(packed)
+    db.session.commit()
+
+    assert not rows.is_packed
+    assert packed.is_packed
+    assert rows.sample_count == packed.sample_count == 500 - 99
+    assert db.session.query(StageDataPoint).filter_by(sensor_id=packed.id).count() == 0
+
+    for row_column, packed_column in zip(rows.as_arrays(), packed.as_arrays()):
+        assert packed_column.dtype == row_column.dtype
+        np.testing.assert_allclose(packed_column, row_column, atol=1e-6)
+
+def test_packed_upload_endpoint(test_app, test_client: FlaskClient):
+    """
+    GIVEN STAGE_DATA_STORAGE set to packed
+    WHEN the watch uploads data
+    THEN the stage is stored as a single packed blob.
+    """
+    assessment = PatientAssessment(
+        patient_id=1,
+        difficulty="Easy",
+        is_running=True,
+        current_step=PatientAssessment.STEP_ORDER.index(AssessmentStage.GAIT),
+        memorization_time=3
+    )
+    db.session.add(assessment)
+    db.session.commit()
+
+    test_app.config["STAGE_DATA_STORAGE"] = AssessmentStageData.STORAGE_PACKED
+    try:
+        response = test_client.post(f"/assessments/memory_test/{assessment.join_code}/GAIT/upload", json=make_upload_body("GAIT", 300, interval_ms=10, frequency=0.5))
+    finally:
+        test_app.config["STAGE_DATA_STORAGE"] = AssessmentStageData.STORAGE_ROWS
+
+    assert response.status_code == 200
+    stage_data = db.session.query(AssessmentStageData).filter_by(assessment_id=assessment.id).one()
+    assert stage_data.is_packed
+    assert len(stage_data.as_arrays()[0]) == 300 - 99
+
+def test_identify_peaks_on_packed_data(test_client: FlaskClient):
+    """
+    GIVEN packed GAIT data containing a 0.5 Hz sinusoid
+    WHEN identify_peaks runs on it
+    THEN peaks and troughs are found about 1 second apart, as with row storage.
+    """
+    stage_data = AssessmentStageData.packed_from_json(make_upload_body("GAIT", 1100, interval_ms=10, frequency=0.5), AssessmentStage.GAIT, None)
+    db.session.add(stage_data)
+    db.session.commit()
+
+    identify_peaks(stage_data.id)
+
+    analysis = ZeroCrossingAnalysis.query.filter_by(stage_data_id=stage_data.id).first()
+    assert analysis.num_peaks > 0
+    assert analysis.avg_peak_distance == pytest.approx(1.0, abs=0.1)
+    assert analysis.avg_trough_distance == pytest.approx(1.0, abs=0.1)
+
+@pytest.mark.parametrize("stage, timestamps, initial_ts_ms, expected", [
+    # The first reading is kept and the rest of the first second is dropped
+    (AssessmentStage.GAIT, [0, 500, 999, 1000, 1500], None, [True, False, False, True, True]),
+    # Out of order readings are compared to the first reading in upload order
+    (AssessmentStage.GAIT, [100, 1200, 50, 1100, 900], None, [True, True, False, True, False]),
+    # Readings continuing a stage are all compared to its initial reading
+    (AssessmentStage.GAIT, [900, 1000, 1100], 0, [False, True, True]),
+    (AssessmentStage.GAIT, [], None, []),
+    (AssessmentStage.RT_TEST, [0, 500, 999], None, [True, True, True]),
+])
+def test_kept_mask(stage: AssessmentStage, timestamps: list[int], initial_ts_ms: int | None, expected: list[bool]):
+    """
+    GIVEN upload timestamps in or out of order
+    WHEN the readings to store are selected
+    THEN only GAIT readings within a second of the initial reading are dropped.
+    """
+    keep = AssessmentStageData.kept_mask(np.array(timestamps, dtype=np.int64), stage, initial_ts_ms)
+    assert keep.tolist() == expected
+
+def test_row_as_arrays_skips_orm_objects(test_client: FlaskClient):
+    """
+    GIVEN stage data stored as StageDataPoint rows
+    WHEN its readings are read back with as_arrays
+    THEN they come back sorted by timestamp without loading any StageDataPoint into the session.
+    """
+    body = make_upload_body("GAIT", 300, interval_ms=10, frequency=0.5)
+    body["data"].reverse()
+    stage_data = AssessmentStageData.bulk_from_json(body, AssessmentStage.RT_TEST, None)
+    db.session.commit()
+    db.session.expire_all()
+
+    timestamps, x, y, z = stage_data.as_arrays()
+
+    assert not any(isinstance(obj, StageDataPoint) for obj in db.session.identity_map.values())
+    assert timestamps.dtype == np.int64 and x.dtype == np.float64
+    assert timestamps.tolist() == sorted(point["timestamp"] for point in body["data"])
+    assert x.flags["C_CONTIGUOUS"]
@@ -0,0 +1,34 @@
+import numpy as np
+
+def as_upload_readings(timestamps: np.ndarray, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> list[dict]:
+    """Helper to convert readings to the format sent by the watch."""
+    return [
+        {"timestamp": int(ts), "x": float(xi), "y": float(yi), "z": float(zi)}
+        for ts, xi, yi, zi in zip(timestamps, x, y, z)
+    ]
+
+def make_walking_readings(n_samples: int, seed: int = 0, fs: int = 50, start_ms: int = 1700000000000) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Helper to build the timestamps and axes of a noisy walking-like recording."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / fs
+    return (
+        start_ms + np.arange(n_samples, dtype=np.int64) * (1000 // fs),
+        0.3 * np.sin(2 * np.pi * 0.95 * t) + rng.normal(0, 0.1, n_samples),
+        np.sin(2 * np.pi * 1.9 * t) + rng.normal(0, 0.1, n_samples),
+        0.15 * np.sin(2 * np.pi * 1.9 * t + 1.0) + rng.normal(0, 0.1, n_samples)
+    )
+
+def make_upload_body(stage: str, n_samples: int, start_ms: int = 1700000000000, interval_ms: int = 20, frequency: float | None = None) -> dict:
+    """
+    Helper to build an upload body in the format sent by the watch, with a ramp on x or,
+    given a frequency in Hz, a sinusoid on every axis.
+    """
+    timestamps = start_ms + np.arange(n_samples, dtype=np.int64) * interval_ms
+    if frequency is None:
+        x, y, z = 0.1 * np.arange(n_samples), np.full(n_samples, 0.2), np.full(n_samples, -0.3)
+    else:
+        x = y = z = np.sin(2 * np.pi * frequency * (timestamps - start_ms) / 1000)
+    return {
+        "metadata": {"stage": stage, "trial": None, "memStep": None},
+        "data": as_upload_readings(timestamps, x, y, z)
+    }
@@ -1,9 +1,15 @@
+import gzip
+import zlib
+
 import pytest
 from tests.stubs.watch_stub import (
     GaitSignalGenerator,
     ReactionTimeGenerator,
+    compress_body,
+    make_chunk_dto,
     make_sensor_dto,
-    make_sensor_reading
+    make_sensor_reading,
+    split_into_chunks
 )
 
 class TestMakeSensorReading:
@@ -109,6 +115,60 @@ class TestMakeSensorDto:
         payload = make_sensor_dto(stage="GAIT", readings=readings)
         assert len(payload["data"]) == 5
 
+
+class TestChunking:
+    """
+    Tests for the chunked upload helpers
+    """
+
+    def test_chunks_cover_chunk_seconds(self):
+        """
+        GIVEN 10 seconds of gait data at 50 Hz
+        WHEN it is split into 2 second chunks
+        THEN there are 5 chunks of 100 readings and no reading is lost or reordered.
+        """
+        readings = GaitSignalGenerator(seed=1).generate(duration_seconds=10.0)
+        chunks = split_into_chunks(readings, chunk_seconds=2.0)
+        assert [len(chunk) for chunk in chunks] == [100] * 5
+        assert [r for chunk in chunks for r in chunk] == readings
+
+    def test_chunk_dto_has_seq_and_stream_id(self):
+        """
+        GIVEN a chunk of readings
+        WHEN make_chunk_dto is called
+        THEN metadata carries the seq and streamId next to the usual fields.
+        """
+        payload = make_chunk_dto(stage="GAIT", readings=[], seq=3, stream_id=42)
+        assert payload["metadata"]["seq"] == 3
+        assert payload["metadata"]["streamId"] == 42
+        assert payload["metadata"]["stage"] == "GAIT"
+
+
+
+class TestCompressBody:
+    """
+    Tests for compress_body() - the optional upload compression
+    """
+
+    def test_gzip_and_deflate_round_trip(self):
+        """
+        GIVEN a request body
+        WHEN it is compressed with gzip or deflate
+        THEN the matching decompressor returns the original body.
+        """
+        body = b'{"data": []}' * 100
+        assert gzip.decompress(compress_body(body, "gzip")) == body
+        assert zlib.decompress(compress_body(body, "deflate")) == body
+
+    def test_unsupported_encoding(self):
+        """
+        GIVEN an encoding other than gzip or deflate
+        WHEN compress_body is called
+        THEN a ValueError is raised.
+        """
+        with pytest.raises(ValueError):
+            compress_body(b"{}", "br")
+
     
 class TestGaitSignalGenerator:
     """
@@ -5,6 +5,11 @@ import os
 import logging
 import time
 import argparse
+import struct
+import json
+import gzip
+import zlib
+import uuid
 
 from typing import List, Optional, Tuple
 from datetime import datetime, timezone
@@ -53,6 +58,74 @@ def make_sensor_dto(stage: str, readings: List[dict], trial: Optional[int]= None
     }
 
 
+# Binary wire format accepted by the upload endpoint as an alternative to JSON:
+# header (magic, version, stage index, trial, memStep, count) followed by
+# little-endian int64 timestamps and float32 x, y and z columns
+BINARY_CONTENT_TYPE = "application/vnd.rewatch.samples"
+BINARY_HEADER = struct.Struct("<4sBBhhI")
+BINARY_STAGES = ["WAITING", "GAIT", "GAIT_COMPLETE", "RT_TEST", "COMPLETE"]
+
+
+def make_binary_payload(payload: dict) -> bytes:
+    """
+    Converts a JSON payload (from make_sensor_dto()) into the binary wire format
+    """
+    metadata = payload["metadata"]
+    readings = payload["data"]
+    header = BINARY_HEADER.pack(
+        b"RWS1",
+        1,
+        BINARY_STAGES.index(metadata["stage"]),
+        -1 if metadata["trial"] is None else metadata["trial"],
+        -1 if metadata["memStep"] is None else metadata["memStep"],
+        len(readings),
+    )
+    columns = [
+        np.array([r["ts"] for r in readings], dtype="<i8"),
+        np.array([r["x"] for r in readings], dtype="<f4"),
+        np.array([r["y"] for r in readings], dtype="<f4"),
+        np.array([r["z"] for r in readings], dtype="<f4"),
+    ]
+    return header + b"".join(column.tobytes() for column in columns)
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """
+    Compresses a request body for the given Content-Encoding ("gzip" or "deflate")
+    """
+    if encoding == "gzip":
+        return gzip.compress(body)
+    if encoding == "deflate":
+        return zlib.compress(body)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def make_chunk_dto(stage: str, readings: List[dict], seq: int, stream_id: Optional[int] = None) -> dict:
+    """
+    Builds one chunk of a chunked upload
+
+    seq: position of the chunk in the stream, starting at 0
+    stream_id: ID returned by the server for the first chunk, None for the first chunk
+    """
+    payload = make_sensor_dto(stage, readings)
+    payload["metadata"]["seq"] = seq
+    payload["metadata"]["streamId"] = stream_id
+    return payload
+
+
+def split_into_chunks(readings: List[dict], chunk_seconds: float = 2.0) -> List[List[dict]]:
+    """
+    Splits readings into consecutive chunks that each cover 'chunk_seconds' of recording,
+    the way the watch sends them while the stage is still running
+    """
+    chunks = []
+    for reading in readings:
+        if not chunks or reading["ts"] - chunks[-1][0]["ts"] >= chunk_seconds * 1000:
+            chunks.append([])
+        chunks[-1].append(reading)
+    return chunks
+
+
 #############################
 # GENERATE FAKE SENSOR DATA #
 #############################
@@ -62,10 +135,12 @@ class GaitSignalGenerator:
     """
     SAMPLE_RATE_HZ = 50 # how many readings per second
 
-    def __init__(self, seed: Optional[int] = None):
+    def __init__(self, seed: Optional[int] = None, sample_rate_hz: Optional[int] = None):
         # creates a random number generator
         # (passing a seed makes it produce the same numbers every run)
         self.rng = np.random.default_rng(seed)
+        # readings per second, SAMPLE_RATE_HZ unless another rate is simulated
+        self.sample_rate_hz = sample_rate_hz or self.SAMPLE_RATE_HZ
 
     def generate(self, duration_seconds: float = 30.0) -> List[dict]:
         """
@@ -77,8 +152,8 @@ class GaitSignalGenerator:
         
         """
         readings = []
-        n_samples = int(duration_seconds * self.SAMPLE_RATE_HZ)
-        interval_ms = int(1000 / self.SAMPLE_RATE_HZ) # gap between readings in ms (20 ms at 50Hz)
+        n_samples = int(duration_seconds * self.sample_rate_hz)
+        interval_ms = int(1000 / self.sample_rate_hz) # gap between readings in ms (20 ms at 50Hz)
 
         start_ms = int(datetime.now(timezone.utc).timestamp() * 1000) # current time
 
@@ -214,7 +289,11 @@ class WatchStub:
             upload_path: str = "/api/sensor-data", 
             seed: Optional[int] = None,
             timeout_s: int = 10,
-            poll_interval_s: float = 0.1
+            poll_interval_s: float = 0.1,
+            wire_format: str = "json",
+            compression: Optional[str] = None,
+            session: Optional[requests.Session] = None,
+            sample_rate_hz: Optional[int] = None
     ):
         # remove any trailing slash from the url
         self.base_url = base_url.rstrip("/")
@@ -224,35 +303,65 @@ class WatchStub:
         self.upload_url = f"{self.base_url}{upload_path}"
         self.timeout = timeout_s 
         self.poll_interval = poll_interval_s
+        # "json" or "binary" (see make_binary_payload())
+        self.wire_format = wire_format
+        # None, "gzip" or "deflate": compresses upload bodies and sets Content-Encoding
+        self.compression = compression
 
         # Session lets us reuse the same connection and headers across multiple requests
-        self._session = requests.Session()
+        # (any object with get, post and headers can be passed in, e.g. to time the requests)
+        self._session = session or requests.Session()
         self._session.headers.update({
             "Content-Type": "application/json",
         })
 
-        self._gait_gen = GaitSignalGenerator(seed=seed)
+        self._gait_gen = GaitSignalGenerator(seed=seed, sample_rate_hz=sample_rate_hz)
         self._rt_gen = ReactionTimeGenerator(seed=seed)
 
         self.gait_duration = float(os.getenv("WATCH_STUB_GAIT_DURATION", "30"))
+        # readings sent so far, counted before they are encoded or compressed
+        self.samples_sent = 0
 
     ###################
     # PRIVATE HELPERS #
     ###################
-    def _post(self, payload: dict) -> requests.Response:
+    def _post(self, payload: dict | bytes, url: Optional[str] = None, headers: Optional[dict] = None) -> requests.Response:
         """
         Send one payload to Flask and return the response
         """
+        url = url or self.upload_url
+        if isinstance(payload, bytes):
+            body = {"data": payload, "headers": {"Content-Type": BINARY_CONTENT_TYPE}}
+        else:
+            body = {"json": payload}
+        if headers:
+            body["headers"] = {**body.get("headers", {}), **headers}
+
+        if self.compression:
+            data = body.get("data") or json.dumps(body.pop("json")).encode()
+            body["data"] = compress_body(data, self.compression)
+            body["headers"] = {**body.get("headers", {}), "Content-Encoding": self.compression}
         try:
-            resp = self._session.post(self.upload_url, json=payload, timeout=self.timeout)
+            resp = self._session.post(url, timeout=self.timeout, **body)
             resp.raise_for_status()
             log.debug("WatchStub POST -> %d", resp.status_code)
             return resp
         except requests.exceptions.ConnectionError:
             raise ConnectionError(
-                f"WatchStub could not connect to {self.upload_url}\n"
+                f"WatchStub could not connect to {url}\n"
             )
             
+    def _upload(self, payload: dict) -> requests.Response:
+        """
+        Send a sensor payload to the upload URL in the configured wire format,
+        with a fresh upload ID so that the server can deduplicate retries
+        """
+        upload_id = uuid.uuid4().hex
+        self.samples_sent += len(payload["data"])
+        if self.wire_format == "binary":
+            return self._post(make_binary_payload(payload), headers={"X-Upload-Id": upload_id})
+        return self._post({**payload, "metadata": {**payload["metadata"], "uploadId": upload_id}})
+
     def _join(self) -> dict:
         """
         Step 1: call GET /join/<experimentID> to register with Flask.
@@ -303,8 +412,28 @@ class WatchStub:
         duration = duration_seconds or self.gait_duration
         log.info("WatchStub: sending %0.fs of GAIT data", duration)
         readings = self._gait_gen.generate(duration_seconds=duration) # generate the fake walking data
-        return self._post(make_sensor_dto(stage="GAIT", readings=readings))
+        return self._upload(make_sensor_dto(stage="GAIT", readings=readings))
     
+    def send_gait_data_chunked(self, duration_seconds: Optional[float] = None, chunk_seconds: float = 2.0) -> requests.Response:
+        """
+        Generate walking data and POST it in sequence-numbered chunks to <upload_url>/chunk,
+        followed by a call to <upload_url>/finalize
+
+        Simulates: the watch streaming readings every 'chunk_seconds' while the patient walks
+        """
+        duration = duration_seconds or self.gait_duration
+        readings = self._gait_gen.generate(duration_seconds=duration)
+        chunks = split_into_chunks(readings, chunk_seconds)
+        log.info("WatchStub: streaming %0.fs of GAIT data in %d chunks", duration, len(chunks))
+
+        stream_id = None
+        for seq, chunk in enumerate(chunks):
+            self.samples_sent += len(chunk)
+            resp = self._post(make_chunk_dto("GAIT", chunk, seq, stream_id), url=f"{self.upload_url}/chunk")
+            stream_id = resp.json()["streamId"]
+
+        return self._post({"streamId": stream_id}, url=f"{self.upload_url}/finalize")
+
     def send_rt_test_data(
             self,
             n_mem_steps: int = 10,
@@ -329,7 +458,7 @@ class WatchStub:
                 stimulus_time_ms = stimulus_ms,
             )
             log.info("WatchStub: RT_TEST memStep=%d RT=%.1f ms", step, rt_ms)
-            results.append((self._post(payload), rt_ms))
+            results.append((self._upload(payload), rt_ms))
 
         return results
     
@@ -378,7 +507,7 @@ class WatchStub:
         log.info("WatchStub: done. All response OK: %s", all_ok)
 
         return {
-            "gait_readings_sent": int((gait_duration_s or self.gait_duration) * GaitSignalGenerator.SAMPLE_RATE_HZ), # total readings = duration * sample rate
+            "gait_readings_sent": int((gait_duration_s or self.gait_duration) * self._gait_gen.sample_rate_hz), # total readings = duration * sample rate
             "rt_results": rt_results,
             "all_ok": all_ok,
         }
@@ -395,6 +524,8 @@ if __name__ == "__main__":
     parser.add_argument("--gait-duration", type=float, default=30.0)
     parser.add_argument("--n-mem-steps", type=int, default=10)
     parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--wire-format", choices=["json", "binary"], default="json")
+    parser.add_argument("--compression", choices=["gzip", "deflate"], default=None)
     parser.add_argument("-v", "--verbose", action="store_true")
     args = parser.parse_args()
 
@@ -404,7 +535,9 @@ if __name__ == "__main__":
         base_url = args.base_url,
         experiment_id = args.experiment_id,
         upload_path = args.upload_path,
-        seed=args.seed
+        seed=args.seed,
+        wire_format=args.wire_format,
+        compression=args.compression
     )
     stub.gait_duration = args.gait_duration
 
@@ -0,0 +1,174 @@
+from flask.testing import FlaskClient
+import numpy as np
+import pytest
+import redis
+
+from app.db import db
+from app.models import AnalysisCacheEntry, AssessmentStage, AssessmentStageData, MemoryAnalysis, ZeroCrossingAnalysis
+from app.celery_tasks.memory_analysis import analyze_memory_trials
+from app.celery_tasks.peak_identification import identify_peaks
+from app.utilities.analysis_cache import GAIT, MEMORY, cache_stats, cached_results, fingerprint, store_results
+
+def make_readings(seed: int, n_samples: int = 1000) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Helper to build noisy walking-like readings at 50 Hz."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / 50
+    x = 3 * np.sin(2 * np.pi * 1.9 * t) + rng.normal(0, 0.05, n_samples)
+    return 1700000000000 + np.arange(n_samples, dtype=np.int64) * 20, x, 0.3 * x, np.full(n_samples, 0.1)
+
+def store_gait_readings(readings: tuple[np.ndarray, ...]) -> AssessmentStageData:
+    """Helper to store readings as a GAIT stage."""
+    stage_data = AssessmentStageData.from_arrays(*readings, AssessmentStage.GAIT, None, False)
+    db.session.add(stage_data)
+    db.session.commit()
+    return stage_data
+
+def test_fingerprint_covers_inputs():
+    """
+    GIVEN the inputs of an analysis
+    WHEN any of the kind, version, parameters or arrays change
+    THEN the fingerprint changes, and it is stable otherwise.
+    """
+    arrays = make_readings(0)[1:]
+    base = fingerprint(GAIT, "1", {"threshold": 0.2}, arrays)
+
+    assert base == fingerprint(GAIT, "1", {"threshold": 0.2}, tuple(array.copy() for array in arrays))
+    assert len({
+        base,
+        fingerprint(MEMORY, "1", {"threshold": 0.2}, arrays),
+        fingerprint(GAIT, "2", {"threshold": 0.2}, arrays),
+        fingerprint(GAIT, "1", {"threshold": 0.3}, arrays),
+        fingerprint(GAIT, "1", {"threshold": 0.2}, (arrays[0][:-1], arrays[1][:-1], arrays[2][:-1])),
+        fingerprint(GAIT, "1", {"threshold": 0.2}, tuple(array.astype(np.float32) for array in arrays))
+    }) == 6
+
+def test_rerun_and_duplicate_upload_reuse_gait_result(test_client: FlaskClient):
+    """
+    GIVEN a GAIT stage and a duplicate upload of the same readings
+    WHEN identify_peaks runs twice on the first stage and once on the duplicate
+    THEN the rerun keeps the existing analysis and the duplicate reuses the cached peaks.
+    """
+    readings = make_readings(1)
+    first, duplicate = store_gait_readings(readings), store_gait_readings(readings)
+    before = cache_stats()[GAIT]
+
+    identify_peaks(first.id)
+    identify_peaks(first.id)
+    identify_peaks(duplicate.id)
+
+    after = cache_stats()[GAIT]
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 1)
+
+    analyses = db.session.query(ZeroCrossingAnalysis).filter(ZeroCrossingAnalysis.stage_data_id.in_([first.id, duplicate.id])).all()
+    assert sorted(analysis.stage_data_id for analysis in analyses) == [first.id, duplicate.id]
+    assert analyses[0].fingerprint == analyses[1].fingerprint
+    assert analyses[0].num_peaks > 10
+    np.testing.assert_array_equal(analyses[0].peak_positions(), analyses[1].peak_positions())
+    assert analyses[0].avg_peak_distance == analyses[1].avg_peak_distance
+
+def test_cached_gait_result_uses_own_timestamps(test_client: FlaskClient):
+    """
+    GIVEN two GAIT stages with the same readings at the same sample rate, the second starting later with a gap
+    WHEN identify_peaks runs on both
+    THEN the second reuses the cached peaks but its intervals are computed from its own timestamps.
+    """
+    timestamps, x, y, z = make_readings(2)
+    shifted = timestamps + 60000 + np.where(np.arange(len(timestamps)) >= 500, 5000, 0)
+    first, later = store_gait_readings((timestamps, x, y, z)), store_gait_readings((shifted, x, y, z))
+    before = cache_stats()[GAIT]
+
+    identify_peaks(first.id)
+    identify_peaks(later.id)
+
+    after = cache_stats()[GAIT]
+    assert after["hits"] - before["hits"] == 1
+    analysis = db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=later.id).one()
+    expected = ZeroCrossingAnalysis.interval_stats(later.as_arrays()[0][analysis.peak_positions()])
+    assert (analysis.avg_peak_distance, analysis.std_dev_peak_distance) == pytest.approx(expected)
+    assert analysis.std_dev_peak_distance > db.session.query(ZeroCrossingAnalysis).filter_by(stage_data_id=first.id).one().std_dev_peak_distance
+
+def test_memory_batch_reuses_cached_trials(test_client: FlaskClient):
+    """
+    GIVEN RT trials of which one was analyzed before and one appears twice
+    WHEN the batch is analyzed
+    THEN only the new readings are computed and every trial gets its result.
+    """
+    trials = [make_readings(seed, 100) for seed in (10, 11)]
+    expected = analyze_memory_trials([1, 2], trials)
+    db.session.commit()
+    before = cache_stats()[MEMORY]
+
+    analyses = analyze_memory_trials([3, 4, 5], [trials[1], make_readings(12, 100), make_readings(12, 100)])
+    db.session.commit()
+
+    after = cache_stats()[MEMORY]
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 2)
+    assert [analysis.assessment_stage_data_id for analysis in analyses] == [3, 4, 5]
+    assert (analyses[0].time_to_move, analyses[0].max_accl) == (expected[1].time_to_move, expected[1].max_accl)
+    assert analyses[1].fingerprint == analyses[2].fingerprint != analyses[0].fingerprint
+    assert analyses[1].average_accl_post_threshold == analyses[2].average_accl_post_threshold
+    assert db.session.query(AnalysisCacheEntry).filter_by(fingerprint=analyses[1].fingerprint).count() == 1
+    assert all(isinstance(analysis, MemoryAnalysis) for analysis in analyses)
+
+def test_cache_evicts_least_recently_used(test_app, test_client: FlaskClient):
+    """
+    GIVEN a cache limited to 3 entries holding 3 results, of which the oldest was just used
+    WHEN 2 more results are stored
+    THEN the least recently used results are evicted and the used one is kept.
+    """
+    db.session.query(AnalysisCacheEntry).delete()
+    db.session.commit()
+    test_app.config["ANALYSIS_CACHE_SIZE"] = 3
+    try:
+        for key in ["a", "b", "c"]:
+            store_results(MEMORY, {key: {"value": key}})
+            db.session.commit()
+        assert cached_results(MEMORY, ["a"]) == {"a": {"value": "a"}}
+        db.session.commit()
+
+        store_results(MEMORY, {"d": {"value": "d"}, "e": {"value": "e"}})
+        db.session.commit()
+    finally:
+        test_app.config["ANALYSIS_CACHE_SIZE"] = 10000
+
+    assert sorted(entry.fingerprint for entry in db.session.query(AnalysisCacheEntry)) == ["a", "d", "e"]
+
+def test_cache_disabled(test_app, test_client: FlaskClient):
+    """
+    GIVEN an analysis cache size of 0
+    WHEN results are stored and looked up
+    THEN nothing is cached.
+    """
+    test_app.config["ANALYSIS_CACHE_SIZE"] = 0
+    try:
+        store_results(GAIT, {"disabled": {"peaks": [], "troughs": []}})
+        db.session.commit()
+        assert cached_results(GAIT, ["disabled"]) == {}
+    finally:
+        test_app.config["ANALYSIS_CACHE_SIZE"] = 10000
+
+    assert db.session.query(AnalysisCacheEntry).filter_by(fingerprint="disabled").count() == 0
+
+def test_cache_without_redis(test_client: FlaskClient, monkeypatch):
+    """
+    GIVEN a Redis server that can't be reached
+    WHEN results are stored and looked up
+    THEN they are found without counting the hits and misses.
+    """
+    monkeypatch.setattr("app.utilities.analysis_cache.get_redis", lambda: redis.Redis.from_url("redis://localhost:1/0"))
+    store_results(MEMORY, {"without-redis": {"value": 1}})
+    db.session.commit()
+
+    assert cached_results(MEMORY, ["without-redis", "missing"]) == {"without-redis": {"value": 1}}
+
+def test_analysis_cache_stats_command(test_app, test_client: FlaskClient):
+    """
+    GIVEN the analysis cache
+    WHEN the analysis-cache stats command is run
+    THEN the entries, hits and misses of each kind of analysis are shown.
+    """
+    result = test_app.test_cli_runner().invoke(args=["analysis-cache", "stats"])
+
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith("gait: ")
+    assert "memory: " in result.output and "hit rate" in result.output
@@ -0,0 +1,40 @@
+import gzip
+import io
+import zlib
+
+import pytest
+
+from app.decorators import read_decompressed
+
+BODY = b'{"data": [' + b", ".join(b'{"ts": 1, "x": 0.12, "y": 0.5, "z": -0.2}' for _ in range(1000)) + b"]}"
+
+@pytest.mark.parametrize("encoding, compress", [("gzip", gzip.compress), ("deflate", zlib.compress)])
+def test_read_decompressed(encoding: str, compress):
+    """
+    GIVEN a gzip or deflate compressed body
+    WHEN it is read in small chunks
+    THEN the original body is returned.
+    """
+    assert read_decompressed(io.BytesIO(compress(BODY)), encoding, len(BODY), chunk_size=64) == BODY
+
+def test_read_decompressed_over_limit():
+    """
+    GIVEN a small compressed body that expands to far more than the limit (a zip bomb)
+    WHEN it is read
+    THEN an OverflowError is raised.
+    """
+    bomb = gzip.compress(bytes(64 * 1024 * 1024))
+    assert len(bomb) < 100 * 1024
+
+    with pytest.raises(OverflowError):
+        read_decompressed(io.BytesIO(bomb), "gzip", 1024 * 1024)
+
+@pytest.mark.parametrize("body", [b"not compressed at all", gzip.compress(BODY)[:-20]])
+def test_read_decompressed_invalid(body: bytes):
+    """
+    GIVEN a body that isn't gzip data or is truncated
+    WHEN it is read
+    THEN a ValueError is raised.
+    """
+    with pytest.raises(ValueError):
+        read_decompressed(io.BytesIO(body), "gzip", len(BODY))
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.utilities.downsampling import lttb_indices
+
+def reference_lttb(t: np.ndarray, v: np.ndarray, n_out: int) -> list[int]:
+    """Helper implementing LTTB one reading at a time, as in the original paper."""
+    n = len(t)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = [0]
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < n_out - 2:
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+            next_t, next_v = np.mean(t[next_start:next_end]), np.mean(v[next_start:next_end])
+        else:
+            next_t, next_v = t[-1], v[-1]
+        previous = kept[-1]
+        best, best_area = start, -1.0
+        for i in range(start, end):
+            area = abs((t[previous] - next_t) * (v[i] - v[previous]) - (t[previous] - t[i]) * (next_v - v[previous]))
+            if area > best_area:
+                best, best_area = i, area
+        kept.append(best)
+    return kept + [n - 1]
+
+def test_lttb_matches_reference():
+    """
+    GIVEN several channels of noisy readings with jittered timestamps
+    WHEN they are downsampled together
+    THEN each channel keeps the same readings as the one reading at a time LTTB.
+    """
+    rng = np.random.default_rng(7)
+    t = np.cumsum(rng.uniform(15, 25, 1003))
+    values = rng.normal(size=(3, len(t)))
+
+    kept = lttb_indices(t, values, 57)
+
+    assert kept.shape == (3, 57)
+    for channel in range(3):
+        assert kept[channel].tolist() == reference_lttb(t, values[channel], 57)
+
+def test_lttb_keeps_spikes():
+    """
+    GIVEN a flat signal with one spike
+    WHEN it is downsampled to a small fraction of its readings
+    THEN the spike and the first and last readings are kept.
+    """
+    values = np.zeros(10000)
+    values[4321] = 9.0
+
+    kept = lttb_indices(np.arange(10000), values, 20)[0]
+
+    assert 4321 in kept
+    assert (kept[0], kept[-1]) == (0, 9999)
+    assert np.all(np.diff(kept) > 0)
+
+def test_lttb_short_and_invalid():
+    """
+    GIVEN fewer readings than requested, and a request for less than 3 readings
+    WHEN they are downsampled
+    THEN every reading is kept, and the invalid request is rejected.
+    """
+    assert lttb_indices(np.arange(5), np.ones((2, 5)), 10).tolist() == [list(range(5))] * 2
+
+    with pytest.raises(ValueError):
+        lttb_indices(np.arange(5), np.ones(5), 2)
@@ -0,0 +1,112 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from app.utilities.gait_signal import PEAK_THRESHOLD, STEP_FREQUENCY_BAND, WINDOW_SIZE, StreamingPeakDetector, filtered_norm, find_peaks_and_troughs, gait_rhythm, sample_rate
+from tests.payloads import make_walking_readings
+
+@pytest.mark.parametrize("seed", range(4))
+def test_streaming_detector_matches_batch(seed: int):
+    """
+    GIVEN a walking recording split into chunks of random sizes
+    WHEN the chunks are fed to a streaming detector whose state is serialized between chunks
+    THEN it finds exactly the peaks and troughs the batch detection finds on the whole recording.
+    """
+    timestamps, x, y, z = make_walking_readings(3000, seed)
+    expected_peaks, expected_troughs = find_peaks_and_troughs(filtered_norm(x, y, z, WINDOW_SIZE), PEAK_THRESHOLD)
+
+    rng = np.random.default_rng(seed)
+    bounds = [0, *np.sort(rng.choice(np.arange(1, 3000), size=40, replace=False)).tolist(), 3000]
+
+    detector = StreamingPeakDetector()
+    found_peaks, found_troughs = [], []
+    for start, end in zip(bounds, bounds[1:]):
+        detector = StreamingPeakDetector.from_dict(json.loads(json.dumps(detector.to_dict())))
+        peaks, troughs = detector.update(timestamps[start:end], x[start:end], y[start:end], z[start:end])
+        found_peaks += peaks
+        found_troughs += troughs
+
+    assert found_peaks == detector.peaks == expected_peaks
+    assert found_troughs == detector.troughs == expected_troughs
+    assert detector.peak_timestamps == timestamps[expected_peaks].tolist()
+    assert detector.trough_timestamps == timestamps[expected_troughs].tolist()
+
+def test_streaming_detector_state_stays_small():
+    """
+    GIVEN a long walking recording fed in 2 second chunks
+    WHEN the detector state is serialized
+    THEN it only holds the readings of the current segment rather than the recording.
+    """
+    timestamps, x, y, z = make_walking_readings(30000, seed=0)
+    detector = StreamingPeakDetector()
+    for start in range(0, 30000, 100):
+        detector.update(timestamps[start:start + 100], x[start:start + 100], y[start:start + 100], z[start:start + 100])
+
+    assert detector.samples == 30000
+    assert len(detector.segment_values) == len(detector.segment_timestamps) < 200
+    assert len(detector.window) == WINDOW_SIZE
+
+def make_upright_walk(n_samples: int, step_hz: float, asymmetry: float = 0.0, seed: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Helper to build a 50 Hz recording with gravity on z, whose every other step is weaker by the asymmetry."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / 50
+    amplitude = np.where(np.floor(t * step_hz) % 2 == 0, 1.0, 1.0 - asymmetry)
+    return (
+        1700000000000 + np.arange(n_samples, dtype=np.int64) * 20,
+        0.2 * np.sin(np.pi * step_hz * t),
+        np.full(n_samples, 0.1),
+        9.81 + amplitude * np.sin(2 * np.pi * step_hz * t) + rng.normal(0, 0.05, n_samples)
+    )
+
+def test_gait_rhythm_step_frequency_and_regularity():
+    """
+    GIVEN one minute of walking at 1.8 steps per second, with symmetric and with asymmetric steps
+    WHEN the rhythm features are computed from the filtered signal
+    THEN the dominant step frequency is 1.8 Hz and asymmetric steps lower the step regularity but not the stride regularity.
+    """
+    features = {}
+    for asymmetry in (0.0, 0.5):
+        timestamps, x, y, z = make_upright_walk(3000, 1.8, asymmetry)
+        features[asymmetry] = gait_rhythm(filtered_norm(x, y, z, WINDOW_SIZE), np.zeros(1, dtype=np.int64), sample_rate(timestamps))
+
+    for step_frequency, step_regularity, stride_regularity in features.values():
+        assert step_frequency == pytest.approx(1.8, abs=0.01)
+        assert stride_regularity > 0.9
+    assert features[0.0][1] > 0.95
+    assert features[0.5][1] < features[0.5][2] - 0.05
+
+def test_gait_rhythm_matches_direct_autocorrelation():
+    """
+    GIVEN a filtered signal made of two segments of different lengths
+    WHEN the rhythm features are computed with the FFT
+    THEN the regularities are the peaks of the segments' unbiased autocorrelation computed directly with np.correlate.
+    """
+    timestamps, x, y, z = make_upright_walk(2500, 1.6, asymmetry=0.3, seed=1)
+    signal = np.concatenate((filtered_norm(x[:1500], y[:1500], z[:1500], WINDOW_SIZE), filtered_norm(x[1500:], y[1500:], z[1500:], WINDOW_SIZE)))
+    offsets = np.array([0, 1500])
+    step_frequency, step_regularity, stride_regularity = gait_rhythm(signal, offsets, 50)
+
+    products, pairs = np.zeros(1000), np.zeros(1000)
+    for segment in (signal[:1500], signal[1500:]):
+        segment = segment[~np.isnan(segment)]
+        segment = segment - segment.mean()
+        products[:len(segment)] += np.correlate(segment, segment, mode="full")[len(segment) - 1:][:1000]
+        pairs += np.maximum(len(segment) - np.arange(1000), 0)
+    autocorrelation = products / pairs
+    autocorrelation /= autocorrelation[0]
+
+    step_lag = 50 / step_frequency
+    assert STEP_FREQUENCY_BAND[0] <= step_frequency <= STEP_FREQUENCY_BAND[1]
+    assert step_regularity == pytest.approx(autocorrelation[round(0.75 * step_lag):round(1.25 * step_lag) + 1].max())
+    assert stride_regularity == pytest.approx(autocorrelation[round(1.5 * step_lag):round(2.5 * step_lag) + 1].max())
+
+@pytest.mark.parametrize("signal", [np.full(10, np.nan), np.ones(200), np.array([0.5])])
+def test_gait_rhythm_without_steps(signal: np.ndarray):
+    """
+    GIVEN a signal that is empty after the filter warm-up, flat or a single reading
+    WHEN the rhythm features are computed
+    THEN they are all NaN.
+    """
+    assert all(math.isnan(value) for value in gait_rhythm(signal, np.zeros(1, dtype=np.int64), 50))
@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.utilities.memory_signal import movement_features, ragged_batch
+
+def make_trial(norms: list[float], timestamps: list[int] | None = None) -> tuple[np.ndarray, ...]:
+    """Helper to build a trial whose acceleration is along the x axis."""
+    timestamps = list(range(0, 10 * len(norms), 10)) if timestamps is None else timestamps
+    return (np.array(timestamps, dtype=np.int64), np.array(norms, dtype=np.float64), np.zeros(len(norms)), np.zeros(len(norms)))
+
+def test_movement_features_ragged_batch():
+    """
+    GIVEN a batch with a moving trial, an empty trial, a trial without movement and a
+    trial whose first movement shares its timestamp with an earlier reading
+    WHEN the movement features of the batch are computed
+    THEN each trial gets its own features, with NaN where a trial has no movement.
+    """
+    trials = [
+        make_trial([0.5, 1.0, 3.0, 5.0, 1.0]),
+        make_trial([]),
+        make_trial([0.5, 2.0, 1.0]),
+        make_trial([1.0, 1.0, 4.0, 2.0], timestamps=[100, 110, 110, 120])
+    ]
+    columns, offsets = ragged_batch(trials)
+    time_to_move, average_accl, max_accl, moved = movement_features(*columns, offsets)
+
+    assert offsets.tolist() == [0, 5, 5, 8]
+    assert moved.tolist() == [True, False, False, True]
+    np.testing.assert_array_equal(time_to_move, [20, np.nan, np.nan, 10])
+    np.testing.assert_allclose(average_accl, [3.0, np.nan, np.nan, 7.0 / 3], equal_nan=True)
+    np.testing.assert_array_equal(max_accl, [5.0, np.nan, 2.0, 4.0])
+
+def test_movement_features_empty_batch():
+    """
+    GIVEN a batch without any trial
+    WHEN its movement features are computed
+    THEN empty results are returned.
+    """
+    columns, offsets = ragged_batch([])
+    features = movement_features(*columns, offsets)
+
+    assert [len(feature) for feature in features] == [0, 0, 0, 0]
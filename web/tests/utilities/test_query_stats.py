@@ -0,0 +1,48 @@
+import logging
+from uuid import uuid4
+
+from flask.testing import FlaskClient
+
+from app.models import Role
+from app.utilities.query_stats import count_queries
+from tests.memory_testing.test_memory_test import create_patient_user, login
+
+def test_count_queries_nested(test_client: FlaskClient):
+    """
+    GIVEN nested query counters
+    WHEN statements run inside them
+    THEN each counter counts the statements run while it was active, with their time.
+    """
+    with count_queries() as outer:
+        Role.query.filter_by(name="Patient").first()
+        with count_queries() as inner:
+            Role.query.filter_by(name="Physician").first()
+            Role.query.count()
+    Role.query.count()
+
+    assert (outer.count, inner.count) == (3, 2)
+    assert len(outer.statements) == 3 and "FROM role" in inner.statements[0]
+    assert outer.duration >= inner.duration > 0
+
+def test_requests_over_budget_are_logged(test_app, test_client: FlaskClient, caplog):
+    """
+    GIVEN a query budget of 0
+    WHEN a logged in user's profile is requested, and a page that runs no statements
+    THEN only the profile request is logged with its route and query count, and nothing is logged once the budget is turned off.
+    """
+    user, _ = create_patient_user("Budget Patient", f"{uuid4()}@test.com")
+    login(test_client, user)
+    caplog.set_level(logging.WARNING, logger=test_app.logger.name)
+
+    test_app.config["QUERY_BUDGET"] = 0
+    try:
+        test_client.get("/profile")
+        test_client.get("/static/does-not-exist.css")
+    finally:
+        test_app.config["QUERY_BUDGET"] = None
+    test_client.get("/profile")
+
+    over_budget = [record.getMessage() for record in caplog.records if "over the budget" in record.getMessage()]
+    assert len(over_budget) == 1
+    assert over_budget[0].startswith("GET /profile (main.profile) ran ")
+    assert over_budget[0].endswith("over the budget of 0")
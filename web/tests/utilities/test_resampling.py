@@ -0,0 +1,109 @@
+from flask.testing import FlaskClient
+import numpy as np
+import pytest
+
+from app.celery_tasks.memory_analysis import analyze_memory
+from app.celery_tasks.peak_identification import analyze_gait
+from app.utilities.resampling import nearest_readings, resample_uniform
+
+def make_watch_readings(rate_hz: float, duration_s: float, seed: int, jitter_ms: float = 4) -> tuple[np.ndarray, ...]:
+    """Helper to sample the same walking motion at a watch sample rate with jittered timestamps."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(0, duration_s, 1 / rate_hz) + rng.uniform(-jitter_ms, jitter_ms, int(np.ceil(duration_s * rate_hz))) / 1000
+    t = np.sort(t)
+    timestamps = 1700000000000 + np.rint(t * 1000).astype(np.int64)
+    y = 3 * np.sin(2 * np.pi * 1.9 * t)
+    return timestamps, 0.3 * np.sin(2 * np.pi * 0.95 * t), y, np.full(len(t), 0.1)
+
+def test_resample_uniform_interpolates_linearly():
+    """
+    GIVEN irregular readings of a linear signal
+    WHEN they are resampled at 50 Hz
+    THEN the grid steps by 20 ms from the first reading and the interpolated values are exact.
+    """
+    timestamps = np.array([1000, 1013, 1041, 1055, 1080, 1101])
+    x = 2.0 * timestamps
+    (grid, gx, gy, gz), offsets = resample_uniform(timestamps, x, -x, np.ones(6), 50)
+
+    np.testing.assert_array_equal(grid, [1000, 1020, 1040, 1060, 1080, 1100])
+    np.testing.assert_allclose(gx, 2.0 * grid)
+    np.testing.assert_allclose(gy, -2.0 * grid)
+    np.testing.assert_array_equal(gz, np.ones(6))
+    assert offsets.tolist() == [0]
+
+def test_resample_uniform_splits_at_gaps():
+    """
+    GIVEN readings with a 1 second gap
+    WHEN they are resampled
+    THEN each side of the gap gets its own grid segment and nothing is interpolated across it.
+    """
+    timestamps = np.array([0, 20, 40, 60, 1060, 1080, 1090])
+    values = np.array([0.0, 1.0, 2.0, 3.0, 100.0, 101.0, 102.0])
+    (grid, gx, _, _), offsets = resample_uniform(timestamps, values, values, values, 50)
+
+    assert offsets.tolist() == [0, 4]
+    np.testing.assert_array_equal(grid, [0, 20, 40, 60, 1060, 1080])
+    np.testing.assert_array_equal(gx, [0, 1, 2, 3, 100, 101])
+
+def test_resample_uniform_empty():
+    """
+    GIVEN no readings
+    WHEN they are resampled
+    THEN the grid is empty.
+    """
+    (grid, _, _, _), offsets = resample_uniform(np.array([], dtype=np.int64), np.array([]), np.array([]), np.array([]), 50)
+    assert len(grid) == 0 and len(offsets) == 0
+
+def test_nearest_readings():
+    """
+    GIVEN reading timestamps
+    WHEN the closest reading of timestamps inside, between and outside them is looked up
+    THEN the position of the closest reading is returned.
+    """
+    timestamps = np.array([0, 20, 40, 60])
+    assert nearest_readings(timestamps, np.array([-5.0, 0.0, 9.0, 11.0, 40.0, 59.0, 100.0])).tolist() == [0, 0, 0, 1, 2, 3, 3]
+
+def test_resampled_gait_analysis_is_rate_independent(test_app, test_client: FlaskClient):
+    """
+    GIVEN the same walk recorded at 25, 50 and 100 Hz with jittered timestamps
+    WHEN the gait analysis runs with and without resampling at 50 Hz
+    THEN resampled results agree across watch rates where raw readings don't.
+    """
+    raw, resampled = {}, {}
+    for rate_hz in [25, 50, 100]:
+        readings = make_watch_readings(rate_hz, 30, seed=rate_hz)
+        raw[rate_hz] = analyze_gait(None, *readings)
+        test_app.config["RESAMPLE_RATE_HZ"] = 50
+        try:
+            resampled[rate_hz] = analyze_gait(None, *readings)
+        finally:
+            test_app.config["RESAMPLE_RATE_HZ"] = None
+
+        # Peak positions still refer to the stored readings
+        assert resampled[rate_hz].peak_positions().max() < len(readings[0])
+
+    assert len({analysis.num_peaks for analysis in raw.values()}) > 1
+    counts = [analysis.num_peaks for analysis in resampled.values()]
+    assert max(counts) - min(counts) <= 1
+    for analysis in resampled.values():
+        assert analysis.avg_peak_distance == pytest.approx(resampled[50].avg_peak_distance, rel=0.02)
+
+def test_resampled_memory_analysis(test_app, test_client: FlaskClient):
+    """
+    GIVEN an RT trial whose movement starts 500 ms in, recorded at 40 Hz with jitter
+    WHEN the memory analysis runs with resampling at 100 Hz
+    THEN the time to move is found on the uniform grid.
+    """
+    timestamps = np.sort(1700000000000 + np.arange(0, 1000, 25) + np.random.default_rng(0).integers(-3, 4, 40))
+    norm = np.where(timestamps - timestamps[0] >= 500, 5.0, 0.5)
+
+    test_app.config["RESAMPLE_RATE_HZ"] = 100
+    try:
+        analysis = analyze_memory(None, timestamps, norm, np.zeros(40), np.zeros(40))
+    finally:
+        test_app.config["RESAMPLE_RATE_HZ"] = None
+
+    assert not analysis.no_movement
+    assert analysis.time_to_move % 10 == 0
+    assert analysis.time_to_move == pytest.approx(500, abs=30)
+    assert analysis.max_accl == pytest.approx(5.0)
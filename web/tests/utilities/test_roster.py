@@ -0,0 +1,38 @@
+from datetime import timedelta
+from uuid import uuid4
+
+from flask.testing import FlaskClient
+
+from app.utilities.roster import physician_roster
+from app.utilities.query_stats import count_queries
+from app.db import db
+from tests.memory_testing.test_memory_test import create_patient_user, create_physician_user
+from tests.models.test_reaction_time_summary import RECORDS, create_assessment
+
+def test_physician_roster(test_app, test_client: FlaskClient):
+    """
+    GIVEN a physician with a patient that has assessments, one without any, and another physician's patient
+    WHEN the physician's roster is read twice in a request
+    THEN it lists the physician's patients with their names, assessment counts and last assessment date
+    in one query, and the second read reuses the first.
+    """
+    _, physician = create_physician_user("Roster Physician", f"{uuid4()}@test.com")
+    _, other_physician = create_physician_user("Other Physician", f"{uuid4()}@test.com")
+    _, active = create_patient_user("Active Patient", f"{uuid4()}@test.com", physician)
+    _, idle = create_patient_user("Idle Patient", f"{uuid4()}@test.com", physician)
+    create_patient_user("Other Patient", f"{uuid4()}@test.com", other_physician)
+
+    first, last = create_assessment(active.id, RECORDS), create_assessment(active.id, RECORDS)
+    first.date_taken = last.date_taken - timedelta(days=3)
+    db.session.commit()
+    physician_id = physician.id
+
+    with test_app.test_request_context():
+        with count_queries() as counter:
+            roster = physician_roster(physician_id)
+            assert physician_roster(physician_id) is roster
+
+    assert counter.count == 1
+    assert [(row.patient_id, row.name, row.assessment_count) for row in roster] == [(active.id, "Active Patient", 2), (idle.id, "Idle Patient", 0)]
+    assert roster[0].last_assessment == last.date_taken
+    assert roster[1].last_assessment is None
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from app.utilities.sample_packing import BYTES_PER_SAMPLE, UPLOAD_HEADER, decode_upload, encode_upload, pack_samples, unpack_samples
+from tests.stubs.watch_stub import ReactionTimeGenerator, make_binary_payload
+
+def test_pack_unpack_round_trip():
+    """
+    GIVEN timestamp and axis arrays
+    WHEN they are packed and unpacked
+    THEN int64 timestamps are exact and axes match at float32 precision.
+    """
+    timestamps = np.arange(1700000000000, 1700000000000 + 100 * 20, 20)
+    x, y, z = np.random.default_rng(0).normal(0, 1, (3, 100))
+
+    blob = pack_samples(timestamps, x, y, z)
+    assert len(blob) == 100 * BYTES_PER_SAMPLE
+
+    ts_out, x_out, y_out, z_out = unpack_samples(blob)
+    assert ts_out.dtype == np.int64 and x_out.dtype == np.float32
+    np.testing.assert_array_equal(ts_out, timestamps)
+    np.testing.assert_allclose(x_out, x, rtol=1e-6)
+    np.testing.assert_allclose(y_out, y, rtol=1e-6)
+    np.testing.assert_allclose(z_out, z, rtol=1e-6)
+
+def test_pack_empty():
+    """
+    GIVEN no samples
+    WHEN they are packed and unpacked
+    THEN empty arrays are returned.
+    """
+    assert all(len(column) == 0 for column in unpack_samples(pack_samples([], [], [], [])))
+
+def test_pack_mismatched_lengths():
+    """
+    GIVEN axis arrays of different lengths
+    WHEN they are packed
+    THEN a ValueError is raised.
+    """
+    with pytest.raises(ValueError):
+        pack_samples([1, 2], [0.0, 1.0], [0.0], [0.0, 1.0])
+
+def test_unpack_truncated_blob():
+    """
+    GIVEN a blob that isn't a whole number of samples
+    WHEN it is unpacked
+    THEN a ValueError is raised.
+    """
+    with pytest.raises(ValueError):
+        unpack_samples(pack_samples([1], [0.0], [0.0], [0.0])[:-1])
+
+
+def test_upload_round_trip():
+    """
+    GIVEN samples and RT_TEST metadata
+    WHEN they are encoded and decoded in the binary wire format
+    THEN the metadata and samples are preserved.
+    """
+    timestamps = np.array([1000, 1020, 1040])
+    metadata, ts_out, x_out, y_out, z_out = decode_upload(
+        encode_upload("RT_TEST", timestamps, [0.5, 1.5, 2.5], [1, 2, 3], [-1, -2, -3], trial=0, mem_step=4)
+    )
+
+    assert metadata == {"stage": "RT_TEST", "trial": 0, "memStep": 4}
+    np.testing.assert_array_equal(ts_out, timestamps)
+    np.testing.assert_array_equal(x_out, [0.5, 1.5, 2.5])
+    np.testing.assert_array_equal(z_out, [-1, -2, -3])
+
+def test_upload_missing_trial_and_mem_step():
+    """
+    GIVEN GAIT samples without trial or memStep
+    WHEN they are encoded and decoded
+    THEN trial and memStep decode as None.
+    """
+    metadata, *_ = decode_upload(encode_upload("GAIT", [1], [0], [0], [0]))
+    assert metadata["trial"] is None
+    assert metadata["memStep"] is None
+
+@pytest.mark.parametrize("body", [
+    b"",
+    b"XXXX" + bytes(UPLOAD_HEADER.size - 4),
+    encode_upload("GAIT", [1, 2], [0, 0], [0, 0], [0, 0])[:-4],
+])
+def test_decode_invalid_upload(body: bytes):
+    """
+    GIVEN a truncated body or one with a bad magic number
+    WHEN it is decoded
+    THEN a ValueError is raised.
+    """
+    with pytest.raises(ValueError):
+        decode_upload(body)
+
+def test_stub_binary_payload_decodes():
+    """
+    GIVEN an RT_TEST payload built by the watch stub
+    WHEN the stub converts it to the binary wire format and the server decodes it
+    THEN the decoded samples match the JSON readings.
+    """
+    payload, _ = ReactionTimeGenerator(seed=1).generate_trial(trial=1, mem_step=2, stimulus_time_ms=1000000)
+
+    metadata, timestamps, x, y, z = decode_upload(make_binary_payload(payload))
+
+    assert metadata == payload["metadata"]
+    np.testing.assert_array_equal(timestamps, [r["ts"] for r in payload["data"]])
+    np.testing.assert_allclose(y, [r["y"] for r in payload["data"]], rtol=1e-6)